@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from bends import DEFAULT_FPS, sway_features
+
+# ------------------ Artifact Classifier ------------------
+#
+# Besides worms, wrMTrck tracks filaments, debris and flickering spots, whose Bends are nonsense. track_features
+# describes every track of the X/Y-Coordinates with a few numbers and classify marks the tracks that do not look
+# like a swimming worm, with the reason, so the reviewer only has to confirm them before deleting:
+#
+#   short     found in fewer than min_frames frames
+#   jumping   the centroid jumps by more than max_jump pixels between frames (spots flickering between places)
+#   static    no sideways sway and staying within max_extent pixels (debris or filaments lying on the bottom)
+#   drifting  no sideways sway but moving along a straight line (debris carried by the liquid)
+#   irregular swings of the sway at irregular intervals (filaments flapping in the liquid)
+#
+# A thrashing worm sways its centroid regularly by several pixels, which none of the artifacts does. All features
+# are computed for all tracks at once: the steps between frames from the trajectories of the TrackIndex (sums and
+# percentiles per track with bincount and sorted rows) and the sway in blocks of tracks like the body bends.
+
+SHORT = "short"
+JUMPING = "jumping"
+STATIC = "static"
+DRIFTING = "drifting"
+IRREGULAR = "irregular"
+
+FEATURE_COLUMNS = ["Frames", "Duration", "PathLength", "Displacement", "Straightness", "Extent", "MedianSpeed",
+                   "SpeedP90", "MaxStep", "SwayAmplitude", "Swings", "SwingRate", "SwingCV"]
+
+
+def _per_track_quantiles(values, tracks, n_tracks, quantiles, block=256):
+    """quantiles of values per track (NaN for tracks without values); values are grouped by track in order.
+
+    The values of a block of tracks are sorted as rows of one padded array, which is much faster than sorting all
+    values by track and value.
+    """
+    counts = np.bincount(tracks, minlength=n_tracks)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((len(quantiles), n_tracks), np.nan)
+    for first in range(0, n_tracks, block):
+        last = min(first + block, n_tracks)
+        width = int(counts[first:last].max(initial=0))
+        if not width:
+            continue
+        part = slice(starts[first], starts[last - 1] + counts[last - 1])
+        rows = tracks[part] - first
+        padded = np.full((last - first, width), np.inf)
+        padded[rows, np.arange(len(rows)) - (starts[tracks[part]] - starts[first])] = values[part]
+        padded.sort(axis=1)
+        has = counts[first:last] > 0
+        for i, quantile in enumerate(quantiles):
+            picks = np.floor(quantile * (counts[first:last][has] - 1)).astype(np.int64)
+            result[i, first:last][has] = padded[has, picks]
+    return result
+
+
+def track_features(track_index, fps=DEFAULT_FPS, window=31, threshold=2.0, stride=15):
+    """FEATURE_COLUMNS of every track of a TrackIndex as DataFrame indexed by Track (speeds in pixels per frame).
+
+    Straightness is the displacement divided by the path through every stride-th point, so that the jitter of the
+    centroid does not make a straight path look winding.
+    """
+    coords = track_index.coords
+    n_tracks = coords.n_tracks
+    offsets = track_index.point_offsets
+    counts = np.diff(offsets)
+    frames, xy = track_index.point_frames, track_index.point_xy.astype(np.float64)
+    point_tracks = np.repeat(np.arange(n_tracks), counts)
+
+    # Steps between consecutive frames of the same track
+    step = np.hypot(*np.diff(xy, axis=0).T) if len(xy) > 1 else np.empty(0)
+    consecutive = (point_tracks[1:] == point_tracks[:-1]) & (np.diff(frames) == 1)
+    step_tracks, step = point_tracks[1:][consecutive], step[consecutive]
+    path = np.bincount(step_tracks, step, minlength=n_tracks)
+
+    # Path through every stride-th point of a track
+    sampled = (np.arange(len(frames)) - offsets[point_tracks]) % stride == 0
+    sampled[offsets[1:][counts > 0] - 1] = True  # and its last point
+    sampled_tracks, sampled_xy = point_tracks[sampled], xy[sampled]
+    coarse_step = np.hypot(*np.diff(sampled_xy, axis=0).T) if len(sampled_xy) > 1 else np.empty(0)
+    same = sampled_tracks[1:] == sampled_tracks[:-1]
+    coarse_path = np.bincount(sampled_tracks[1:][same], coarse_step[same], minlength=n_tracks)
+
+    has = counts > 0
+    displacement = np.zeros(n_tracks)
+    first_xy, last_xy = xy[offsets[:-1][has]], xy[offsets[1:][has] - 1]
+    displacement[has] = np.hypot(*(last_xy - first_xy).T)
+    extent = np.hypot(track_index.bbox[:, 2] - track_index.bbox[:, 0], track_index.bbox[:, 3] - track_index.bbox[:, 1])
+    max_step = np.zeros(n_tracks)
+    np.maximum.at(max_step, step_tracks, step)
+    median_speed, speed_p90 = _per_track_quantiles(step, step_tracks, n_tracks, (0.5, 0.9))
+
+    amplitude, swings, swing_cv = sway_features(coords, window, threshold)
+    duration = counts / fps
+    with np.errstate(invalid="ignore", divide="ignore"):
+        straightness = np.where(coarse_path > 0, displacement / coarse_path, 0.0)
+        swing_rate = np.where(duration > 0, swings / duration, 0.0)
+    features = pd.DataFrame({
+        "Frames": counts, "Duration": duration, "PathLength": path, "Displacement": displacement,
+        "Straightness": straightness, "Extent": np.nan_to_num(extent),
+        "MedianSpeed": median_speed, "SpeedP90": speed_p90, "MaxStep": max_step,
+        "SwayAmplitude": amplitude, "Swings": swings, "SwingRate": swing_rate, "SwingCV": swing_cv,
+    }, index=pd.Index(coords.track_ids, name="Track"))
+    return features[features["Frames"] > 0]
+
+
+def classify(features, min_frames=30, max_jump=25.0, max_sway=1.0, max_extent=15.0, min_straightness=0.8,
+             max_swing_cv=0.3, min_swings=6):
+    """Reason why a track is probably no worm (see the list above), or "" for tracks that look like worms."""
+    reasons = pd.Series("", index=features.index, dtype=object)
+    no_sway = features["SwayAmplitude"] < max_sway
+    rules = [
+        (IRREGULAR, (features["Swings"] >= min_swings) & (features["SwingCV"] > max_swing_cv)),
+        (DRIFTING, no_sway & (features["Straightness"] > min_straightness) & (features["Extent"] > max_extent)),
+        (STATIC, no_sway & (features["Extent"] <= max_extent)),
+        (JUMPING, features["MaxStep"] > max_jump),
+        (SHORT, features["Frames"] < min_frames),
+    ]
+    # Later rules take precedence
+    for reason, mask in rules:
+        reasons[mask.to_numpy()] = reason
+    return reasons
+
+
+def mark_rows(reasons, owner, track_ids):
+    """Reasons per row of process_df: a row is marked if all tracks combined into it are (with the first reason)."""
+    members = pd.DataFrame({"Track": np.asarray(owner), "Reason": reasons.reindex(track_ids).fillna("").to_numpy()})
+    members = members[members["Track"] >= 0]
+    return members.groupby("Track")["Reason"].agg(lambda reason: reason.iloc[0] if (reason != "").all() else "")
@@ -0,0 +1,129 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+from track_edits import OperationJournal, read_log, apply_operations
+from processed_output import write_processed
+
+# ------------------ Batch Processing ------------------
+#
+# Headless counterpart of the TrackProcessor: for every video of one or more experiment folders the combine and
+# delete steps recorded during the review are applied to the original "*_tracks.txt" and the same
+# "tracks_processed/<base>_processed.xlsx" as with "Save & Proceed" is written. The steps are taken from the
+# journal ("<base>_tracks.txt.journal.jsonl", a structured edit file with one JSON step per line) or, for videos
+# reviewed with an older version, from "tracks_processed/<base>_log.txt". Videos are processed in parallel in
+# worker processes.
+#
+# Usage: python batch_process.py <folder> [<folder> ...] [--jobs N] [--source auto|journal|log] [--all]
+
+TRACKS_SUFFIX = "_tracks.txt"
+SOURCES = ("auto", "journal", "log")
+
+
+def edit_files(folder, base_name):
+    journal_file = os.path.join(folder, f"{base_name}_tracks.txt.journal.jsonl")
+    log_file = os.path.join(folder, "tracks_processed", f"{base_name}_log.txt")
+    return journal_file, log_file
+
+
+def find_videos(folders, include_unedited=False):
+    """(folder, base name) of every "*_tracks.txt" below the folders, by default only of videos with edits."""
+    videos = []
+    for top in folders:
+        for root, dirs, files in os.walk(top):
+            dirs[:] = sorted(d for d in dirs if d != "tracks_processed")
+            for file in sorted(files):
+                if not file.endswith(TRACKS_SUFFIX):
+                    continue
+                base_name = file[:-len(TRACKS_SUFFIX)]
+                if include_unedited or any(os.path.exists(path) for path in edit_files(root, base_name)):
+                    videos.append((root, base_name))
+    return videos
+
+
+def load_operations(folder, base_name, source="auto"):
+    """Combine and delete steps to apply to the original track file, and where they were read from."""
+    journal_file, log_file = edit_files(folder, base_name)
+    if source in ("auto", "journal") and os.path.exists(journal_file):
+        journal = OperationJournal(journal_file)
+        return journal.base_operations + journal.operations, journal_file
+    if source in ("auto", "log") and os.path.exists(log_file):
+        return read_log(log_file), log_file
+    return [], None
+
+
+def process_video(folder, base_name, source="auto"):
+    """Apply the recorded steps to the track file of one video and write its processed Excel file."""
+    track_file = os.path.join(folder, f"{base_name}{TRACKS_SUFFIX}")
+    process_df = pd.read_csv(track_file, delimiter="\t").rename(columns={"Track ": "Track"}).set_index('Track')
+    operations, edits = load_operations(folder, base_name, source)
+    process_df = apply_operations(process_df, operations)
+    output_file = write_processed(process_df, os.path.join(folder, "tracks_processed"), base_name)
+    return len(operations), edits, output_file
+
+
+def run(videos, source="auto", jobs=None):
+    """Process the videos (in parallel for jobs != 1) and return the number of failed videos."""
+    failed = 0
+
+    def report(video, result=None, error=None):
+        folder, base_name = video
+        if error is not None:
+            print(f"FAILED {os.path.join(folder, base_name)}: {error!r}")
+        else:
+            n_steps, edits, output_file = result
+            print(f"{output_file} ({n_steps} steps from {os.path.basename(edits) if edits else 'no edits'})")
+
+    if jobs == 1:
+        for video in videos:
+            try:
+                report(video, process_video(*video, source))
+            except Exception as e:
+                failed += 1
+                report(video, error=e)
+        return failed
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(process_video, *video, source): video for video in videos}
+        for future in as_completed(futures):
+            try:
+                report(futures[future], future.result())
+            except Exception as e:
+                failed += 1
+                report(futures[future], error=e)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the recorded combine/delete steps to all videos of the "
+                                                 "folders and write the '_processed.xlsx' files without the GUI.")
+    parser.add_argument("folders", nargs="+", help="Experiment folders (searched recursively)")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: all CPU cores)")
+    parser.add_argument("--source", choices=SOURCES, default="auto",
+                        help="Read the steps from the journal, the log or the journal if present (default)")
+    parser.add_argument("--all", action="store_true", help="Also process videos without recorded steps")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the videos and their steps")
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.folders, include_unedited=args.all)
+    print(f"{len(videos)} videos found.")
+    if args.dry_run:
+        for folder, base_name in videos:
+            operations, edits = load_operations(folder, base_name, args.source)
+            print(f"{os.path.join(folder, base_name)}: {len(operations)} steps from {edits or 'no edits'}")
+        return 0
+
+    start = time.perf_counter()
+    failed = run(videos, args.source, args.jobs)
+    print(f"{len(videos) - failed} of {len(videos)} videos processed in {time.perf_counter() - start:.1f} s.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # Worker processes start this script again; in a frozen build they must run their job instead of main()
+    multiprocessing.freeze_support()
+    sys.exit(main())
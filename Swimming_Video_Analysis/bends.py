@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from coords_parser import X, Y
+from track_index import valid_mask
+
+# ------------------ Body Bends ------------------
+#
+# wrMTrck counts body bends from the shape of the worm (bendDetect=2), which is not part of the raw data
+# ("*_tracks_raw.txt" holds the centroid only). A thrashing worm however sways its centroid from one side to the
+# other with every body bend. count_bends removes the drift of the centroid with a moving average over about one
+# stroke, projects the remaining sway onto its main axis and counts a bend every time the sway swings from one side
+# to the other by more than `threshold` pixels (hysteresis, so jitter around the centre is not counted).
+#
+# The tracks combined into one worm are merged into one series first (frames in which several of them were found
+# are averaged), so a bend straddling the gap between two fragments is counted once instead of being lost. All
+# steps work on blocks of worms at once; BendCounter keeps the result of every group of tracks, so after a combine
+# only the new group is counted.
+
+DEFAULT_FPS = 30.0  # Default of wrMTrck_ROI_Batch
+
+
+def frame_rate(track_df):
+    """Frame rate of a video from the #Frames and time(s) columns of its "*_tracks.txt" table."""
+    frames = track_df["#Frames"].to_numpy(dtype=np.float64)
+    time = track_df["time(s)"].to_numpy(dtype=np.float64)
+    rates = frames[time > 0] / time[time > 0]
+    return float(np.median(rates)) if len(rates) else DEFAULT_FPS
+
+
+def _merge_fragments(coords, columns, starts):
+    """X and Y (frames, groups) of the groups of columns beginning at starts, NaN where no track was found.
+
+    Only the frames from the first to the last appearance of any of the tracks are returned.
+    """
+    part = np.asarray(coords.coords[:, columns])
+    valid = valid_mask(part)
+    # Frames before and after all of the tracks add nothing
+    found = np.flatnonzero(valid.any(axis=1))
+    if len(found):
+        part, valid = part[found[0]:found[-1] + 1], valid[found[0]:found[-1] + 1]
+    if len(starts) == len(columns):
+        # Every group is a single track
+        x = np.where(valid, part[:, :, X], np.nan).astype(np.float64)
+        y = np.where(valid, part[:, :, Y], np.nan).astype(np.float64)
+        return x, y
+    counts = np.add.reduceat(valid.astype(np.int32), starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x = np.add.reduceat(np.where(valid, part[:, :, X], 0).astype(np.float64), starts, axis=1) / counts
+        y = np.add.reduceat(np.where(valid, part[:, :, Y], 0).astype(np.float64), starts, axis=1) / counts
+    return x, y
+
+
+def _moving_average(values, found, window):
+    """Centred moving average along the frames over the frames in which the worm was found."""
+    n_frames = len(values)
+    sums = np.zeros((n_frames + 1,) + values.shape[1:])
+    np.cumsum(np.where(found, values, 0), axis=0, out=sums[1:])
+    counts = np.zeros((n_frames + 1,) + values.shape[1:], dtype=np.int32)
+    np.cumsum(found, axis=0, out=counts[1:])
+    half = window // 2
+    low = np.clip(np.arange(n_frames) - half, 0, n_frames)
+    high = np.clip(np.arange(n_frames) + half + 1, 0, n_frames)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[high] - sums[low]) / (counts[high] - counts[low])
+
+
+def _sway(x, y, window):
+    """Sideways sway of the centroid: distance from the moving average along the main axis of the residuals."""
+    found = ~np.isnan(x)
+    dx = x - _moving_average(x, found, window)  # NaN where the worm was not found
+    dy = y - _moving_average(y, found, window)
+
+    # Main axis of the sway per worm (principal component of the residuals)
+    sxx = np.nansum(dx * dx, axis=0)
+    syy = np.nansum(dy * dy, axis=0)
+    sxy = np.nansum(dx * dy, axis=0)
+    angle = 0.5 * np.arctan2(2 * sxy, sxx - syy)
+    return dx * np.cos(angle) + dy * np.sin(angle)
+
+
+def _swings(sway, threshold):
+    """Mask of the frames (after the first) in which the sway swung from one side beyond +-threshold to the other."""
+    side = np.where(sway > threshold, 1, np.where(sway < -threshold, -1, 0)).astype(np.int8)
+    # Carry the last side forward through frames near the centre or without the worm
+    last = np.where(side != 0, np.arange(len(side))[:, np.newaxis], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    side = np.take_along_axis(side, last, axis=0)
+    return (side[1:] != side[:-1]) & (side[:-1] != 0)
+
+
+def _count_swings(sway, threshold):
+    """Number of swings from one side beyond +-threshold to the other per column."""
+    return np.count_nonzero(_swings(sway, threshold), axis=0)
+
+
+def count_bends(coords, owner=None, fps=DEFAULT_FPS, window=31, threshold=2.0, block=64):
+    """#Frames, time(s), Bends and BBPS of every worm, indexed by track.
+
+    owner holds the track every column of coords belongs to (see track_edits.replay_owner, -1 = deleted); by
+    default every track is counted on its own.
+    """
+    owner = np.asarray(coords.track_ids if owner is None else owner)
+    keep = np.flatnonzero(owner >= 0)
+    tracks, inverse = np.unique(owner[keep], return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    columns, groups = keep[order], inverse[order]
+    group_starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else groups
+
+    frames = np.zeros(len(tracks), dtype=np.int64)
+    bends = np.zeros(len(tracks), dtype=np.int64)
+    for first in range(0, len(tracks), block):
+        last = min(first + block, len(tracks))
+        start = group_starts[first]
+        end = group_starts[last] if last < len(tracks) else len(columns)
+        x, y = _merge_fragments(coords, columns[start:end], group_starts[first:last] - start)
+        frames[first:last] = np.count_nonzero(~np.isnan(x), axis=0)
+        bends[first:last] = _count_swings(_sway(x, y, window), threshold)
+
+    time = frames / fps
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bbps = np.where(time > 0, bends / time, np.nan)
+    return pd.DataFrame({"#Frames": frames, "time(s)": time, "Bends": bends, "BBPS": bbps},
+                        index=pd.Index(tracks, name="Track"))
+
+
+def sway_features(coords, window=31, threshold=2.0, block=64):
+    """Sway amplitude (standard deviation in pixels), number of swings and the coefficient of variation of the
+    frames between swings of every track (column) of coords."""
+    n_tracks = coords.n_tracks
+    amplitude = np.zeros(n_tracks)
+    swings = np.zeros(n_tracks, dtype=np.int64)
+    interval_cv = np.full(n_tracks, np.nan)
+    for first in range(0, n_tracks, block):
+        columns = np.arange(first, min(first + block, n_tracks))
+        x, y = _merge_fragments(coords, columns, np.arange(len(columns)))
+        sway = _sway(x, y, window)
+        found = np.count_nonzero(~np.isnan(sway), axis=0)
+        amplitude[columns] = np.sqrt(np.nansum(sway * sway, axis=0) / np.maximum(found, 1))
+        changes = _swings(sway, threshold)
+        swings[columns] = np.count_nonzero(changes, axis=0)
+
+        # Frames between consecutive swings of the same track
+        column, row = np.nonzero(changes.T)
+        same = column[1:] == column[:-1]
+        intervals, owner = np.diff(row)[same].astype(np.float64), column[1:][same]
+        count = np.bincount(owner, minlength=len(columns))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(owner, intervals, minlength=len(columns)) / count
+            variance = np.bincount(owner, intervals ** 2, minlength=len(columns)) / count - mean ** 2
+            interval_cv[columns] = np.where(count >= 2, np.sqrt(np.maximum(variance, 0)) / mean, np.nan)
+    return amplitude, swings, interval_cv
+
+
+class BendCounter:
+    """count_bends for the combined tracks of a video, counting every group of tracks only once."""
+
+    def __init__(self, coords, fps=DEFAULT_FPS, **options):
+        self.coords = coords  # TrackCoordinates
+        self.fps = fps
+        self.options = options
+        self.results = {}  # Columns of a group -> (#Frames, time(s), Bends, BBPS)
+
+    def table(self, owner):
+        """count_bends(coords, owner) with the results of groups counted before reused."""
+        owner = np.asarray(owner)
+        members = {}
+        for column in np.flatnonzero(owner >= 0):
+            members.setdefault(int(owner[column]), []).append(column)
+        keys = {track: tuple(columns) for track, columns in members.items()}
+
+        missing = [key for key in keys.values() if key not in self.results]
+        if missing:
+            # Count the new groups in one pass, each group labelled with its first column
+            new_owner = np.full(len(owner), -1, dtype=np.int64)
+            for key in missing:
+                new_owner[list(key)] = key[0]
+            counted = count_bends(self.coords, new_owner, self.fps, **self.options)
+            for key in missing:
+                self.results[key] = tuple(counted.loc[key[0]])
+
+        tracks = sorted(keys)
+        values = [self.results[keys[track]] for track in tracks]
+        table = pd.DataFrame(values, columns=["#Frames", "time(s)", "Bends", "BBPS"],
+                             index=pd.Index(tracks, name="Track"))
+        return table.astype({"#Frames": np.int64, "Bends": np.int64})
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from coords_parser import X, Y
+from track_index import valid_mask
+
+# ------------------ Collision Detector ------------------
+#
+# When two worms touch, wrMTrck sees one object: both tracks end and the pair goes on as one new track until the
+# worms separate and get new tracks again (or one of the tracks simply carries both worms for a while). The shared
+# track produces wrong Bends and has to be deleted. detect_collisions looks at every start and end of a track and
+# at the tracks found within radius pixels of it in the frame before the start or after the end:
+#
+#   - a track starting where two or more tracks end (within window frames): the tracks merged into a new track
+#   - a track ending where two or more tracks start: the track split into the new tracks
+#   - a track ending next to a track that goes on: the track merged into the other one
+#   - a track starting next to a track that was there before: the track split off the other one
+#
+# A track that starts with a merge and ends with a split is a shared track and is proposed for deletion. The
+# neighbours of all starts and ends are found in blocks of events at once from the coordinate array, so a video is
+# analysed without a loop over its frames.
+
+MERGE = "merge"
+SPLIT = "split"
+
+
+def _neighbours(coords, frames, xy, columns, radius, block=256):
+    """(event, column, distance) of the tracks found within radius of xy[event] in frames[event], except columns."""
+    events, found, distances = [], [], []
+    for first in range(0, len(frames), block):
+        part = slice(first, first + block)
+        around = np.asarray(coords.coords[frames[part]])  # (events, tracks, 3)
+        distance = np.hypot(around[:, :, X] - xy[part, np.newaxis, 0], around[:, :, Y] - xy[part, np.newaxis, 1])
+        near = valid_mask(around) & (distance <= radius)
+        near[np.arange(len(near)), columns[part]] = False
+        event, column = np.nonzero(near)
+        events.append(event + first)
+        found.append(column)
+        distances.append(distance[event, column])
+    if not events:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(events), np.concatenate(found), np.concatenate(distances)
+
+
+def _group(events, columns, distances, n_events):
+    """Columns around every event, nearest first."""
+    order = np.lexsort((distances, events))
+    bounds = np.searchsorted(events[order], np.arange(n_events + 1))
+    return [columns[order[bounds[i]:bounds[i + 1]]] for i in range(n_events)]
+
+
+def detect_collisions(track_index, radius=40.0, window=5):
+    """Merge and split events of all tracks of a TrackIndex as DataFrame sorted by frame.
+
+    Columns: Frame, Event (MERGE or SPLIT), Track (the merged track, or the track that split), Others (tracks that
+    merged into or split from it), New (Track starts with the merge or ends with the split), X, Y.
+    """
+    coords = track_index.coords
+    track_ids = np.asarray(coords.track_ids)
+    first, last = track_index.first_frame, track_index.last_frame
+    present = np.flatnonzero(track_index.present)
+    rows = []
+
+    # Tracks starting next to tracks of the frame before
+    starting = present[first[present] > 0]
+    start_xy = track_index.point_xy[track_index.point_offsets[starting]].astype(np.float64)
+    events, columns, distances = _neighbours(coords, first[starting] - 1, start_xy, starting, radius)
+    for i, around in enumerate(_group(events, columns, distances, len(starting))):
+        if not len(around):
+            continue
+        frame = int(first[starting[i]])
+        leaving = around[last[around] <= frame - 1 + window]
+        if len(leaving) >= 2:
+            rows.append((frame, MERGE, track_ids[starting[i]], tuple(track_ids[np.sort(leaving)]), True, *start_xy[i]))
+        elif not len(leaving):
+            rows.append((frame, SPLIT, track_ids[around[0]], (track_ids[starting[i]],), False, *start_xy[i]))
+
+    # Tracks ending next to tracks of the frame after
+    ending = present[last[present] < coords.n_frames - 1]
+    end_xy = track_index.point_xy[track_index.point_offsets[ending + 1] - 1].astype(np.float64)
+    events, columns, distances = _neighbours(coords, last[ending] + 1, end_xy, ending, radius)
+    for i, around in enumerate(_group(events, columns, distances, len(ending))):
+        if not len(around):
+            continue
+        frame = int(last[ending[i]]) + 1
+        arriving = around[first[around] >= frame - window]
+        if len(arriving) >= 2:
+            rows.append((frame, SPLIT, track_ids[ending[i]], tuple(track_ids[np.sort(arriving)]), True, *end_xy[i]))
+        elif not len(arriving):
+            rows.append((frame, MERGE, track_ids[around[0]], (track_ids[ending[i]],), False, *end_xy[i]))
+
+    events = pd.DataFrame(rows, columns=["Frame", "Event", "Track", "Others", "New", "X", "Y"])
+    events["Others"] = events["Others"].map(lambda tracks: tuple(int(track) for track in tracks))
+    return events.astype({"Frame": np.int64, "Track": np.int64}).sort_values(["Frame", "Track"], kind="stable") \
+        .reset_index(drop=True)
+
+
+def shared_tracks(events):
+    """Tracks that start with a merge and end with a split (two worms on one track), with both events."""
+    merges = events[(events["Event"] == MERGE) & events["New"]].drop_duplicates("Track").set_index("Track")
+    splits = events[(events["Event"] == SPLIT) & events["New"]].drop_duplicates("Track").set_index("Track")
+    shared = merges[["Frame", "Others"]].join(splits[["Frame", "Others"]], how="inner", lsuffix=" merged",
+                                              rsuffix=" split")
+    return shared.rename(columns={"Others merged": "Merged", "Others split": "Split"}).sort_values("Frame merged")
+
+
+class ReviewItem:
+    """One line of the review list: a shared track to delete or a single merge/split event to look at."""
+
+    def __init__(self, text, frame, xy, delete=None):
+        self.text = text
+        self.frame = frame
+        self.xy = xy
+        self.delete = delete or []  # Tracks proposed for deletion
+
+
+def review_items(events, deleted=()):
+    """Shared tracks (proposed for deletion) first, then the other events by frame; tracks in deleted are left out."""
+    events = events[~events["Track"].isin(list(deleted))]
+    shared = shared_tracks(events)
+    items = []
+    for track, row in shared.iterrows():
+        merge = events[(events["Track"] == track) & (events["Event"] == MERGE)].iloc[0]
+        items.append(ReviewItem(f"Delete {track}: {_tracks(row['Merged'])} merged at frame {row['Frame merged']}, "
+                                f"split into {_tracks(row['Split'])} at frame {row['Frame split']}",
+                                int(row["Frame merged"]), (merge["X"], merge["Y"]), [int(track)]))
+
+    for _, event in events[~(events["New"] & events["Track"].isin(shared.index))].iterrows():
+        if event["Event"] == MERGE and event["New"]:
+            text = f"Frame {event['Frame']}: {_tracks(event['Others'])} merged into new track {event['Track']}"
+        elif event["Event"] == MERGE:
+            text = f"Frame {event['Frame']}: {_tracks(event['Others'])} merged into {event['Track']}"
+        elif event["New"]:
+            text = f"Frame {event['Frame']}: {event['Track']} split into {_tracks(event['Others'])}"
+        else:
+            text = f"Frame {event['Frame']}: {_tracks(event['Others'])} split off {event['Track']}"
+        items.append(ReviewItem(text, int(event["Frame"]), (event["X"], event["Y"])))
+    return items
+
+
+def _tracks(tracks):
+    return ",".join(map(str, tracks))
@@ -0,0 +1,182 @@
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# ------------------ Raw Coordinate Parser ------------------
+#
+# wrMTrck writes the X-&Y-Coordinates ("rawData" option) into "*_tracks_raw.txt". Every block of 75 tracks
+# is introduced by a line "Tracks <a> to <b>" followed by a "Frame X<a> Y<a> Flag<a> ..." header and one
+# tab separated row per frame. The parser below reads the file once, hands every block to the C parser of
+# pandas and copies the values into one array of shape (frames, tracks, 3) holding X, Y and Flag.
+#
+# The parsed array is cached beside the text file as "*_tracks_raw.coords.npy" together with a small JSON header
+# ("*_tracks_raw.coords.json") holding the track numbers and the size/mtime of the source file. Reopening a
+# video memory-maps the cache instead of parsing the text file again; the cache is rebuilt once the source changes.
+
+X, Y, FLAG = 0, 1, 2
+
+
+class TrackCoordinates:
+    """X-, Y-Coordinates and Flags of all tracks of one video as array of shape (frames, tracks, 3)."""
+
+    def __init__(self, coords, track_ids, frame_numbers):
+        self.coords = coords                # float32, NaN where a track has no value in a frame
+        self.track_ids = track_ids          # wrMTrck track number of every column along axis 1
+        self.frame_numbers = frame_numbers  # content of the "Frame" column (row position = frame index)
+        self.track_pos = {int(track): pos for pos, track in enumerate(track_ids)}
+
+    @property
+    def n_frames(self):
+        return self.coords.shape[0]
+
+    @property
+    def n_tracks(self):
+        return self.coords.shape[1]
+
+    def has_track(self, track):
+        return int(track) in self.track_pos
+
+    def track(self, track):
+        """Return the (frames, 3) X/Y/Flag series of one track."""
+        return self.coords[:, self.track_pos[int(track)], :]
+
+    def to_dataframe(self):
+        """Return the coordinates in the layout of the former coords_df ("Frame", "X1", "Y1", "Flag1", ...)."""
+        values = np.nan_to_num(self.coords.reshape(self.n_frames, -1), nan=0).astype(int)
+        columns = [f"{name}{track}" for track in self.track_ids for name in ("X", "Y", "Flag")]
+        df = pd.DataFrame(values, columns=columns)
+        df.insert(0, "Frame", self.frame_numbers)
+        return df
+
+
+def _parse_block(lines, n_tracks):
+    """Parse the data rows of one block into an array of shape (rows, n_tracks, 3)."""
+    width = 1 + 3 * n_tracks
+    text = io.StringIO("".join(lines))
+    options = dict(sep="\t", header=None, names=range(width), usecols=range(width), engine="c",
+                   skip_blank_lines=True)
+    try:
+        values = pd.read_csv(text, dtype=np.float64, **options).to_numpy()
+    except ValueError:
+        # Non-numeric entries in the block: fall back to coercing them to NaN
+        text.seek(0)
+        values = pd.read_csv(text, dtype=str, **options).apply(pd.to_numeric, errors="coerce").to_numpy(np.float64)
+    return values[:, 0], values[:, 1:].reshape(len(values), n_tracks, 3)
+
+
+def parse_tracks_raw(coords_file):
+    """Read a "*_tracks_raw.txt" file into a TrackCoordinates object."""
+    blocks = []  # (track_start, track_end, frame column, block array)
+    track_range = None
+    current_lines = []
+
+    def close_block():
+        if track_range is not None and current_lines:
+            frames, values = _parse_block(current_lines, track_range[1] - track_range[0] + 1)
+            blocks.append((track_range[0], track_range[1], frames, values))
+
+    with open(coords_file, "r") as file:
+        for line in file:
+            if line.startswith("Tracks"):
+                close_block()
+                current_lines = []
+                track_start, track_end = (int(value) for value in line.split()[1:4:2])
+                track_range = (track_start, track_end)
+            elif line.startswith("Frame"):
+                if track_range is None:
+                    # Files with less than 76 tracks may come without "Tracks a to b" line
+                    track_range = (1, (len(line.rstrip("\r\n").split("\t")) - 1) // 3)
+            elif line.strip():
+                current_lines.append(line)
+        close_block()
+
+    if not blocks:
+        raise ValueError(f"No coordinate data found in {coords_file}")
+
+    # Blocks are aligned by row just like the former merge on the index, so keep the common frames only
+    n_frames = min(len(block[2]) for block in blocks)
+    n_tracks = sum(block[1] - block[0] + 1 for block in blocks)
+    coords = np.empty((n_frames, n_tracks, 3), dtype=np.float32)
+    track_ids = np.empty(n_tracks, dtype=np.int64)
+
+    pos = 0
+    for track_start, track_end, _, values in blocks:
+        width = track_end - track_start + 1
+        coords[:, pos:pos + width, :] = values[:n_frames]
+        track_ids[pos:pos + width] = np.arange(track_start, track_end + 1)
+        pos += width
+
+    frame_numbers = np.nan_to_num(blocks[0][2][:n_frames], nan=0).astype(int)
+    return TrackCoordinates(coords, track_ids, frame_numbers)
+
+
+# ------------------ Coordinate Cache ------------------
+
+CACHE_VERSION = 1
+
+
+def cache_paths(coords_file):
+    """Return the paths of the cached array and its JSON header for a "*_tracks_raw.txt" file."""
+    stem = os.path.splitext(coords_file)[0]
+    return f"{stem}.coords.npy", f"{stem}.coords.json"
+
+
+def source_fingerprint(coords_file):
+    stat = os.stat(coords_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_cache(coords_file):
+    """Memory-map the cached coordinates, or return None if the cache is missing or outdated."""
+    array_file, header_file = cache_paths(coords_file)
+    try:
+        with open(header_file, "r") as file:
+            header = json.load(file)
+        if header.get("version") != CACHE_VERSION or header.get("source") != source_fingerprint(coords_file):
+            return None
+        coords = np.load(array_file, mmap_mode="r")
+        if coords.shape != tuple(header["shape"]):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return TrackCoordinates(coords, np.asarray(header["track_ids"], dtype=np.int64),
+                            np.asarray(header["frame_numbers"], dtype=int))
+
+
+def write_cache(coords_file, coords):
+    """Write the cache of a parsed file. The header is written last, so an interrupted write is never used."""
+    array_file, header_file = cache_paths(coords_file)
+    header = {
+        "version": CACHE_VERSION,
+        "source": source_fingerprint(coords_file),
+        "shape": list(coords.coords.shape),
+        "track_ids": coords.track_ids.tolist(),
+        "frame_numbers": coords.frame_numbers.tolist(),
+    }
+    if os.path.exists(header_file):
+        os.remove(header_file)
+    with open(array_file + ".tmp", "wb") as file:
+        np.save(file, coords.coords)
+    os.replace(array_file + ".tmp", array_file)
+    with open(header_file + ".tmp", "w") as file:
+        json.dump(header, file)
+    os.replace(header_file + ".tmp", header_file)
+
+
+def load_tracks_raw(coords_file, use_cache=True):
+    """Load a "*_tracks_raw.txt" file from its cache if it is up to date, otherwise parse it and write the cache."""
+    if use_cache:
+        coords = read_cache(coords_file)
+        if coords is not None:
+            return coords
+
+    coords = parse_tracks_raw(coords_file)
+    if use_cache:
+        try:
+            write_cache(coords_file, coords)
+        except OSError as e:
+            # A read-only folder only costs the speed-up on the next load
+            print(f"Could not write coordinate cache for {coords_file}: {e}")
+    return coords
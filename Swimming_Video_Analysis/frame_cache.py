@@ -0,0 +1,183 @@
+import threading
+from collections import OrderedDict
+import cv2 as cv
+
+# ------------------ Decoded Frame Cache ------------------
+#
+# Seeking in JPEG-compressed AVIs means decoding from the last keyframe, which made every slider tick, pan drag
+# and <Configure> event re-decode the current frame. FrameSource keeps decoded frames in a memory bounded LRU
+# cache and decodes the frames around the slider position sequentially in a background thread, which uses its
+# own cv.VideoCapture so that the capture of the GUI thread is never shared between threads.
+# If a SeekIndex of the video is available, frames are read directly from their byte offsets instead.
+
+
+class FrameCache:
+    """Thread-safe LRU cache of decoded frames, evicting the least recently used frames above max_bytes."""
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, index):
+        with self._lock:
+            return index in self._frames
+
+    def __len__(self):
+        return len(self._frames)
+
+    def get(self, index):
+        """Return the cached frame or None, counting hits and misses."""
+        with self._lock:
+            frame = self._frames.get(index)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(index)
+            self.hits += 1
+            return frame
+
+    def put(self, index, frame):
+        with self._lock:
+            if index in self._frames:
+                self._frames.move_to_end(index)
+                return
+            self._frames[index] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"frames": len(self._frames), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+class FrameSource:
+    """Decoded frames of one video, served from a FrameCache and filled ahead of the requested position."""
+
+    def __init__(self, capture, filename, cache=None, read_ahead=15, read_behind=5, max_grab=10, seek_index=None):
+        self.capture = capture  # cv.VideoCapture of the GUI thread (VideoPlayer.vidFile)
+        self.filename = filename
+        self.seek_index = seek_index
+        self._index_file = seek_index.open() if seek_index is not None else None
+        self.cache = cache if cache is not None else FrameCache()
+        self.read_ahead = read_ahead
+        self.read_behind = read_behind
+        self.max_grab = max_grab  # Frames skipped by grab() instead of seeking (e.g. playback falling behind)
+        self.num_frames = int(capture.get(cv.CAP_PROP_FRAME_COUNT))
+        self._next_index = None  # Frame the GUI capture decodes next without seeking
+
+        self._target = None     # Position handed to the read-ahead thread
+        self._requested = None  # Last position passed to request()
+        self._closed = False
+        self._wakeup = threading.Condition()
+        self._thread = None
+        if read_ahead or read_behind:
+            self._thread = threading.Thread(target=self._read_ahead_loop, name="frame-read-ahead", daemon=True)
+            self._thread.start()
+
+    def read(self, index):
+        """Return the decoded BGR frame at index, or None if it cannot be read."""
+        frame = self.cache.get(index)
+        if frame is None and self.seek_index is not None:
+            frame = self.seek_index.read(self._index_file, index)
+            if frame is None:
+                return None
+            self.cache.put(index, frame)
+        elif frame is None:
+            if self._next_index is not None and 0 < index - self._next_index <= self.max_grab:
+                for _ in range(index - self._next_index):
+                    self.capture.grab()
+            elif self._next_index != index:
+                self.capture.set(cv.CAP_PROP_POS_FRAMES, index)
+            ret, frame = self.capture.read()
+            self._next_index = index + 1 if ret else None
+            if not ret:
+                return None
+            self.cache.put(index, frame)
+        self.request(index)
+        return frame
+
+    def request(self, index):
+        """Move the read-ahead window to index."""
+        with self._wakeup:
+            if self._requested != index:
+                self._requested = index
+                self._target = index
+                self._wakeup.notify()
+
+    def close(self):
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._index_file is not None:
+            self._index_file.close()
+        self.cache.clear()
+
+    def _read_ahead_loop(self):
+        if self.seek_index is not None:
+            capture = _IndexedCapture(self.seek_index)
+        else:
+            capture = cv.VideoCapture(self.filename)
+        position = None  # Frame the read-ahead capture decodes next
+        try:
+            while True:
+                with self._wakeup:
+                    while not self._closed and self._target is None:
+                        self._wakeup.wait()
+                    if self._closed:
+                        return
+                    target = self._target
+                    self._target = None
+
+                first = max(0, target - self.read_behind)
+                last = min(self.num_frames - 1, target + self.read_ahead)
+                for index in range(first, last + 1):
+                    with self._wakeup:
+                        if self._closed or self._target is not None:
+                            break
+                    if index in self.cache:
+                        continue
+                    if position != index:
+                        capture.set(cv.CAP_PROP_POS_FRAMES, index)
+                    ret, frame = capture.read()
+                    if not ret:
+                        position = None
+                        break
+                    position = index + 1
+                    self.cache.put(index, frame)
+        finally:
+            capture.release()
+
+
+class _IndexedCapture:
+    """Minimal cv.VideoCapture replacement reading frames through a SeekIndex."""
+
+    def __init__(self, seek_index):
+        self.seek_index = seek_index
+        self.file = seek_index.open()
+        self.position = 0
+
+    def set(self, prop, value):
+        if prop == cv.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+
+    def read(self):
+        frame = self.seek_index.read(self.file, self.position)
+        self.position += 1
+        return frame is not None, frame
+
+    def release(self):
+        self.file.close()
@@ -0,0 +1,131 @@
+import time
+from contextlib import contextmanager
+import numpy as np
+import cv2 as cv
+from PIL import Image
+
+# ------------------ Frame Renderer ------------------
+#
+# Decoding and rendering of a frame are separated: FrameRenderer keeps the current decoded frame as RGB image
+# together with a pyramid of downscaled copies. Panning and zooming only re-render the visible viewport from the
+# level closest to (and not below) the displayed scale, so they never touch the video decoder.
+#
+# The viewport is computed with one affine transform (scale of base_scale * zoom_level and pan offset) applied
+# to the pyramid level by cv.warpAffine, so only the visible pixels are resampled and areas outside of the frame
+# are filled in the same pass. QUALITY_FAST is used while the slider or the image is dragged, QUALITY_HIGH once
+# the input settles. The viewport is clipped to the label showing it (VIEW_SIZE), so a zoomed frame only costs the
+# pixels on screen.
+
+QUALITY_FAST = cv.INTER_LINEAR
+QUALITY_HIGH = cv.INTER_CUBIC
+VIEW_SIZE = (800, 600)  # Width and height of the image label of the VideoPlayer
+
+
+class StageTimer:
+    """Collects the duration of named stages in milliseconds."""
+
+    def __init__(self):
+        self.timings = {}
+
+    def reset(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    def report(self):
+        return ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.timings.items())
+
+
+class FrameRenderer:
+    """Renders the viewport of the current frame for the zoom and pan settings of the VideoPlayer."""
+
+    def __init__(self, min_level_size=256):
+        self.min_level_size = min_level_size
+        self.frame_number = None
+        self.levels = []  # (scale, RGB array) from full resolution downwards
+        self.origin = (0, 0)  # Position of the top left pixel of the last viewport in the zoomed frame
+        self.timer = StageTimer()
+
+    @property
+    def has_frame(self):
+        return bool(self.levels)
+
+    @property
+    def size(self):
+        """Width and height of the full resolution frame."""
+        height, width = self.levels[0][1].shape[:2]
+        return width, height
+
+    def clear(self):
+        self.frame_number = None
+        self.levels = []
+
+    def set_frame(self, frame_number, frame):
+        """Store a decoded BGR frame and build its pyramid."""
+        with self.timer.stage("convert"):
+            rgb = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+        with self.timer.stage("pyramid"):
+            levels = [(1.0, rgb)]
+            while min(levels[-1][1].shape[:2]) >= 2 * self.min_level_size:
+                scale, image = levels[-1]
+                levels.append((scale / 2, cv.resize(image, None, fx=0.5, fy=0.5, interpolation=cv.INTER_AREA)))
+            self.levels = levels
+        self.frame_number = frame_number
+
+    def level_for(self, scale):
+        """Return the smallest pyramid level with at least the requested scale."""
+        for level_scale, image in reversed(self.levels):
+            if level_scale >= scale:
+                return level_scale, image
+        return self.levels[0]
+
+    @staticmethod
+    def crop(image, x, y, width, height):
+        """Crop without resampling, padding areas outside of the image with black."""
+        if 0 <= x and 0 <= y and x + width <= image.shape[1] and y + height <= image.shape[0]:
+            return image[y:y + height, x:x + width]
+        viewport = np.zeros((height, width, 3), dtype=image.dtype)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, image.shape[1]), min(y + height, image.shape[0])
+        if x0 < x1 and y0 < y1:
+            viewport[y0 - y:y1 - y, x0 - x:x1 - x] = image[y0:y1, x0:x1]
+        return viewport
+
+    def render(self, base_scale, zoom_level, pan_x, pan_y, quality=QUALITY_HIGH, max_size=None):
+        """Return the viewport as PIL image: the frame scaled by base_scale * zoom_level, cropped at the pan offset.
+
+        The viewport has the size of the frame scaled by base_scale, clipped around its centre to max_size (width,
+        height), the part a label of that size shows. Areas outside of the frame stay black.
+        """
+        width, height = self.size
+        view_width, view_height = int(width * base_scale), int(height * base_scale)
+        zoomed_width, zoomed_height = int(view_width * zoom_level), int(view_height * zoom_level)
+        if max_size is not None:
+            clipped_width, clipped_height = min(view_width, max_size[0]), min(view_height, max_size[1])
+            pan_x += (view_width - clipped_width) // 2
+            pan_y += (view_height - clipped_height) // 2
+            view_width, view_height = clipped_width, clipped_height
+        self.origin = (pan_x, pan_y)
+
+        with self.timer.stage("resample"):
+            level_scale, level = self.level_for(zoomed_width / width)
+            fx = level.shape[1] / zoomed_width
+            fy = level.shape[0] / zoomed_height
+            if fx == fy == 1:
+                viewport = self.crop(level, pan_x, pan_y, view_width, view_height)
+                return Image.fromarray(viewport)
+            # Maps every viewport pixel (centre) to the pyramid level
+            matrix = np.array([[fx, 0, (pan_x + 0.5) * fx - 0.5],
+                               [0, fy, (pan_y + 0.5) * fy - 0.5]])
+            viewport = cv.warpAffine(level, matrix, (view_width, view_height),
+                                     flags=quality | cv.WARP_INVERSE_MAP,
+                                     borderMode=cv.BORDER_CONSTANT, borderValue=(0, 0, 0))
+        with self.timer.stage("compose"):
+            img = Image.fromarray(viewport)
+        return img
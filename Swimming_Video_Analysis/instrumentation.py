@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+import numpy as np
+
+# ------------------ Instrumentation ------------------
+#
+# A slow click can come from Excel I/O, parsing the coordinates, decoding frames or redrawing the pandastable.
+# The GUI wraps its operations (loading a video, showing a frame, combine/delete/undo, saving, the postprocessing)
+# and their steps in timers of the module-level Instruments: every timer writes one line to a JSONL log
+# (operation, duration, the enclosing operation of the same thread and fields such as the video or frame) and its
+# duration to the last window durations of the operation, from which the timing panel shows the p50/p95 latency.
+#
+# Recording is off unless the environment variable SWIMMING_TIMING_LOG names a log file or it is switched on in
+# the timing panel. While it is off, timer() returns one shared no-op context manager and a @timed method only
+# checks a flag, so the instrumented code runs at practically the same speed.
+
+TIMING_LOG_ENV = "SWIMMING_TIMING_LOG"
+DEFAULT_TIMING_LOG = os.path.join(os.path.expanduser("~"), "swimming_video_analysis.timing.jsonl")
+
+
+class _NullTimer:
+    """Timer used while recording is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, instruments, name, fields):
+        self.instruments = instruments
+        self.name = name
+        self.fields = fields
+        self.parent = None
+        self.start = None
+
+    def __enter__(self):
+        stack = self.instruments._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        stack = self.instruments._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.instruments.record(self.name, ms, self.fields, self.parent)
+        return False
+
+
+class Instruments:
+    """Timers and counters of the operations, written to a JSONL log and summarised as percentiles."""
+
+    def __init__(self, window=1000, flush_every=50):
+        self.enabled = False
+        self.window = window  # Durations kept per operation for the percentiles
+        self.flush_every = flush_every  # Lines written before the log is flushed
+        self.log_path = None
+        self.durations = {}
+        self.counters = {}
+        self._log = None
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, log_path=None):
+        """Start recording, appending to log_path (no log without one).
+
+        Durations and counters of an earlier recording are dropped, so the percentiles and the counters written to
+        the log only cover the current one.
+        """
+        with self._lock:
+            if not self.enabled:
+                self.durations = {}
+                self.counters = {}
+            if log_path != self.log_path:
+                self._close_log()
+                self.log_path = log_path
+            if self.log_path is not None and self._log is None:
+                try:
+                    self._log = open(self.log_path, "a", encoding="utf-8")
+                except OSError as e:
+                    print(f"Could not open the timing log {self.log_path}: {e}")
+                    self.log_path = None
+            self.enabled = True
+
+    def disable(self):
+        """Stop recording; the counters are written to the log and the log is closed.
+
+        The durations stay available to summary() until recording starts again.
+        """
+        with self._lock:
+            self.enabled = False
+            self._close_log()
+
+    def timer(self, name, **fields):
+        """Context manager timing one operation; fields are written to its log line."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, fields)
+
+    def annotate(self, **fields):
+        """Add fields to the innermost running timer of this thread."""
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].fields.update(fields)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name, ms, fields=None, parent=None):
+        """Add a duration measured elsewhere (e.g. in a worker process) or by a timer."""
+        if not self.enabled:
+            return
+        with self._lock:
+            durations = self.durations.get(name)
+            if durations is None:
+                durations = self.durations[name] = deque(maxlen=self.window)
+            durations.append(ms)
+            if self._log is not None:
+                line = {"time": round(time.time(), 3), "op": name, "ms": round(ms, 3), "parent": parent,
+                        "thread": threading.current_thread().name}
+                line.update(fields or {})
+                self._log.write(json.dumps(line, default=str) + "\n")
+                self._unflushed += 1
+                if self._unflushed >= self.flush_every:
+                    self._log.flush()
+                    self._unflushed = 0
+
+    def summary(self):
+        """{operation: {count, p50, p95, max}} over the last window durations of every operation (ms)."""
+        with self._lock:
+            durations = {name: np.array(values) for name, values in self.durations.items() if values}
+        return {name: {"count": len(values), "p50": float(np.percentile(values, 50)),
+                       "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+                for name, values in sorted(durations.items())}
+
+    def reset(self):
+        with self._lock:
+            self.durations = {}
+            self.counters = {}
+
+    def flush(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+                self._unflushed = 0
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _close_log(self):
+        if self._log is None:
+            return
+        if self.counters:
+            self._log.write(json.dumps({"time": round(time.time(), 3), "op": "counters", **self.counters}) + "\n")
+        self._log.close()
+        self._log = None
+        self._unflushed = 0
+
+
+# Instruments of the application
+instruments = Instruments()
+if os.environ.get(TIMING_LOG_ENV):
+    instruments.enable(os.environ[TIMING_LOG_ENV])
+
+
+def timed(name):
+    """Decorator timing every call of a function or method as operation name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return func(*args, **kwargs)
+            with _Timer(instruments, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_call(func, *args):
+    """(func(*args), duration in ms), for jobs timed in worker processes."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
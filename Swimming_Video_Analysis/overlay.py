@@ -0,0 +1,107 @@
+import numpy as np
+import cv2 as cv
+
+from coords_parser import X, Y
+from track_index import valid_mask
+
+# ------------------ Track Overlay ------------------
+#
+# Marks every track found in the current frame with a ring, optionally with a trail fading over the last
+# trail_length frames. Rings and trail dots are stamped for all tracks at once: the pixel offsets of one stamp
+# are added to all positions and the colours are written with one fancy-indexed assignment (or blend for trails). The overlay is drawn
+# into the decoded frame before FrameRenderer builds its pyramid, so panning and zooming reuse it; the composed
+# frame is cached until the frame, the settings or the track status change.
+
+NORMAL, COMBINED, DELETED = 0, 1, 2
+COLOURS = np.array([[80, 220, 80],     # BGR: tracks in the table
+                    [0, 165, 255],     # combined with other tracks
+                    [60, 60, 230]],    # deleted
+                   dtype=np.uint16)
+
+
+def stamp_offsets(inner, outer):
+    """(k, 2) pixel offsets of a ring between the radii inner and outer (a disk for inner < 0)."""
+    reach = int(np.ceil(outer))
+    dy, dx = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    distance = np.hypot(dx, dy)
+    keep = (distance <= outer) & (distance > inner)
+    return np.column_stack((dx[keep], dy[keep]))
+
+
+class TrackOverlay:
+    """Rings, trails and (optional) numbers of all tracks of the current frame."""
+
+    def __init__(self, coords, marker_radius=14, thickness=3):
+        self.coords = coords  # TrackCoordinates
+        self.show_tracks = False
+        self.show_ids = False
+        self.trail_length = 0
+        self.status = np.zeros(coords.n_tracks, dtype=np.int8)
+        self.ring = stamp_offsets(marker_radius - thickness / 2, marker_radius + thickness / 2)
+        self.dot = stamp_offsets(-1, thickness / 2 + 0.5)
+        self._cache_key = None
+        self._cache = None
+
+    @property
+    def enabled(self):
+        return self.show_tracks or self.trail_length > 0
+
+    def invalidate(self):
+        self._cache_key = None
+        self._cache = None
+
+    def set_owner(self, owner):
+        """Colour the tracks according to replay_owner: deleted, combined or unchanged."""
+        track_ids = self.coords.track_ids
+        merged = owner != track_ids
+        targets = np.isin(track_ids, owner[merged & (owner >= 0)])
+        self.status = np.where(owner < 0, DELETED, np.where(merged | targets, COMBINED, NORMAL)).astype(np.int8)
+        self.invalidate()
+
+    def compose(self, frame, frame_number):
+        """Return a copy of the BGR frame with the overlay drawn into it."""
+        key = (frame_number, self.show_tracks, self.show_ids, self.trail_length)
+        if key == self._cache_key:
+            return self._cache
+
+        composed = frame.copy()
+        target = composed.reshape(-1, 3)
+
+        if self.trail_length > 0:
+            first = max(0, frame_number - self.trail_length + 1)
+            window = np.asarray(self.coords.coords[first:frame_number + 1])
+            ages, tracks = np.nonzero(valid_mask(window))
+            flat, keep = self._stamp(self.dot, window[ages, tracks][:, [X, Y]], frame.shape)
+            # Older dots fade out (alpha in 1/256); dots are ordered from old to new, so where they overlap the
+            # assignment of the newest one wins
+            alpha = np.repeat(((ages + 1) * 204 // len(window)).astype(np.uint16), len(self.dot))[keep, np.newaxis]
+            colour = np.repeat(COLOURS[self.status[tracks]], len(self.dot), axis=0)[keep]
+            target[flat] = ((target[flat] * (256 - alpha) + colour * alpha) >> 8).astype(np.uint8)
+
+        if self.show_tracks:
+            current = np.asarray(self.coords.coords[frame_number])
+            tracks = np.flatnonzero(valid_mask(current[np.newaxis])[0])
+            for status, colour in enumerate(COLOURS):
+                selected = tracks[self.status[tracks] == status]
+                flat, _ = self._stamp(self.ring, current[selected][:, [X, Y]], frame.shape)
+                target[flat] = colour
+
+        if self.show_tracks and self.show_ids:
+            # Text cannot be stamped, so the numbers are drawn one by one
+            current = np.asarray(self.coords.coords[frame_number])
+            for pos in np.flatnonzero(valid_mask(current[np.newaxis])[0]):
+                x, y = current[pos, X], current[pos, Y]
+                cv.putText(composed, str(self.coords.track_ids[pos]), (int(x) + 16, int(y) - 16),
+                           cv.FONT_HERSHEY_SIMPLEX, 1.0, COLOURS[self.status[pos]].tolist(), 2, cv.LINE_AA)
+
+        self._cache_key, self._cache = key, composed
+        return composed
+
+    @staticmethod
+    def _stamp(offsets, points, shape):
+        """Flat pixel indices of one stamp per point (all points at once) and the mask of those inside the frame."""
+        height, width = shape[:2]
+        centres = np.rint(points).astype(np.int64)
+        stamped = (centres[:, np.newaxis, :] + offsets[np.newaxis, :, :]).reshape(-1, 2)
+        keep = (stamped[:, 0] >= 0) & (stamped[:, 0] < width) & (stamped[:, 1] >= 0) & (stamped[:, 1] < height)
+        return stamped[keep, 1] * width + stamped[keep, 0], keep
@@ -0,0 +1,117 @@
+import time
+import cv2 as cv
+
+# ------------------ Playback ------------------
+#
+# Plays the loaded video in real time (times the selected speed). Frames are decoded sequentially from
+# VideoPlayer.vidFile (through its FrameSource), paced to the CAP_PROP_FPS of the AVI with Tk's after(). The
+# frame to show is derived from the wall clock, so whenever rendering falls behind the frames in between are
+# skipped (grabbed without decoding) instead of slowing the playback down.
+
+SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0)
+
+
+class Playback:
+    """Frame-rate-paced playback of the video loaded in a VideoPlayer."""
+
+    def __init__(self, video_player, on_stats=None):
+        self.video_player = video_player
+        self.on_stats = on_stats  # Called with (achieved fps, target fps) about twice a second
+        self.speed = 1.0
+        self.playing = False
+        self.job = None
+        self.fps = 30.0
+        self.anchor_frame = 0
+        self.anchor_time = 0.0
+        self.last_shown = 0
+        self.shown = 0
+        self.skipped = 0
+        self.play_time = 0.0
+        self.stats_time = 0.0
+        self.stats_shown = 0
+
+    @property
+    def target_fps(self):
+        return self.fps * self.speed
+
+    def video_fps(self):
+        fps = self.video_player.vidFile.get(cv.CAP_PROP_FPS)
+        return fps if fps and fps > 0 else 30.0
+
+    def num_frames(self):
+        return int(self.video_player.slider.cget('to')) + 1
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def play(self):
+        if self.playing or self.video_player.frame_source is None:
+            return
+        self.fps = self.video_fps()
+        if self.video_player.cur_frame >= self.num_frames() - 1:
+            self.video_player.cur_frame = 0
+        self.playing = True
+        self.shown = 0
+        self.skipped = 0
+        self.anchor(self.video_player.cur_frame)
+        self.play_time = self.stats_time = self.anchor_time
+        self.stats_shown = 0
+        self.job = self.video_player.root.after_idle(self.tick)
+
+    def pause(self):
+        if not self.playing:
+            return
+        self.playing = False
+        if self.job is not None:
+            self.video_player.root.after_cancel(self.job)
+            self.job = None
+        achieved, target = self.achieved_fps(), self.target_fps
+        print(f"Playback paused at frame {self.last_shown}: {achieved:.1f} of {target:.1f} fps, "
+              f"{self.shown} frames shown, {self.skipped} skipped")
+        self.video_player.schedule_high_quality()
+
+    def anchor(self, frame_number):
+        """Restart the clock at frame_number (start, speed change or slider move during playback)."""
+        self.anchor_frame = frame_number
+        self.anchor_time = time.perf_counter()
+        self.last_shown = frame_number
+
+    def set_speed(self, speed):
+        self.speed = float(speed)
+        if self.playing:
+            self.anchor(self.last_shown)
+
+    def achieved_fps(self):
+        """Frames shown per second since play() was called."""
+        elapsed = time.perf_counter() - self.play_time
+        return self.shown / elapsed if elapsed > 0 else 0.0
+
+    def tick(self):
+        self.job = None
+        if not self.playing:
+            return
+
+        now = time.perf_counter()
+        due = self.anchor_frame + int((now - self.anchor_time) * self.target_fps)
+        last_frame = self.num_frames() - 1
+        if due > self.last_shown:
+            frame_number = min(due, last_frame)
+            self.skipped += max(frame_number - self.last_shown - 1, 0)
+            self.last_shown = frame_number
+            self.video_player.show_playback_frame(frame_number)
+            self.shown += 1
+            self.stats_shown += 1
+            if self.on_stats is not None and now - self.stats_time >= 0.5:
+                self.on_stats(self.stats_shown / (now - self.stats_time), self.target_fps)
+                self.stats_time, self.stats_shown = now, 0
+            if frame_number >= last_frame:
+                self.video_player.stop_playback()
+                return
+
+        # Wake up when the next frame is due
+        next_due = self.anchor_time + (self.last_shown + 1 - self.anchor_frame) / self.target_fps
+        delay = max(int((next_due - time.perf_counter()) * 1000), 1)
+        self.job = self.video_player.root.after(delay, self.tick)
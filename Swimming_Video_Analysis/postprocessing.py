@@ -0,0 +1,227 @@
+import datetime
+import io
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join, basename
+import numpy as np
+import pandas as pd
+
+from processed_output import read_processed, columnar_files
+from instrumentation import timed_call
+
+# ------------------ Postprocessing Jobs ------------------
+#
+# Collecting the BBPM columns of the "_processed.xlsx" files of one line folder into "<line>_results.xlsx" is
+# independent of all other line folders, so FilePostprocessing hands one job per line folder to worker processes
+# (PostprocessingJobs) and polls them from the Tk event loop with after(), keeping the GUI responsive; pending jobs
+# can be cancelled. The input files are read in sorted order and the results are written with fixed zip entry
+# times and document dates (the newest input file), so a line folder gives the same bytes no matter which worker
+# processed it or when.
+#
+# The line folders are found by scan_tree in one pass over the experiment tree with os.scandir: every folder
+# (below a condition folder) holding a "tracks_processed" folder is a line folder, and the "_processed.xlsx" files
+# inside "tracks_processed" are collected on the way, so no folder is listed twice.
+#
+# Every line folder keeps a manifest ("<line>_results.manifest.json") with the size and mtime of each processed
+# file (and of its columnar copy) and the BBPM values read from it. A rerun only reads the files that were added or
+# changed and only rewrites "<line>_results.xlsx" if a file was added, changed or removed (or the results file
+# itself changed); the values from the manifest are the ones the file would give, so the results are the same as
+# after reading everything again.
+
+EPOCH_1980 = 315532800  # Earliest time a zip entry can hold
+MANIFEST_VERSION = 1
+
+
+def write_reproducible_xlsx(data, output_file, timestamp):
+    """Write the bytes of an xlsx file with all dates set to timestamp and replace output_file atomically."""
+    moment = datetime.datetime.fromtimestamp(max(int(timestamp), EPOCH_1980), tz=datetime.timezone.utc)
+    stamp = moment.strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+    temp_file = f"{output_file}.tmp"
+    with zipfile.ZipFile(io.BytesIO(data)) as source, zipfile.ZipFile(temp_file, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            content = source.read(info.filename)
+            if info.filename == "docProps/core.xml":
+                content = re.sub(rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*", lambda m: m.group(1) + stamp, content)
+            target.writestr(zipfile.ZipInfo(info.filename, moment.timetuple()[:6]), content, zipfile.ZIP_DEFLATED)
+    os.replace(temp_file, output_file)
+
+
+PROCESSED_FOLDER = "tracks_processed"
+
+
+def scan_tree(data_root):
+    """Scan data_root once and return {condition folder: {line folder: [processed files]}}."""
+    manifest = {}
+    # Folders to scan: (path, depth below data_root, condition folder, tracks_processed folders the path is in)
+    stack = [(data_root, 0, None, ())]
+    while stack:
+        path, depth, condition, processed_roots = stack.pop()
+        try:
+            with os.scandir(path) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        files = [entry.path for entry in entries if "_processed.xlsx" in entry.name and entry.is_file()]
+        for processed_root in processed_roots:
+            processed_root.extend(files)
+
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            child_roots = processed_roots
+            if entry.name == PROCESSED_FOLDER and depth >= 2:
+                # path is a line folder (it lies below a condition folder)
+                lines = manifest.setdefault(condition, {})
+                child_roots = processed_roots + (lines.setdefault(path, []),)
+            stack.append((entry.path, depth + 1, entry.path if depth == 0 else condition, child_roots))
+    for lines in manifest.values():
+        for files in lines.values():
+            files.sort()
+    return manifest
+
+
+def find_line_folders(data_root):
+    """(line folder, tracks_processed folder, processed files) of every line folder below data_root."""
+    manifest = scan_tree(data_root)
+    return [(line_folder, join(line_folder, PROCESSED_FOLDER), files)
+            for condition in sorted(manifest) for line_folder, files in sorted(manifest[condition].items())]
+
+
+def manifest_path(line_folder):
+    return join(line_folder, f"{basename(line_folder)}_results.manifest.json")
+
+
+def file_state(path):
+    """[size, mtime in ns] of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def source_state(text_path):
+    """State of a processed file and of the columnar copies read_processed may read instead."""
+    return [file_state(path) for path in (text_path, *columnar_files(text_path))]
+
+
+def load_manifest(line_folder):
+    try:
+        with open(manifest_path(line_folder), "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def save_manifest(line_folder, manifest):
+    path = manifest_path(line_folder)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(f"{path}.tmp", path)
+
+
+def analyze_line(line_folder, tracks_processed_path, text_paths=None, incremental=True):
+    """Analyze data inside a tracks_processed folder and write output to the line folder; returns the output file.
+
+    text_paths are the processed files found by scan_tree; without them tracks_processed is searched. With
+    incremental, unchanged files are taken from the manifest of the line folder and unchanged results are kept;
+    otherwise all files are read and the manifest is written anew.
+    """
+    if text_paths is None:
+        text_paths = []
+        # Collect files from tracks_processed
+        for root, _, files in os.walk(tracks_processed_path):
+            for file in files:
+                if "_processed.xlsx" in file:
+                    text_paths.append(join(root, file))
+    text_paths = sorted(text_paths)
+
+    all_dfs = []
+    wanted_columns = ['BBPM']
+    output_file = join(line_folder, f"{basename(line_folder)}_results.xlsx")
+    manifest = load_manifest(line_folder) if incremental else None
+    cached = manifest["sources"] if manifest else {}
+    sources = {}
+    changed = manifest is None
+
+    # Process each file, extract desired columns (from the columnar copy if there is one), and rename them
+    for text_path in text_paths:
+        name = os.path.relpath(text_path, line_folder)
+        state = source_state(text_path)
+        entry = cached.get(name)
+        if entry is not None and entry["state"] == state:
+            data = pd.DataFrame({"BBPM": np.array(entry["values"], dtype=entry["dtype"])})
+        else:
+            data = read_processed(text_path, wanted_columns)
+            changed = True
+        sources[name] = {"state": state, "dtype": str(data["BBPM"].dtype), "values": data["BBPM"].tolist()}
+        data = data.rename(columns={"BBPM": basename(text_path)})
+        all_dfs.append(data)
+
+    if not all_dfs:
+        save_manifest(line_folder, {"version": MANIFEST_VERSION, "results": file_state(output_file), "sources": {}})
+        return None
+
+    if manifest is not None and not changed and sources.keys() == cached.keys() \
+            and file_state(output_file) == manifest["results"]:
+        print(f"Results up to date: {output_file}")
+        return output_file
+
+    # Concatenate data from all files
+    master_df = pd.concat(all_dfs, axis=1)
+
+    # Output the results to the line folder
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        master_df.to_excel(writer, sheet_name=basename(line_folder))
+    write_reproducible_xlsx(buffer.getvalue(), output_file, max(os.path.getmtime(path) for path in text_paths))
+    save_manifest(line_folder, {"version": MANIFEST_VERSION, "results": file_state(output_file), "sources": sources})
+
+    print(f"Results written to: {output_file}")
+    return output_file
+
+
+class PostprocessingJobs:
+    """analyze_line for many line folders in worker processes, polled without blocking."""
+
+    def __init__(self, jobs, max_workers=None, incremental=True):
+        self.jobs = jobs  # (line_folder, tracks_processed_path, processed files) of find_line_folders
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        # Every job returns (output file, its duration in ms in the worker)
+        self.futures = [self.executor.submit(timed_call, analyze_line, *job, incremental) for job in jobs]
+        self.cancelled = False
+
+    def poll(self):
+        """Return (finished jobs, total jobs)."""
+        return sum(future.done() for future in self.futures), len(self.futures)
+
+    @property
+    def finished(self):
+        return all(future.done() for future in self.futures)
+
+    def errors(self):
+        """(line folder, exception) of all failed jobs."""
+        return [(job[0], future.exception()) for job, future in zip(self.jobs, self.futures)
+                if future.done() and not future.cancelled() and future.exception() is not None]
+
+    def durations(self):
+        """(line folder, duration in ms) of all jobs finished without error."""
+        return [(job[0], future.result()[1]) for job, future in zip(self.jobs, self.futures)
+                if future.done() and not future.cancelled() and future.exception() is None]
+
+    def cancel(self):
+        """Drop the jobs not started yet; running jobs still finish."""
+        self.cancelled = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def run_serial(jobs, incremental=True):
+    """Run the jobs one after another in this process."""
+    return [analyze_line(*job, incremental=incremental) for job in jobs]
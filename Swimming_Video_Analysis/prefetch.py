@@ -0,0 +1,202 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+import cv2 as cv
+import pandas as pd
+
+from coords_parser import load_tracks_raw
+from track_index import TrackIndex
+from bends import BendCounter, frame_rate
+from artifacts import track_features, classify
+from frame_cache import FrameCache
+from seek_index import load_seek_index
+from instrumentation import instruments
+
+# ------------------ Video Prefetch ------------------
+#
+# Loading a video (parsing "*_tracks.txt" and "*_tracks_raw.txt", building the track index, counting the bends,
+# marking artifacts and decoding the first frames) used to start only after "Save & Proceed" was clicked. VideoPrefetcher loads the next
+# video in one background thread while the current one is reviewed, so switching only hands the loaded VideoData
+# to the GUI. Only one video is prefetched at a time and only its first warm_frames frames are decoded; selecting
+# another folder or video cancels it. The journal is read when switching, as it is the source of truth for the
+# edits, and a prefetched video whose files changed in the meantime is loaded again.
+
+VIDEO_SUFFIX = "_labels_compressed.AVI"
+
+
+class PrefetchCancelled(Exception):
+    pass
+
+
+class VideoData:
+    """Everything load_video_data reads for one video, ready to be passed to the VideoPlayer and TrackProcessor."""
+
+    def __init__(self, folder_path, video_file):
+        self.folder_path = folder_path
+        self.video_file = video_file
+        self.base_name = video_file.replace(VIDEO_SUFFIX, "")
+        self.video_path = os.path.join(folder_path, video_file)
+        self.track_file = os.path.join(folder_path, f"{self.base_name}_tracks.txt")  # Major swimming analysis data from wrMTrack
+        self.coords_file = os.path.join(folder_path, f"{self.base_name}_tracks_raw.txt")  # X-&Y-Coordinates of worms tracked by wrMTrck
+        self.temp_file = os.path.join(folder_path, f"{self.base_name}_tracks.txt.temp.xlsx")  # Written by older versions
+        self.journal_file = os.path.join(folder_path, f"{self.base_name}_tracks.txt.journal.jsonl")  # Combine/delete steps
+        self.log_file = os.path.join(folder_path, "tracks_processed", f"{self.base_name}_log.txt")
+        self.track_df = None
+        self.base_df = None
+        self.coords = None
+        self.track_index = None
+        self.bend_counter = None
+        self.artifacts = None  # Reason why a track is probably no worm (see artifacts.classify)
+        self.seek_index = None
+        self.frame_cache = None  # First frames of the video, decoded ahead
+        self.state = None
+
+    @property
+    def key(self):
+        return self.folder_path, self.video_file
+
+    def file_state(self):
+        """Size and mtime of the files the data was read from."""
+        state = []
+        for path in (self.video_path, self.track_file, self.coords_file, self.temp_file):
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                state.append(None)
+        return state
+
+    @property
+    def up_to_date(self):
+        return self.state == self.file_state()
+
+
+def load_video_data(folder_path, video_file, warm_frames=0, cancelled=None):
+    """Read the track data of a video and decode its first warm_frames frames.
+
+    cancelled is a threading.Event checked between the steps; PrefetchCancelled is raised once it is set.
+    """
+    def check():
+        if cancelled is not None and cancelled.is_set():
+            raise PrefetchCancelled(video_file)
+
+    data = VideoData(folder_path, video_file)
+    data.state = data.file_state()
+    # Data frame to find frame of which searched for worm track first appears
+    with instruments.timer("load.tracks", video=video_file):
+        data.track_df = pd.read_csv(data.track_file, sep='\t', header=0)
+    check()
+    # Load coordinate containing file with track numbers above 75 by combining sections in the textfile
+    # (memory-mapped from "*_tracks_raw.coords.npy" if the file was loaded before)
+    with instruments.timer("load.coords", video=video_file):
+        data.coords = load_tracks_raw(data.coords_file)
+    check()
+    with instruments.timer("load.track_index", video=video_file):
+        data.track_index = TrackIndex(data.coords)  # First/last frame, ranges and trajectory per track for "Find Number"
+    check()
+    # Data frame for combining and deleting tracks for future analysis
+    if os.path.exists(data.temp_file):
+        with instruments.timer("load.excel", video=video_file):
+            data.base_df = pd.read_excel(data.temp_file, index_col='Track')
+    else:
+        data.base_df = pd.read_csv(data.track_file, delimiter="\t").rename(columns={"Track ": "Track"}).set_index('Track')
+    check()
+    # Bends of the single tracks; groups combined in the journal are counted when the table is shown
+    with instruments.timer("load.bends", video=video_file):
+        data.bend_counter = BendCounter(data.coords, frame_rate(data.track_df))
+        data.bend_counter.table(data.coords.track_ids)
+    check()
+    with instruments.timer("load.artifacts", video=video_file):
+        data.artifacts = classify(track_features(data.track_index, data.bend_counter.fps))
+    check()
+    data.seek_index = load_seek_index(data.video_path)
+    if warm_frames:
+        with instruments.timer("load.warm_frames", video=video_file, frames=warm_frames):
+            data.frame_cache = warm_cache(data.video_path, data.seek_index, warm_frames, cancelled)
+    return data
+
+
+def warm_cache(video_path, seek_index, n_frames, cancelled=None):
+    """FrameCache holding the first n_frames frames of the video."""
+    cache = FrameCache()
+    if seek_index is not None:
+        with seek_index.open() as file:
+            for index in range(min(n_frames, seek_index.n_frames)):
+                if cancelled is not None and cancelled.is_set():
+                    raise PrefetchCancelled(video_path)
+                frame = seek_index.read(file, index)
+                if frame is None:
+                    break
+                cache.put(index, frame)
+        return cache
+
+    capture = cv.VideoCapture(video_path)
+    try:
+        for index in range(n_frames):
+            if cancelled is not None and cancelled.is_set():
+                raise PrefetchCancelled(video_path)
+            ret, frame = capture.read()
+            if not ret:
+                break
+            cache.put(index, frame)
+    finally:
+        capture.release()
+    return cache
+
+
+class VideoPrefetcher:
+    """Loads one video ahead in a background thread; take() returns it if it is the video asked for."""
+
+    def __init__(self, warm_frames=16):
+        self.warm_frames = warm_frames
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-prefetch")
+        self.key = None
+        self.future = None
+        self.cancelled = None  # Event of the pending prefetch
+
+    def prefetch(self, folder_path, video_file):
+        """Start loading a video, replacing the prefetch of any other video."""
+        if self.key == (folder_path, video_file) and self.future is not None:
+            return
+        self.cancel()
+        self.key = (folder_path, video_file)
+        self.cancelled = threading.Event()
+        self.future = self.executor.submit(load_video_data, folder_path, video_file, self.warm_frames, self.cancelled)
+
+    def cancel(self):
+        """Drop the pending prefetch; a load in progress stops at its next step."""
+        if self.future is not None:
+            self.cancelled.set()
+            self.future.cancel()
+        self.key = None
+        self.future = None
+        self.cancelled = None
+
+    def take(self, folder_path, video_file):
+        """Return the prefetched VideoData of the video (waiting for it if it is still loading) or None.
+
+        None is returned if another video was prefetched, the prefetch failed or the files changed since.
+        """
+        if self.key != (folder_path, video_file) or self.future is None:
+            self.cancel()
+            return None
+        future = self.future
+        self.key = None
+        self.future = None
+        self.cancelled = None
+        try:
+            data = future.result()
+        except (CancelledError, PrefetchCancelled):
+            return None
+        except Exception as e:
+            # Loaded again on the GUI thread, which reports the error
+            print(f"Prefetch of {video_file} failed: {e}")
+            return None
+        if not data.up_to_date:
+            print(f"Files of {video_file} changed since the prefetch.")
+            return None
+        return data
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
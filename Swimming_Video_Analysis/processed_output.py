@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from instrumentation import instruments
+
+try:
+    import pyarrow  # noqa: F401  (Feather support of pandas)
+except ImportError:
+    pyarrow = None
+
+# ------------------ Processed Output ------------------
+#
+# Tables written to "tracks_processed/<base>_processed.xlsx" when a video is saved: BBPS and BBPM of all tracks,
+# of the tracks followed for more than half the time of the longest track and all data of process_df. Shared by
+# TrackProcessor.save_file and the headless batch processing (batch_process.py), so both write the same file.
+#
+# Beside the Excel file the first table (which the postprocessing reads the BBPM column from) is written as
+# "<base>_processed.feather", or as "<base>_processed.npz" without pyarrow. read_processed reads a column from
+# these files instead of parsing the workbook, as long as they are not older than the Excel file.
+
+
+def processed_tables(process_df):
+    """Return the tables of the tracks followed for more than 50% of the time and of all tracks."""
+    selected_columns = process_df[["#Frames", "time(s)", "Bends"]]
+    # Compute additional metrics
+    df2 = selected_columns.copy()
+    df2['BBPS'] = process_df['Bends'].div(process_df['time(s)'], axis=0)
+    df2['BBPM'] = df2['BBPS'] * 60
+    df2['mean (BBPM)'] = df2['BBPM'].mean()
+    df2['SEM'] = df2['BBPM'].sem()
+    df2['n'] = len(df2['BBPM'])
+
+    max_value = process_df['time(s)'].max()
+    threshold_value = max_value * 0.5
+    df3 = df2[df2['time(s)'] > threshold_value].copy()
+    df3['mean (BBPM)'] = df3['BBPM'].mean()
+    df3['SEM'] = df3['BBPM'].sem()
+    df3['n'] = len(df3['BBPM'])
+    return df3, df2
+
+
+def columnar_files(excel_file):
+    """Feather and npz file beside a "_processed.xlsx" file."""
+    stem = excel_file[:-len(".xlsx")]
+    return f"{stem}.feather", f"{stem}.npz"
+
+
+def write_columnar(table, excel_file):
+    """Write the table (with its index as first column) beside the Excel file; returns the path."""
+    table = table.reset_index()
+    feather_file, npz_file = columnar_files(excel_file)
+    if pyarrow is not None:
+        table.to_feather(feather_file)
+        return feather_file
+    np.savez(npz_file, columns=np.array(table.columns, dtype=str),
+             **{f"column{i}": table[column].to_numpy() for i, column in enumerate(table.columns)})
+    return npz_file
+
+
+def read_processed(excel_file, columns):
+    """Columns of the first table of a "_processed.xlsx" file, from its columnar copy if that is up to date."""
+    excel_mtime = os.path.getmtime(excel_file)
+    feather_file, npz_file = columnar_files(excel_file)
+    if pyarrow is not None and os.path.exists(feather_file) and os.path.getmtime(feather_file) >= excel_mtime:
+        return pd.read_feather(feather_file, columns=columns)
+    if os.path.exists(npz_file) and os.path.getmtime(npz_file) >= excel_mtime:
+        with np.load(npz_file) as saved:
+            names = list(saved["columns"])
+            return pd.DataFrame({column: saved[f"column{names.index(column)}"] for column in columns})
+    return pd.read_excel(excel_file, header=0)[columns]
+
+
+def write_processed(process_df, processed_root, base_name):
+    """Write "<base>_processed.xlsx" and its columnar copy into processed_root and return the Excel path."""
+    Path(processed_root).mkdir(parents=True, exist_ok=True)
+    df3, df2 = processed_tables(process_df)
+    output_file = os.path.join(processed_root, f"{base_name}_processed.xlsx")
+    with instruments.timer("save.excel"), pd.ExcelWriter(output_file) as writer:
+        df3.to_excel(writer, sheet_name='>50%_tracked_swimming_cycles')
+        df2.to_excel(writer, sheet_name='all_swimming_cycles')
+        process_df.to_excel(writer, sheet_name='all_data')
+    # Written after the Excel file, so it counts as up to date
+    with instruments.timer("save.columnar"):
+        write_columnar(df3, output_file)
+    return output_file
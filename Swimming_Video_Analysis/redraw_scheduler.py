@@ -0,0 +1,56 @@
+import time
+
+# ------------------ Redraw Scheduler ------------------
+#
+# Tk delivers <B1-Motion>, slider commands and <Configure> events much faster than a frame can be rendered.
+# Instead of rendering for every event, the VideoPlayer requests a redraw from the RedrawScheduler, which merges
+# all requests arriving before the next display tick into one call of the render function. The render function
+# reads the state of the player when it runs, so the latest requested state is always the one rendered.
+
+
+class RedrawScheduler:
+    """Coalesces redraw requests into at most one render per display tick of min_interval ms."""
+
+    def __init__(self, widget, render, min_interval=16):
+        self.widget = widget
+        self.render = render  # Called with the quality of the latest request
+        self.min_interval = min_interval
+        self.job = None
+        self.quality = None
+        self.last_render = 0.0
+        self.requested = 0
+        self.rendered = 0
+        self.coalesced = 0
+
+    def request(self, quality):
+        """Request a redraw; merged into an already pending one if there is one."""
+        self.requested += 1
+        self.quality = quality
+        if self.job is not None:
+            self.coalesced += 1
+            return
+        elapsed = (time.perf_counter() - self.last_render) * 1000
+        if elapsed >= self.min_interval:
+            self.job = self.widget.after_idle(self._run)
+        else:
+            self.job = self.widget.after(int(self.min_interval - elapsed) + 1, self._run)
+
+    def cancel(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+
+    def flush(self):
+        """Render a pending request immediately."""
+        if self.job is not None:
+            self.cancel()
+            self._run()
+
+    def _run(self):
+        self.job = None
+        self.last_render = time.perf_counter()
+        self.rendered += 1
+        self.render(self.quality)
+
+    def stats(self):
+        return {"requested": self.requested, "rendered": self.rendered, "coalesced": self.coalesced}
@@ -0,0 +1,178 @@
+import os
+import struct
+import zipfile
+import numpy as np
+import cv2 as cv
+
+# ------------------ Seek Index ------------------
+#
+# Depending on the backend, cv.VideoCapture.set(CAP_PROP_POS_FRAMES) is slow or lands a few frames off on long
+# AVIs. The labels AVIs are re-saved by ImageJ with JPEG compression, so every frame is a keyframe stored as one
+# chunk of the "movi" list. One pass over the RIFF structure records the byte offset and size of every video
+# chunk; a frame is then read with one file seek and decoded with cv.imdecode, independent of its position in
+# the video. The index is saved beside the video as "<video>.seekidx.npz" and rebuilt when the video changes.
+# Videos that cannot be indexed (other codecs, or dropped frames before the first stored frame) keep using
+# cv.VideoCapture.
+
+INDEX_VERSION = 2  # Saved indexes of other versions are rebuilt
+JPEG_CODECS = (b"MJPG", b"JPEG", b"jpeg", b"mjpg")
+UNCOMPRESSED = (b"\x00\x00\x00\x00", b"DIB ", b"RGB ")
+LIST_TYPES = (b"AVI ", b"AVIX", b"hdrl", b"strl", b"movi", b"rec ")
+
+
+class SeekIndex:
+    """Byte offsets of all frames of an AVI for frame-exact O(1) random access."""
+
+    def __init__(self, video_path, offsets, sizes, codec, width, height, bit_count=24, top_down=False):
+        self.video_path = video_path
+        self.offsets = offsets
+        self.sizes = sizes
+        self.codec = codec
+        self.width = width
+        self.height = height
+        self.bit_count = bit_count
+        self.top_down = top_down  # Uncompressed DIB stored top row first (negative biHeight)
+
+    @property
+    def n_frames(self):
+        return len(self.offsets)
+
+    def open(self):
+        """Return a file handle for read(); every thread needs its own handle."""
+        return open(self.video_path, "rb")
+
+    def read(self, file, index):
+        """Return the decoded BGR frame at index, or None if it cannot be read."""
+        if not 0 <= index < self.n_frames:
+            return None
+        file.seek(int(self.offsets[index]))
+        data = file.read(int(self.sizes[index]))
+        return self.decode(data)
+
+    def decode(self, data):
+        if self.codec in JPEG_CODECS:
+            return cv.imdecode(np.frombuffer(data, dtype=np.uint8), cv.IMREAD_COLOR)
+        # Uncompressed 24 bit DIB: rows padded to 4 bytes, bottom-up unless biHeight is negative
+        stride = (self.width * 3 + 3) & ~3
+        if len(data) < stride * self.height:
+            return None
+        rows = np.frombuffer(data, dtype=np.uint8, count=stride * self.height).reshape(self.height, stride)
+        if not self.top_down:
+            rows = rows[::-1]
+        return np.ascontiguousarray(rows[:, :self.width * 3].reshape(self.height, self.width, 3))
+
+
+def index_path(video_path):
+    return f"{video_path}.seekidx.npz"
+
+
+def _scan_avi(video_path):
+    """Walk the RIFF structure once and return (codec, width, height, bit_count, offsets, sizes) of the video stream.
+
+    height is negative for a top-down DIB, like biHeight.
+    """
+    state = {"stream": -1, "video_stream": None, "codec": None, "size": None, "bit_count": 24, "chunks": []}
+
+    def scan(file, end):
+        while file.tell() + 8 <= end:
+            header = file.read(8)
+            if len(header) < 8:
+                return
+            chunk_id, size = struct.unpack("<4sI", header)
+            data_start = file.tell()
+            if chunk_id in (b"RIFF", b"LIST"):
+                list_type = file.read(4)
+                if list_type == b"strl":
+                    state["stream"] += 1
+                if list_type in LIST_TYPES:
+                    scan(file, min(data_start + size, end))
+            elif chunk_id == b"strh":
+                if file.read(4) == b"vids" and state["video_stream"] is None:
+                    state["video_stream"] = state["stream"]
+            elif chunk_id == b"strf" and state["stream"] == state["video_stream"] and state["codec"] is None:
+                _, width, height, _, bit_count, codec = struct.unpack("<IiiHH4s", file.read(20))
+                state["codec"], state["size"], state["bit_count"] = codec, (width, height), bit_count
+            elif chunk_id[2:] in (b"dc", b"db") and chunk_id[:2].isdigit() \
+                    and int(chunk_id[:2]) == state["video_stream"]:
+                state["chunks"].append((data_start, size))
+            file.seek(data_start + size + (size & 1))
+
+    with open(video_path, "rb") as file:
+        scan(file, os.path.getsize(video_path))
+
+    if state["codec"] is None or not state["chunks"]:
+        return None
+    chunks = np.array(state["chunks"], dtype=np.int64)
+    offsets, sizes = chunks[:, 0], chunks[:, 1]
+    if sizes[0] == 0:
+        return None  # Dropped frames without a previous frame to repeat are left to the decoder
+    # Empty chunks repeat the previous frame (dropped frames)
+    valid = np.maximum.accumulate(np.where(sizes > 0, np.arange(len(sizes)), 0))
+    offsets, sizes = offsets[valid], sizes[valid]
+    width, height = state["size"]
+    return state["codec"], width, height, state["bit_count"], offsets, sizes
+
+
+def build_seek_index(video_path):
+    """Index an AVI, or return None if its frames cannot be decoded from the file directly."""
+    try:
+        scanned = _scan_avi(video_path)
+    except (OSError, struct.error, ValueError):
+        return None
+    if scanned is None:
+        return None
+    codec, width, height, bit_count, offsets, sizes = scanned
+    if codec not in JPEG_CODECS and not (codec in UNCOMPRESSED and bit_count == 24):
+        return None
+
+    top_down = codec in UNCOMPRESSED and height < 0
+    height = abs(height)
+    seek_index = SeekIndex(video_path, offsets, sizes, codec, width, height, bit_count, top_down)
+    # Some MJPEG writers omit the Huffman tables, which cv.imdecode cannot handle
+    with seek_index.open() as file:
+        frame = seek_index.read(file, 0)
+    if frame is None or frame.shape[:2] != (height, width):
+        return None
+    return seek_index
+
+
+def load_seek_index(video_path):
+    """Load the index saved beside the video if it is up to date, otherwise build and save it."""
+    stat = os.stat(video_path)
+    fingerprint = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    saved_path = index_path(video_path)
+    try:
+        with np.load(saved_path) as saved:
+            if "version" in saved.files and int(saved["version"]) == INDEX_VERSION \
+                    and np.array_equal(saved["fingerprint"], fingerprint):
+                if not len(saved["offsets"]):
+                    return None  # Video was checked before and cannot be indexed
+                width, height, bit_count, top_down = (int(value) for value in saved["shape"])
+                return SeekIndex(video_path, saved["offsets"], saved["sizes"], saved["codec"].tobytes(),
+                                 width, height, bit_count, bool(top_down))
+    except FileNotFoundError:
+        pass
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile) as e:
+        # Truncated or empty file, e.g. left by a crash while it was written
+        print(f"Rebuilding damaged seek index {saved_path}: {e}")
+        try:
+            os.remove(saved_path)
+        except OSError:
+            pass
+
+    seek_index = build_seek_index(video_path)
+    empty = np.empty(0, dtype=np.int64)
+    try:
+        # Written to a temporary file first, so a crash never leaves a partly written index
+        with open(f"{saved_path}.tmp", "wb") as file:
+            if seek_index is None:
+                np.savez(file, version=INDEX_VERSION, fingerprint=fingerprint, offsets=empty, sizes=empty)
+            else:
+                np.savez(file, version=INDEX_VERSION, fingerprint=fingerprint, offsets=seek_index.offsets,
+                         sizes=seek_index.sizes, codec=np.frombuffer(seek_index.codec, dtype=np.uint8),
+                         shape=np.array([seek_index.width, seek_index.height, seek_index.bit_count,
+                                         seek_index.top_down]))
+        os.replace(f"{saved_path}.tmp", saved_path)
+    except OSError as e:
+        print(f"Could not write seek index for {video_path}: {e}")
+    return seek_index
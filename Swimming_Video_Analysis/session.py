@@ -0,0 +1,176 @@
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+# ------------------ Review Session ------------------
+#
+# A folder is reviewed in a session: ReviewSession remembers which videos were saved and which video was open
+# ("swimming_video_analysis.session.json" in the folder), so reopening the folder continues at the video that was
+# open, or at the first video not saved yet, instead of clicking "Save & Proceed" through the saved ones. Any video
+# can be opened directly; the edits of a video are kept in its journal, so leaving it without saving loses nothing.
+#
+# Videos opened before stay loaded in a ResourcePool: the parsed data, the open cv.VideoCapture and the decoded
+# frames of a video (VideoResources) are kept until the pool exceeds its memory budget, then the least recently
+# used videos are closed. Going back to a video in the pool is as fast as the prefetched next video. Coordinates
+# memory-mapped from their "*_tracks_raw.coords.npy" cache are paged in by the OS and do not count toward the budget.
+
+SESSION_FILE = "swimming_video_analysis.session.json"
+SESSION_VERSION = 1
+DEFAULT_MEMORY_BUDGET = 2 * 1024 ** 3  # Bytes for all videos in the ResourcePool
+
+
+class ReviewSession:
+    """Saved videos and the open video of one folder, written to SESSION_FILE after every change."""
+
+    def __init__(self, folder_path, videos):
+        self.folder_path = folder_path
+        self.videos = list(videos)
+        self.done = set()
+        self.current = None
+        self._load()
+
+    @property
+    def path(self):
+        return os.path.join(self.folder_path, SESSION_FILE)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != SESSION_VERSION:
+            return
+        self.done = {video for video in state.get("done", []) if video in self.videos}
+        self.current = state.get("current") if state.get("current") in self.videos else None
+
+    def save(self):
+        state = {"version": SESSION_VERSION, "done": sorted(self.done), "current": self.current}
+        try:
+            with open(f"{self.path}.tmp", "w") as file:
+                json.dump(state, file, indent=1)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            # A read-only folder only costs resuming at the right video
+            print(f"Could not save the session to {self.path}: {e}")
+
+    def resume_index(self):
+        """Index of the video to continue with: the open video if it was not saved, else the first video not saved."""
+        if self.current is not None and self.current not in self.done:
+            return self.videos.index(self.current)
+        for index, video in enumerate(self.videos):
+            if video not in self.done:
+                return index
+        return None
+
+    def open(self, video):
+        self.current = video
+        self.save()
+
+    def mark_done(self, video):
+        self.done.add(video)
+        self.save()
+
+    def is_done(self, video):
+        return video in self.done
+
+
+def resident_nbytes(array):
+    """Bytes of an array held in memory; 0 for a memory-mapped file."""
+    return 0 if isinstance(array, np.memmap) else array.nbytes
+
+
+class VideoResources:
+    """Loaded data (prefetch.VideoData) and the open FrameSource of one video."""
+
+    def __init__(self, data, frame_source=None):
+        self.data = data
+        self.frame_source = frame_source
+        # The loaded data does not change, only the decoded frames come and go
+        self.data_bytes = resident_nbytes(data.coords.coords) + resident_nbytes(data.track_index.point_xy) \
+            + resident_nbytes(data.track_index.point_frames)
+        for df in (data.track_df, data.base_df):
+            self.data_bytes += int(df.memory_usage(index=True).sum())
+
+    @property
+    def nbytes(self):
+        """Memory held by the video: coordinates (unless memory-mapped), tables, track index and decoded frames."""
+        data = self.data
+        total = self.data_bytes
+        if self.frame_source is not None:
+            total += self.frame_source.cache.nbytes
+        elif data.frame_cache is not None:
+            total += data.frame_cache.nbytes
+        return total
+
+    def close(self):
+        if self.frame_source is not None:
+            self.frame_source.close()
+            self.frame_source.capture.release()
+            self.frame_source = None
+
+
+class ResourcePool:
+    """VideoResources by (folder, video file), closing the least recently used above max_bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BUDGET):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def nbytes(self):
+        return sum(resources.nbytes for resources in self.entries.values())
+
+    def get(self, key):
+        """Return the resources of a video (now the most recently used) or None."""
+        resources = self.entries.get(key)
+        if resources is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return resources
+
+    def put(self, key, resources):
+        self.entries[key] = resources
+        self.entries.move_to_end(key)
+        self.trim()
+
+    def trim(self, keep=None):
+        """Close the least recently used videos until the pool fits its budget; the most recent one always stays."""
+        keep = next(reversed(self.entries)) if keep is None and self.entries else keep
+        total = self.nbytes
+        for key in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            resources = self.entries.pop(key)
+            total -= resources.nbytes
+            resources.close()
+            self.evictions += 1
+
+    def remove(self, key):
+        """Close a video, e.g. because its files changed."""
+        resources = self.entries.pop(key, None)
+        if resources is not None:
+            resources.close()
+
+    def discard(self, folder_path=None):
+        """Close all videos, or those of one folder."""
+        for key in [key for key in self.entries if folder_path is None or key[0] == folder_path]:
+            self.entries.pop(key).close()
+
+    def stats(self):
+        return {"videos": len(self.entries), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
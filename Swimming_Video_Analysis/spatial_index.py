@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import numpy as np
+
+from coords_parser import X, Y
+from track_index import valid_mask
+
+# ------------------ Spatial Index ------------------
+#
+# Resolves a click on the video to the nearest track. The positions of all tracks found in a frame are sorted
+# into square grid cells once; a lookup only computes distances to the tracks in the cells around the click.
+# Grids are built on demand and kept for the most recently clicked frames.
+
+
+class FrameGrid:
+    """Grid buckets over the positions of all tracks found in one frame."""
+
+    def __init__(self, xy, track_ids, cell_size):
+        self.cell_size = cell_size
+        cells = np.floor(xy / cell_size).astype(np.int64)
+        keys = self.key(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+        self.xy = xy[order]
+        self.track_ids = track_ids[order]
+        keys = keys[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        self.buckets = {int(key): (int(start), int(end)) for key, start, end in zip(unique_keys, starts, ends)}
+
+    @staticmethod
+    def key(cell_x, cell_y):
+        return (cell_x << 32) + cell_y
+
+    def nearest(self, x, y, max_distance):
+        """Return (track, distance) of the track nearest to x/y within max_distance, or None."""
+        reach = int(np.ceil(max_distance / self.cell_size))
+        cell_x, cell_y = int(np.floor(x / self.cell_size)), int(np.floor(y / self.cell_size))
+        parts = [self.buckets[k] for k in (self.key(cell_x + dx, cell_y + dy)
+                                           for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1))
+                 if k in self.buckets]
+        if not parts:
+            return None
+        candidates = np.concatenate([np.arange(start, end) for start, end in parts])
+        distances = np.hypot(self.xy[candidates, 0] - x, self.xy[candidates, 1] - y)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return int(self.track_ids[candidates[best]]), float(distances[best])
+
+
+class SpatialIndex:
+    """Nearest-track lookup in any frame of a video, with the grids of the last max_frames frames cached."""
+
+    def __init__(self, coords, cell_size=32, max_frames=64):
+        self.coords = coords  # TrackCoordinates
+        self.cell_size = cell_size
+        self.max_frames = max_frames
+        self.grids = OrderedDict()
+
+    def grid(self, frame_number):
+        grid = self.grids.get(frame_number)
+        if grid is None:
+            frame = np.asarray(self.coords.coords[frame_number])
+            found = valid_mask(frame[np.newaxis])[0]
+            grid = FrameGrid(frame[found][:, [X, Y]].astype(np.float64), self.coords.track_ids[found], self.cell_size)
+            self.grids[frame_number] = grid
+            if len(self.grids) > self.max_frames:
+                self.grids.popitem(last=False)
+        else:
+            self.grids.move_to_end(frame_number)
+        return grid
+
+    def nearest(self, frame_number, x, y, max_distance=30):
+        """Return (track, distance) of the track nearest to x/y in frame_number within max_distance, or None."""
+        if not 0 <= frame_number < self.coords.n_frames:
+            return None
+        return self.grid(frame_number).nearest(x, y, max_distance)
@@ -5,9 +5,27 @@ from PIL import Image, ImageTk, ImageDraw
 import pandas as pd
 from pandastable import Table, RowHeader, TableModel
 import os
-from os.path import join, basename
+import multiprocessing
 from pathlib import Path
 import tkinter.font as font
+from bends import BendCounter, frame_rate
+from spatial_index import SpatialIndex
+from track_linker import link_tracks, suggest_combines
+from collisions import detect_collisions, review_items
+from artifacts import mark_rows
+from overlay import TrackOverlay
+from processed_output import write_processed
+from postprocessing import find_line_folders, PostprocessingJobs
+from track_edits import read_log, replay_owner, apply_operation, apply_operations, OperationJournal, COMBINE, DELETE, \
+    log_line, undo_line, redo_line
+from frame_cache import FrameSource
+from seek_index import load_seek_index
+from frame_renderer import FrameRenderer, QUALITY_FAST, QUALITY_HIGH, VIEW_SIZE
+from redraw_scheduler import RedrawScheduler
+from playback import Playback, SPEEDS
+from prefetch import VideoPrefetcher, load_video_data
+from session import ReviewSession, ResourcePool, VideoResources, DEFAULT_MEMORY_BUDGET
+from instrumentation import instruments, timed, DEFAULT_TIMING_LOG, TIMING_LOG_ENV
 
 # ------------------ CHANGELOG ------------------
 #   09.10.2024 Dennis Rentsch: (v2)     Combined scripts swimming_tracks_processing and video_player into one GUI
@@ -22,7 +40,8 @@ import tkinter.font as font
 # ------------------ FileHandler Class ------------------
 
 class FileHandler:
-    def __init__(self, video_player, track_processor, status_label, root):
+    def __init__(self, video_player, track_processor, status_label, root, video_selector=None,
+                 memory_budget=DEFAULT_MEMORY_BUDGET):
         self.video_player = video_player
         self.track_processor = track_processor
         self.status_label = status_label
@@ -30,122 +49,71 @@ class FileHandler:
         self.videos = []
         self.current_video_index = -1
         self.root = root
+        # Loads the next video in the background while the current one is reviewed
+        self.prefetcher = VideoPrefetcher()
+        # Videos opened before stay loaded up to the memory budget; saved videos and the open video are remembered
+        self.pool = ResourcePool(memory_budget)
+        self.session = None
+        self.video_selector = video_selector  # Combobox to open any video of the folder
+        if video_selector is not None:
+            video_selector.bind("<<ComboboxSelected>>", self.on_video_selected)
 
     def select_folder(self):
         # Prompt user to select a folder
         folder_selected = filedialog.askdirectory(title="Select Folder Containing Video and Data Files")
         if folder_selected:
+            self.prefetcher.cancel()
+            self.pool.discard()
             self.folder_path = folder_selected
             # Find all videos with the specified suffix
             self.videos = sorted([f for f in os.listdir(self.folder_path) if f.endswith('_labels_compressed.AVI')])
             total_videos = len(self.videos)
             if self.videos:
-                self.current_video_index = 0
+                # Continue where the last session of this folder ended
+                self.session = ReviewSession(self.folder_path, self.videos)
+                resume_index = self.session.resume_index()
+                if resume_index is None:
+                    messagebox.showinfo("Session", "All videos of this folder have been saved before. Starting with the first video.")
+                    resume_index = 0
+                elif resume_index > 0:
+                    print(f"Resuming session at video {resume_index + 1} of {total_videos}")
+                self.current_video_index = resume_index
                 self.load_current_video()
                 self.update_status_label()
             else:
                 messagebox.showwarning("No Videos Found", "No video files with '_labels_compressed.AVI' found in the selected folder.")
                 self.status_label.config(text="No videos found in the selected folder.")
 
+    @timed("load_current_video")
     def load_current_video(self):
         if 0 <= self.current_video_index < len(self.videos):
             video_file = self.videos[self.current_video_index]
-            video_path = os.path.join(self.folder_path, video_file)
-            # Derive basename by removing the suffix
-            base_name = video_file.replace("_labels_compressed.AVI", "")
-            # Define paths to associated data files
-            track_file = os.path.join(self.folder_path, f"{base_name}_tracks.txt") # Stores major swimming analysis data from wrMTrack
-            coords_file = os.path.join(self.folder_path, f"{base_name}_tracks_raw.txt") # Stores X-&Y-Coordinates of worms tracked by wrMTrck
-            if os.path.exists(os.path.join(self.folder_path, f"{base_name}_tracks.txt.temp.xlsx")):
-                temp_file = os.path.join(self.folder_path, f"{base_name}_tracks.txt.temp.xlsx")
-            undo_file = os.path.join(self.folder_path, f"{base_name}_tracks.txt.temp_undo.xlsx")
+            instruments.annotate(video=video_file)
 
             try:
+                resources = self.video_resources(video_file)
+                data = resources.data
                 print(f"Loaded video: {video_file}")
-                # Load DataFrames
-                track_df = pd.read_csv(track_file, sep='\t', header=0)  # Data frame to find frame of which searched for worm track first appears
-
-                # Load coordinate containing file into dataframe with track numbers above 75 by combining sections in the textfile
-                with open(coords_file, 'r') as file:
-                    lines = file.readlines()
-
-                # Initialize variables for the combination process
-                dataframes = []
-                header = None
-                current_data = []
-                current_track_start = 1
-
-                # Function to adjust row length to match header length
-                def adjust_row_length(row, header_len):
-                    if len(row) > header_len:
-                        return row[:header_len]
-                    elif len(row) < header_len:
-                        return row + [''] * (header_len - len(row))
-                    else:
-                        return row
-
-                # Loop over lines from the coords file
-                for line in lines:
-                    line = line.strip()
-
-                    if not line:
-                        continue
-
-                    if line.startswith("Frame"):
-                        header = line.split("\t")
-                        continue
-
-                    if line.startswith("Tracks"):
-                        if current_data:
-                            min_columns = min(len(header), len(max(current_data, key=len)))
-                            df = pd.DataFrame([adjust_row_length(row, min_columns) for row in current_data], columns=header[:min_columns])
-                            dataframes.append(df)
-                            current_data = []
-
-                        track_range = line.split(" ")[1:4:2]
-                        track_start = int(track_range[0])
-                        track_end = int(track_range[1])
-
-                        adjusted_header = ["Frame"]
-                        for i in range(track_start, track_end + 1):
-                            adjusted_header.extend([f"X{i}", f"Y{i}", f"Flag{i}"])
-                        header = adjusted_header
-                        continue
-
-                    current_data.append(line.split("\t"))
-
-                if current_data:
-                    min_columns = min(len(header), len(max(current_data, key=len)))
-                    df = pd.DataFrame([adjust_row_length(row, min_columns) for row in current_data], columns=header[:min_columns])
-                    dataframes.append(df)
-
-                # Combine all DataFrames into one
-                combined_df = dataframes[0]
-                for df in dataframes[1:]:
-                    combined_df = pd.merge(combined_df, df.drop(columns=["Frame"]), left_index=True, right_index=True)
-
-                # Convert numeric columns to appropriate types
-                combined_df = combined_df.apply(pd.to_numeric,
-                                                errors='coerce')  # Convert all columns to numeric (floats/ints)
-                combined_df = combined_df.fillna(0).astype(int)  # Fill NaNs with 0 and convert to integers
-
-                # Store combined_df as coords_df
-                coords_df = combined_df
-                # print(coords_df)
-
-                # coords_df = pd.read_csv(coords_file, sep='\t', header=0, skiprows=[1]) # Data frame to identify where worm appears in video (first frame derives from track_df)
-
-                if os.path.exists(os.path.join(self.folder_path, f"{base_name}_tracks.txt.temp.xlsx")): # Data frame for combining and deleting tracks for future analysis
-                    process_df = pd.read_excel(temp_file, index_col='Track')
-                    print(f"Temporary file found: {temp_file}")
+
+                # Steps of earlier sessions are replayed from the journal onto the track data (base_df)
+                journal = OperationJournal(data.journal_file)
+                if os.path.exists(data.temp_file):
+                    print(f"Temporary file found: {data.temp_file}")
+                    if not journal.exists:
+                        # Steps leading to the temporary file (to colour combined and deleted tracks in the video)
+                        journal.start_from(read_log(data.log_file) if os.path.exists(data.log_file) else [])
                 else:
-                    process_df = pd.read_csv(track_file, delimiter="\t").rename(columns={"Track ": "Track"}).set_index('Track')
                     print("No temporary file found. Loaded original track file")
-                process_df.to_excel(undo_file)
+                if journal.operations:
+                    print(f"Journal found: {data.journal_file} ({len(journal.operations)} steps)")
 
                 # Pass data to VideoPlayer and TrackProcessor
-                self.video_player.set_video(video_path, track_df, coords_df)
-                self.track_processor.set_track_data(track_df, coords_df, process_df, self.folder_path, base_name)
+                self.video_player.set_video(data.video_path, data.track_df, data.track_index, data.seek_index,
+                                            data.frame_cache, resources.frame_source)
+                self.track_processor.set_track_data(data.track_df, data.base_df, self.folder_path, data.base_name,
+                                                    journal, data.coords, data.bend_counter, data.artifacts)
+                if self.session is not None:
+                    self.session.open(video_file)
                 self.update_status_label()
             except FileNotFoundError as fnf_error:
                 messagebox.showerror("File Not Found", f"Required data files for {video_file} not found.\nError: {fnf_error}")
@@ -153,13 +121,64 @@ class FileHandler:
             except Exception as e:
                 messagebox.showerror("File Loading Error", f"Error loading data for {video_file}:\n{e}")
                 print(f"Error loading data for {video_file}: {e}")
+            self.prefetch_next_video()
         else:
             messagebox.showinfo("Completed", "All videos have been processed.")
             self.status_label.config(text="All videos have been processed.")
 
+    def video_resources(self, video_file):
+        """VideoResources of a video from the pool, the prefetch or loaded now."""
+        key = (self.folder_path, video_file)
+        resources = self.pool.get(key)
+        if resources is not None and resources.data.up_to_date:
+            print(f"Video taken from the pool: {video_file}")
+            instruments.annotate(source="pool")
+            instruments.count("video.pool")
+            self.pool.trim(keep=key)
+            return resources
+        if resources is not None:
+            print(f"Files of {video_file} changed since it was opened.")
+            self.pool.remove(key)
+
+        # Take the video from the prefetch if it was loaded ahead, otherwise load it now
+        data = self.prefetcher.take(self.folder_path, video_file)
+        if data is None:
+            instruments.annotate(source="load")
+            instruments.count("video.load")
+            data = load_video_data(self.folder_path, video_file)
+        else:
+            print(f"Prefetched video: {video_file}")
+            instruments.annotate(source="prefetch")
+            instruments.count("video.prefetch")
+        frame_source = FrameSource(cv.VideoCapture(data.video_path), data.video_path, cache=data.frame_cache,
+                                   seek_index=data.seek_index)
+        resources = VideoResources(data, frame_source)
+        self.pool.put(key, resources)
+        return resources
+
+    def prefetch_next_video(self):
+        next_index = self.current_video_index + 1
+        if next_index < len(self.videos) and (self.folder_path, self.videos[next_index]) not in self.pool:
+            self.prefetcher.prefetch(self.folder_path, self.videos[next_index])
+        else:
+            self.prefetcher.cancel()
+
+    def on_video_selected(self, event):
+        """Open the video chosen in the video selector (its edits stay in the journal, nothing is saved)."""
+        index = self.video_selector.current()
+        if index < 0 or index == self.current_video_index:
+            return
+        self.current_video_index = index
+        self.load_current_video()
+
+    def mark_current_saved(self):
+        if self.session is not None and 0 <= self.current_video_index < len(self.videos):
+            self.session.mark_done(self.videos[self.current_video_index])
+
     def save_proceed(self):
         # Save current track data
-        self.track_processor.save_file()
+        if self.track_processor.save_file():
+            self.mark_current_saved()
         # Move to the next video
         self.current_video_index += 1
         if self.current_video_index < len(self.videos):
@@ -172,7 +191,12 @@ class FileHandler:
 
     def save_exit(self):
         # Save current track data
-        self.track_processor.save_file()
+        if self.track_processor.save_file():
+            self.mark_current_saved()
+        self.prefetcher.close()
+        self.video_player.close_frame_source()
+        self.pool.discard()
+        instruments.disable()  # Writes the counters and closes the timing log
         self.root.destroy()
 
     def update_status_label(self):
@@ -183,6 +207,18 @@ class FileHandler:
             self.status_label.config(text=status_text, font=('Segoe UI', 10))
         else:
             self.status_label.config(text=" ")
+        self.update_video_selector()
+
+    def update_video_selector(self):
+        if self.video_selector is None:
+            return
+        # Saved videos are ticked
+        self.video_selector.config(values=[f"{index + 1}. {video}{' ✓' if self.session and self.session.is_done(video) else ''}"
+                                           for index, video in enumerate(self.videos)])
+        if 0 <= self.current_video_index < len(self.videos):
+            self.video_selector.current(self.current_video_index)
+        else:
+            self.video_selector.set("")
 
 # ------------------ VideoPlayer Class ------------------
 
@@ -190,6 +226,13 @@ class VideoPlayer:
     def __init__(self, root):
         self.root = root
         self.vidFile = cv.VideoCapture("placeholder.jpg") # To load a placeholder image in the beginning
+        self.frame_source = None  # Cache of decoded frames with read-ahead of the loaded video
+        self.owns_frame_source = True  # False if the frame source belongs to the ResourcePool of the FileHandler
+        self.renderer = FrameRenderer()  # Decoded current frame, re-rendered for pan and zoom without decoding
+        self.settle_job = None  # Pending high quality render after dragging the slider or panning
+        self.settle_delay = 150  # ms without input before the viewport is rendered in high quality
+        self.redraw = RedrawScheduler(root, self.update_frame)  # Merges slider, pan and resize events into one render
+        self.playback = Playback(self, on_stats=self.show_playback_stats)
         self.cur_frame = 0
         self.imgtk = None
         self.zoom_level = 1.0
@@ -202,7 +245,11 @@ class VideoPlayer:
 
         # DataFrames
         self.track_df = None
-        self.coords_df = None
+        self.track_index = None
+        self.spatial_index = None  # Nearest track to a click on the video
+        self.overlay = None  # Rings and trails of all tracks drawn into the frame
+        self.on_track_selected = None  # Callback with the track number of a clicked worm (set by TrackProcessor)
+        self.click_start = None
 
         # GUI Components
         title_frame = tk.Frame(root)
@@ -241,7 +288,7 @@ class VideoPlayer:
         video_frame = tk.Frame(main_frame)
         video_frame.pack(side=tk.LEFT)
 
-        self.image_label = tk.Label(video_frame, width=800, height=600)
+        self.image_label = tk.Label(video_frame, width=VIEW_SIZE[0], height=VIEW_SIZE[1])
         self.image_label.pack()
 
         self.slider = Scale(video_frame, orient='horizontal', command=self.on_slider_move)
@@ -261,11 +308,53 @@ class VideoPlayer:
         self.find_number_entry.pack(side=tk.LEFT)
 
         self.find_number_button = Button(control_frame, text="Find Number", command=self.find_number)
-        self.find_number_button.pack(side=tk.LEFT, padx=10)
+        self.find_number_button.pack(side=tk.LEFT, padx=(10, 2))
+
+        # Jump to the previous/next appearance of the track
+        self.previous_appearance_button = Button(control_frame, text="◀", command=lambda: self.find_number(-1))
+        self.previous_appearance_button.pack(side=tk.LEFT)
+        self.next_appearance_button = Button(control_frame, text="▶", command=lambda: self.find_number(1))
+        self.next_appearance_button.pack(side=tk.LEFT, padx=(2, 10))
+
+        # Playback controls
+        self.play_button = Button(control_frame, text="▶ Play", width=8, command=self.toggle_playback)
+        self.play_button.pack(side=tk.LEFT, padx=(10, 5))
+
+        self.speed_var = tk.StringVar(value="1.0x")
+        speed_menu = tk.OptionMenu(control_frame, self.speed_var, *[f"{speed}x" for speed in SPEEDS],
+                                   command=lambda value: self.playback.set_speed(value[:-1]))
+        speed_menu.pack(side=tk.LEFT)
+
+        self.fps_label = tk.Label(control_frame, text="", width=16, anchor="w")
+        self.fps_label.pack(side=tk.LEFT, padx=5)
+
+        # Overlay of all tracks
+        overlay_frame = tk.Frame(root)
+        overlay_frame.pack(pady=(5, 0))
+
+        self.show_tracks_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(overlay_frame, text="Show all tracks", variable=self.show_tracks_var,
+                       command=self.on_overlay_change).pack(side=tk.LEFT)
+        self.show_ids_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(overlay_frame, text="Numbers", variable=self.show_ids_var,
+                       command=self.on_overlay_change).pack(side=tk.LEFT, padx=(5, 0))
+
+        tk.Label(overlay_frame, text="Trail (frames)").pack(side=tk.LEFT, padx=(15, 5))
+        self.trail_var = tk.IntVar(value=0)
+        tk.Spinbox(overlay_frame, from_=0, to=150, increment=5, width=5, textvariable=self.trail_var,
+                   command=self.on_overlay_change).pack(side=tk.LEFT)
+
+        overlay_info = "Green: tracks in the table\nOrange: combined tracks\nRed: deleted tracks"
+        overlay_infobutton = tk.Button(overlay_frame, text='i', font=font.Font(family='Cambria', size=10, weight="bold"),
+                                       bg='white', fg='blue', bd=0)
+        create_tooltip(overlay_infobutton, text=overlay_info)
+        overlay_infobutton.pack(side=tk.LEFT, padx=5)
 
         # Bind events for pan
         self.image_label.bind("<ButtonPress-1>", self.start_pan)
         self.image_label.bind("<B1-Motion>", self.do_pan)
+        # A click without dragging selects the worm below the cursor
+        self.image_label.bind("<ButtonRelease-1>", self.on_click_release)
 
         # # Exit button
         # self.exit_button = tk.Button(root, text="Exit", command=root.quit)
@@ -274,23 +363,103 @@ class VideoPlayer:
         # Bind resize event
         self.root.bind("<Configure>", self.on_resize)
 
-    def set_video(self, video_path, track_df, coords_df):
-        self.play_video(video_path)
+    def set_video(self, video_path, track_df, track_index, seek_index=None, frame_cache=None, frame_source=None):
+        self.play_video(video_path, seek_index, frame_cache, frame_source)
         self.track_df = track_df
-        self.coords_df = coords_df
-
-    def play_video(self, filename):
-        self.vidFile = cv.VideoCapture(filename)
+        self.track_index = track_index
+        self.spatial_index = SpatialIndex(track_index.coords)
+        self.overlay = TrackOverlay(track_index.coords)
+        self.on_overlay_change()
+
+    def play_video(self, filename, seek_index=None, frame_cache=None, frame_source=None):
+        self.stop_playback()
+        self.close_frame_source()
+        self.renderer.clear()
+        if frame_source is not None:
+            # Frame source kept open by the ResourcePool of the FileHandler, which also closes it
+            self.frame_source = frame_source
+            self.owns_frame_source = False
+            self.vidFile = frame_source.capture
+        else:
+            self.vidFile = cv.VideoCapture(filename)
+            # Frame offsets saved beside the video for exact seeks ("<video>.seekidx.npz", built once)
+            if seek_index is None:
+                seek_index = load_seek_index(filename)
+            # frame_cache holds the first frames if the video was prefetched
+            self.frame_source = FrameSource(self.vidFile, filename, cache=frame_cache, seek_index=seek_index)
+            self.owns_frame_source = True
         self.title_label.config(text=os.path.basename(filename))
         num_frames = int(self.vidFile.get(cv.CAP_PROP_FRAME_COUNT))
         self.slider.config(from_=0, to=num_frames - 1)
         self.update_frame()
 
     def show_placeholder_at_end(self):
+        self.stop_playback()
+        self.close_frame_source()
+        self.renderer.clear()
         self.vidFile = cv.VideoCapture("placeholder.jpg")
 
-    def find_number(self):
-        if self.track_df is None or self.coords_df is None:
+    def on_overlay_change(self):
+        if self.overlay is None:
+            return
+        self.overlay.show_tracks = self.show_tracks_var.get()
+        self.overlay.show_ids = self.show_ids_var.get()
+        try:
+            self.overlay.trail_length = max(int(self.trail_var.get()), 0)
+        except (ValueError, tk.TclError):
+            self.overlay.trail_length = 0
+        self.refresh_overlay()
+
+    def set_track_operations(self, operations):
+        """Colour tracks by the combine and delete steps applied in the TrackProcessor."""
+        if self.overlay is None:
+            return
+        self.overlay.set_owner(replay_owner(operations, self.overlay.coords.track_ids))
+        if self.overlay.enabled:
+            self.refresh_overlay()
+
+    def refresh_overlay(self):
+        # Decode (from the frame cache) and compose the current frame again
+        self.renderer.clear()
+        self.update_frame()
+
+    def toggle_playback(self):
+        self.playback.toggle()
+        self.play_button.config(text="⏸ Pause" if self.playback.playing else "▶ Play")
+        if not self.playback.playing:
+            self.fps_label.config(text="")
+
+    def stop_playback(self):
+        if self.playback.playing:
+            self.toggle_playback()
+
+    def show_playback_frame(self, frame_number):
+        """Show the next frame of the playback with the slider following along."""
+        self.cur_frame = frame_number
+        self.slider.set(frame_number)
+        self.update_frame(QUALITY_FAST)
+
+    def show_playback_stats(self, achieved_fps, target_fps):
+        self.fps_label.config(text=f"{achieved_fps:.1f} / {target_fps:.1f} fps")
+
+    def close_frame_source(self):
+        if self.frame_source is not None:
+            print(f"Frame cache: {self.frame_source.cache.stats()}, redraws: {self.redraw.stats()}")
+            if self.owns_frame_source:
+                self.frame_source.close()
+            self.frame_source = None
+
+    def read_frame(self, frame_number):
+        """Return the decoded frame, from the frame cache if a video is loaded."""
+        if self.frame_source is not None:
+            return self.frame_source.read(frame_number)
+        self.vidFile.set(cv.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = self.vidFile.read()
+        return frame if ret else None
+
+    def find_number(self, direction=0):
+        """Jump to the first frame of a track, or with direction 1/-1 to its next/previous appearance."""
+        if self.track_index is None:
             messagebox.showwarning("Data Not Loaded", "Please load the video and associated data files first.")
             return
 
@@ -298,42 +467,34 @@ class VideoPlayer:
             # Get the number from the user
             number = int(self.find_number_entry.get())
 
-            # Construct the column names dynamically for X and Y based on the user input
-            x_column = f"X{number}"
-            y_column = f"Y{number}"
-
-            # Ensure that the columns for X and Y exist in the dataframe
-            if x_column not in self.coords_df.columns or y_column not in self.coords_df.columns:
+            # Ensure that the track exists in the coordinate data
+            if not self.track_index.has_track(number):
                 messagebox.showerror("Track Not Found", f"Track {number} not found in the video and respective data.")
                 return
 
-            # Get the row corresponding to the input number from the track dataframe
-            track_row = self.track_df.loc[self.track_df.index == number].squeeze()
-
-            if not track_row.empty:
-                # Retrieve the frame number from the track row
-                frame_number = int(track_row['1stFrame'])
-
-                # Get the corresponding row from the coords dataframe using the frame number
-                coords_row = self.coords_df.loc[self.coords_df.index == frame_number].squeeze()
+            if direction > 0:
+                frame_number = self.track_index.next_appearance(number, self.cur_frame)
+            elif direction < 0:
+                frame_number = self.track_index.previous_appearance(number, self.cur_frame)
+            else:
+                frame_number = self.track_index.first(number)
 
-                # Fetch the coordinates for X and Y using the frame number and user input number
-                x_coord = int(coords_row[x_column])
-                y_coord = int(coords_row[y_column])
+            if frame_number is None:
+                messagebox.showinfo("No Further Appearance",
+                                    f"Track {number} does not appear {'after' if direction > 0 else 'before'} frame {self.cur_frame}.")
+                return
 
-                # Set the circle coordinates BEFORE updating the frame
-                self.circle_coords = (x_coord, y_coord)
+            # Set the circle coordinates BEFORE updating the frame
+            x_coord, y_coord = self.track_index.position(number, frame_number)
+            self.circle_coords = (int(x_coord), int(y_coord))
 
-                # Flag that we're doing a frame jump related to the find_number operation
-                self.is_find_number_operation = True
+            # Flag that we're doing a frame jump related to the find_number operation
+            self.is_find_number_operation = True
 
-                # Set the frame and force a single update
-                self.cur_frame = frame_number
-                self.slider.set(self.cur_frame)
-                self.update_frame()
-
-            else:
-                messagebox.showerror("Frame Not Found", f"No frame data found for track {number}.")
+            # Set the frame and force a single update
+            self.cur_frame = frame_number
+            self.slider.set(self.cur_frame)
+            self.update_frame()
 
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid integer for the track number.")
@@ -341,15 +502,19 @@ class VideoPlayer:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
     def on_slider_move(self, value):
+        if self.playback.playing:
+            if int(value) == self.cur_frame:
+                return  # Slider follows the playback
+            self.playback.anchor(int(value))  # Slider moved by the user during playback
         self.cur_frame = int(value)
-        self.vidFile.set(cv.CAP_PROP_POS_FRAMES, self.cur_frame)
         # Keep the circle coordinates intact if they exist (no reset to None)
         # We only reset the circle if it's a user-driven slider move, not frame jump via find_number
         if not hasattr(self, "is_find_number_operation") or not self.is_find_number_operation:
             self.circle_coords = None  # Reset only if not part of find_number
 
-        # Update the frame
-        self.update_frame()
+        # Update the frame (fast interpolation while the slider is dragged)
+        self.redraw.request(QUALITY_FAST)
+        self.schedule_high_quality()
 
         # Reset the flag after slider move
         if hasattr(self, "is_find_number_operation"):
@@ -362,7 +527,6 @@ class VideoPlayer:
             frame_number = int(self.frame_entry.get())
             if 0 <= frame_number <= self.slider.cget('to'):
                 self.cur_frame = frame_number
-                self.vidFile.set(cv.CAP_PROP_POS_FRAMES, self.cur_frame)
                 self.slider.set(self.cur_frame)
                 self.circle_coords = None
                 self.update_frame()
@@ -371,6 +535,16 @@ class VideoPlayer:
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid integer for the frame number.")
 
+    def show_position(self, frame_number, xy):
+        """Jump to a frame and mark a position in it with the circle of 'Find Number'."""
+        if self.track_index is None:
+            return
+        self.circle_coords = (int(xy[0]), int(xy[1]))
+        self.is_find_number_operation = True
+        self.cur_frame = int(frame_number)
+        self.slider.set(self.cur_frame)
+        self.update_frame()
+
     def on_zoom(self, value):
         zoom_value = float(value)
         if zoom_value <= 1.0:
@@ -380,53 +554,103 @@ class VideoPlayer:
         else:
             self.base_scale = 1.0
             self.zoom_level = zoom_value
-        self.update_frame()
+        self.redraw.request(QUALITY_HIGH)
 
     def start_pan(self, event):
         self.pan_start_x = event.x
         self.pan_start_y = event.y
+        self.click_start = (event.x, event.y)
+
+    def on_click_release(self, event):
+        if self.click_start is None:
+            return
+        moved = abs(event.x - self.click_start[0]) + abs(event.y - self.click_start[1])
+        self.click_start = None
+        if moved <= 3:
+            self.select_at(event.x, event.y)
+
+    def widget_to_frame(self, x, y):
+        """Convert a position in image_label to frame coordinates (inverse of the transform in render_frame)."""
+        # The label centres the image
+        image_x = x - (self.image_label.winfo_width() - self.imgtk.width()) / 2
+        image_y = y - (self.image_label.winfo_height() - self.imgtk.height()) / 2
+        scale = self.base_scale * self.zoom_level
+        origin_x, origin_y = self.renderer.origin
+        return (image_x + origin_x) / scale, (image_y + origin_y) / scale
+
+    def select_at(self, x, y, tolerance=25):
+        """Select the track nearest to a click within tolerance pixels on screen."""
+        if self.spatial_index is None or self.imgtk is None:
+            return
+        frame_x, frame_y = self.widget_to_frame(x, y)
+        scale = self.base_scale * self.zoom_level
+        found = self.spatial_index.nearest(self.cur_frame, frame_x, frame_y, tolerance / scale)
+        if found is None:
+            return
+        track, _ = found
+        print(f"Selected Track: {track}")
+        self.find_number_entry.delete(0, tk.END)
+        self.find_number_entry.insert(0, track)
+        x_coord, y_coord = self.track_index.position(track, self.cur_frame)
+        self.circle_coords = (int(x_coord), int(y_coord))
+        self.render_frame()
+        if self.on_track_selected is not None:
+            self.on_track_selected(track)
 
     def do_pan(self, event):
         self.pan_offset_x -= event.x - self.pan_start_x
         self.pan_offset_y -= event.y - self.pan_start_y
         self.pan_start_x = event.x
         self.pan_start_y = event.y
-        self.update_frame()
+        self.redraw.request(QUALITY_FAST)
+        self.schedule_high_quality()
 
     def on_resize(self, event):
         if self.vidFile is not None:
-            self.update_frame()
+            self.redraw.request(QUALITY_HIGH)
+
+    def schedule_high_quality(self):
+        """Render the viewport in high quality once no further slider or pan event arrived for settle_delay."""
+        if self.settle_job is not None:
+            self.root.after_cancel(self.settle_job)
+        self.settle_job = self.root.after(self.settle_delay, self.render_high_quality)
 
-    def update_frame(self):
+    def render_high_quality(self):
+        self.settle_job = None
+        self.redraw.request(QUALITY_HIGH)
+
+    @timed("update_frame")
+    def update_frame(self, quality=QUALITY_HIGH):
         if self.vidFile is None or not self.vidFile.isOpened():
             return
 
-        self.vidFile.set(cv.CAP_PROP_POS_FRAMES, self.cur_frame)
-        ret, frame = self.vidFile.read()
-        if not ret:
+        self.renderer.timer.reset()
+        if self.renderer.frame_number != self.cur_frame:
+            with self.renderer.timer.stage("decode"):
+                frame = self.read_frame(self.cur_frame)
+            if frame is None:
+                return
+            instruments.count("frames.read")
+            if self.overlay is not None and self.overlay.enabled:
+                with self.renderer.timer.stage("overlay"):
+                    frame = self.overlay.compose(frame, self.cur_frame)
+            self.renderer.set_frame(self.cur_frame, frame)
+
+        self.render_frame(quality)
+        # Stages of the frame (decode, overlay, convert, resample, photo, ...) in ms for the timing log
+        instruments.annotate(frame=self.cur_frame, quality="high" if quality == QUALITY_HIGH else "fast",
+                             **self.renderer.timer.timings)
+
+    def render_frame(self, quality=QUALITY_HIGH):
+        """Render the viewport of the decoded current frame with zoom, pan and circle."""
+        if not self.renderer.has_frame:
+            # Nothing decoded yet (e.g. placeholder image)
+            if self.vidFile is not None and self.vidFile.isOpened() and self.renderer.frame_number is None:
+                self.update_frame(quality)
             return
 
-        img = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-        img = Image.fromarray(img)
-
-        # Scale the image based on the base scale
-        new_width = int(img.width * self.base_scale)
-        new_height = int(img.height * self.base_scale)
-        img = img.resize((new_width, new_height), Image.LANCZOS)
-
-        # Apply zoom
-        width, height = img.size
-        new_width = int(width * self.zoom_level)
-        new_height = int(height * self.zoom_level)
-        img = img.resize((new_width, new_height), Image.LANCZOS)
-
-        # Apply pan
-        try:
-            img = img.crop(
-                (self.pan_offset_x, self.pan_offset_y, self.pan_offset_x + width, self.pan_offset_y + height))
-        except Exception as e:
-            print(f"Error during cropping: {e}")
-            return
+        img = self.renderer.render(self.base_scale, self.zoom_level, self.pan_offset_x, self.pan_offset_y, quality,
+                                   VIEW_SIZE)
 
         # If we have circle coordinates, adjust them for zoom and pan and draw the circle
         if self.circle_coords:
@@ -434,17 +658,18 @@ class VideoPlayer:
             x, y = self.circle_coords
 
             # Adjust coordinates based on zoom and pan
-            adjusted_x = (x * self.base_scale * self.zoom_level) - self.pan_offset_x
-            adjusted_y = (y * self.base_scale * self.zoom_level) - self.pan_offset_y
+            adjusted_x = (x * self.base_scale * self.zoom_level) - self.renderer.origin[0]
+            adjusted_y = (y * self.base_scale * self.zoom_level) - self.renderer.origin[1]
 
             circle_radius = 20  # Adjust the size of the circle as necessary
             draw.ellipse((adjusted_x - circle_radius, adjusted_y - circle_radius,
                           adjusted_x + circle_radius, adjusted_y + circle_radius),
                          outline='red', width=3)
 
-        self.imgtk = ImageTk.PhotoImage(image=img)
-        self.image_label.imgtk = self.imgtk  # Keep a reference to avoid garbage collection
-        self.image_label.configure(image=self.imgtk)
+        with self.renderer.timer.stage("photo"):
+            self.imgtk = ImageTk.PhotoImage(image=img)
+            self.image_label.imgtk = self.imgtk  # Keep a reference to avoid garbage collection
+            self.image_label.configure(image=self.imgtk)
 
         # Adjust the slider length to match the video width
         self.slider.config(length=self.image_label.winfo_width())
@@ -456,11 +681,18 @@ class TrackProcessor:
         self.gui = gui
         self.video_player = video_player  # Reference to VideoPlayer instance
         self.track_df = None
-        self.coords_df = None
         self.process_df = None
         self.folder_path = None
         self.base_name = None
+        self.base_df = None  # Track data before the steps in the journal
+        self.journal = None  # Combine and delete steps applied to process_df with undo/redo (see track_edits)
+        self.bend_counter = None  # Body bends counted from the X/Y-Coordinates (see bends)
+        self.artifacts = None  # Reason why a track is probably no worm (see artifacts)
+        self.suggestions = []  # (tracks, score) of the chains of tracks suggested for combining (see track_linker)
+        self.collision_events = None  # Merges and splits of the tracks of the video (see collisions)
+        self.collision_items = []  # ReviewItems of the crossings list
         self.setup_gui()
+        self.video_player.on_track_selected = self.select_track
 
     def setup_gui(self):
         self.gui.pack_propagate(False)  # Prevent the frame from resizing to fit its content
@@ -499,6 +731,10 @@ class TrackProcessor:
         self.undo_button = ttk.Button(operations_frame, text='↩ Undo', command=self.undo)
         self.undo_button.pack(side='left', padx=(5, 5), pady=(5, 5))
 
+        # Redo button
+        self.redo_button = ttk.Button(operations_frame, text='↪ Redo', command=self.redo)
+        self.redo_button.pack(side='left', padx=(0, 5), pady=(5, 5))
+
         # Frame for combine and delete sections
         track_operations_frame = tk.Frame(operations_frame)
         track_operations_frame.pack(side='left', fill='x', expand=True, padx=(5, 10))
@@ -533,28 +769,169 @@ class TrackProcessor:
         create_tooltip(delete_tracks_infobutton, text=delete_tracks_info)
         delete_tracks_infobutton.pack(side='left', padx=5)
 
+        # Suggested combinations section
+        suggestions_frame = tk.Frame(self.gui)
+        suggestions_frame.pack(fill='x', padx=10, pady=(0, 10))
+
+        tk.Label(suggestions_frame, text="Suggestions").pack(side='left', anchor='n', padx=(0, 5))
+        self.suggestions_list = tk.Listbox(suggestions_frame, height=4, exportselection=False)
+        self.suggestions_list.pack(side='left', fill='x', expand=True, padx=(0, 5))
+        self.suggestions_list.bind("<<ListboxSelect>>", self.on_suggestion_select)
+        self.suggestions_list.bind("<Double-1>", lambda event: self.apply_suggestion())
+        ttk.Button(suggestions_frame, text="Apply", command=self.apply_suggestion).pack(side='left', anchor='n', padx=(0, 5))
+
+        suggestions_info = "Tracks that probably belong to the same worm (a track ending where another one starts shortly after),\nbest first. Click on a suggestion to look at it in the video, double-click or 'Apply' to combine the tracks."
+        suggestions_infobutton = tk.Button(suggestions_frame, text='i', font=myFont, bg='white', fg='blue', bd=0)
+        create_tooltip(suggestions_infobutton, text=suggestions_info)
+        suggestions_infobutton.pack(side='left', anchor='n', padx=5)
+
+        # Crossings section
+        crossings_frame = tk.Frame(self.gui)
+        crossings_frame.pack(fill='x', padx=10, pady=(0, 10))
+
+        tk.Label(crossings_frame, text="Crossings    ").pack(side='left', anchor='n', padx=(0, 5))
+        self.crossings_list = tk.Listbox(crossings_frame, height=4, exportselection=False)
+        self.crossings_list.pack(side='left', fill='x', expand=True, padx=(0, 5))
+        self.crossings_list.bind("<<ListboxSelect>>", self.on_crossing_select)
+        self.crossings_list.bind("<Double-1>", lambda event: self.apply_crossing())
+        ttk.Button(crossings_frame, text="Delete", command=self.apply_crossing).pack(side='left', anchor='n', padx=(0, 5))
+
+        crossings_info = "Places where worms touch and are tracked as one object. 'Delete x' lines are tracks shared by two worms\nfrom the merge until they split again; the other lines are merges and splits to check. Click on a line to\nsee it in the video, double-click or 'Delete' to delete the proposed track."
+        crossings_infobutton = tk.Button(crossings_frame, text='i', font=myFont, bg='white', fg='blue', bd=0)
+        create_tooltip(crossings_infobutton, text=crossings_info)
+        crossings_infobutton.pack(side='left', anchor='n', padx=5)
+
         # Horizontal separator
         ttk.Separator(self.gui, orient="horizontal").pack(fill='x')
 
-    def set_track_data(self, track_df, coords_df, process_df, folder_path, base_name):
+    def set_track_data(self, track_df, base_df, folder_path, base_name, journal, coords=None, bend_counter=None,
+                       artifacts=None):
         self.track_df = track_df
-        self.coords_df = coords_df
-        self.process_df = process_df
+        if bend_counter is None and coords is not None:
+            bend_counter = BendCounter(coords, frame_rate(track_df))
+        self.bend_counter = bend_counter
+        self.artifacts = artifacts
+        self.base_df = base_df
+        self.journal = journal
+        self.process_df = apply_operations(base_df, journal.operations)
         self.folder_path = folder_path
         self.base_name = base_name
+        self.video_player.set_track_operations(self.operations)
         # Update the Table
-        self.load_track_file_from_data(process_df)
+        self.load_track_file_from_data(self.process_df)
+        track_index = self.video_player.track_index
+        self.collision_events = detect_collisions(track_index) if track_index is not None else None
+        self.update_suggestions()
         # # Update the basename label
         # self.basename_label.config(text=f"File: {base_name}")
 
     def load_track_file_from_data(self, process_df):
         # Update the pandastable with the new DataFrame
-        relevant_columns = process_df[['#Frames', '1stFrame', 'time(s)', 'Bends', 'BBPS']] # display only columns relevant for combining tracks
+        relevant_columns = self.table_columns(process_df)
         self.pt.updateModel(TableModel(relevant_columns))
         self.pt.redraw()
         RowHeader(table=self.pt).toggleIndex()
         self.pt.redraw()
 
+    def table_columns(self, process_df):
+        relevant_columns = process_df[['#Frames', '1stFrame', 'time(s)', 'Bends', 'BBPS']] # display only columns relevant for combining tracks
+        if self.bend_counter is not None:
+            # Bends counted from the X/Y-Coordinates, including bends in the gaps between combined tracks
+            owner = replay_owner(self.operations, self.bend_counter.coords.track_ids)
+            xy_bends = self.bend_counter.table(owner)
+            relevant_columns = relevant_columns.join(xy_bends['BBPS'].round(3).rename('BBPS (XY)'))
+            if self.artifacts is not None:
+                # Tracks that probably are no worms, to be checked and deleted
+                marked = mark_rows(self.artifacts, owner, self.bend_counter.coords.track_ids)
+                relevant_columns = relevant_columns.join(marked.rename('Artifact'))
+                relevant_columns['Artifact'] = relevant_columns['Artifact'].fillna("")
+        return relevant_columns
+
+    def update_table(self):
+        with instruments.timer("table.columns"):
+            relevant_columns = self.table_columns(self.process_df)
+        with instruments.timer("table.redraw", rows=len(relevant_columns)):
+            self.pt.updateModel(TableModel(relevant_columns))
+            self.pt.redraw()
+            RowHeader(table=self.pt) # removed .toggleIndex() to keep the Tracks according to the combination
+            self.pt.redraw()
+        with instruments.timer("table.suggestions"):
+            self.update_suggestions()
+
+    def update_suggestions(self):
+        """List the suggested combinations and the crossings of the tracks of the current table."""
+        self.suggestions_list.delete(0, tk.END)
+        self.suggestions = []
+        self.crossings_list.delete(0, tk.END)
+        self.collision_items = []
+        track_index = self.video_player.track_index
+        if self.process_df is None or track_index is None:
+            return
+        owner = replay_owner(self.operations, track_index.coords.track_ids)
+        links = link_tracks(track_index, owner)
+        self.suggestions = [(tracks, score) for tracks, score in suggest_combines(links)
+                            if self.process_df.index.isin(tracks).sum() == len(tracks)]
+        for tracks, score in self.suggestions:
+            self.suggestions_list.insert(tk.END, f"{','.join(map(str, tracks))}   (score {score:.2f})")
+
+        # Merges and splits of tracks still in the table
+        if self.collision_events is not None:
+            track_ids = track_index.coords.track_ids
+            removed = track_ids[~pd.Index(track_ids).isin(self.process_df.index)]  # Deleted or combined into others
+            self.collision_items = review_items(self.collision_events, removed)
+        for item in self.collision_items:
+            self.crossings_list.insert(tk.END, item.text)
+
+    def selected_suggestion(self):
+        selection = self.suggestions_list.curselection()
+        return self.suggestions[selection[0]][0] if selection else None
+
+    def on_suggestion_select(self, event):
+        """Fill in the tracks of the suggestion and show where the second track starts."""
+        tracks = self.selected_suggestion()
+        if tracks is None:
+            return
+        self.entry_combine_tracks.set(",".join(map(str, tracks)))
+        self.pass_index_to_video_player(tracks[1])
+
+    def on_crossing_select(self, event):
+        """Show the merge of the selected line in the video."""
+        selection = self.crossings_list.curselection()
+        if not selection:
+            return
+        item = self.collision_items[selection[0]]
+        if item.delete:
+            self.entry_delete_tracks.set(",".join(map(str, item.delete)))
+        self.video_player.show_position(item.frame, item.xy)
+
+    def apply_crossing(self):
+        selection = self.crossings_list.curselection()
+        if not selection:
+            messagebox.showinfo("Crossings", "Please select a line first.")
+            return
+        item = self.collision_items[selection[0]]
+        if not item.delete:
+            messagebox.showinfo("Crossings", "No track is proposed for deletion here, please check the tracks in the video.")
+            return
+        self.entry_delete_tracks.set(",".join(map(str, item.delete)))
+        self.delete_tracks()
+
+    def apply_suggestion(self):
+        tracks = self.selected_suggestion()
+        if tracks is None:
+            messagebox.showinfo("Suggestions", "Please select a suggestion first.")
+            return
+        self.entry_combine_tracks.set(",".join(map(str, tracks)))
+        self.combine_tracks()
+
+    @property
+    def operations(self):
+        """All combine and delete steps applied to the original track file."""
+        if self.journal is None:
+            return []
+        return self.journal.base_operations + self.journal.operations
+
+    @timed("combine_tracks")
     def combine_tracks(self):
         if self.process_df is None:
             messagebox.showwarning("No Track Data", "Please load a track first.")
@@ -562,45 +939,30 @@ class TrackProcessor:
 
         try:
             track_list = list(map(int, self.entry_combine_tracks.get().split(",")))
+            instruments.annotate(tracks=track_list)
             log_root = os.path.join(self.folder_path, "tracks_processed", f"{self.base_name}_log.txt")
-            undo_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp_undo.xlsx")
-            temp_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp.xlsx")
 
             # Ensure the 'tracks_processed' directory exists
             Path(os.path.dirname(log_root)).mkdir(parents=True, exist_ok=True)
 
-            #Write to undo file
-            self.process_df.to_excel(undo_file)
-            # print(self.process_df)
-
-            # Rename each track to the first track in the list
-            for i in range(len(track_list)):
-                self.process_df = self.process_df.rename(index={track_list[i]: track_list[0]})
-
-            # Group by the new index and sum the values
-            self.process_df = self.process_df.groupby('Track').sum()
-
-            # Write temporary file in case anything crashes
-            self.process_df.to_excel(temp_file)
-            # Update the Table
-            relevant_columns = self.process_df[['#Frames', '1stFrame', 'time(s)', 'Bends', 'BBPS']] # display only columns relevant for combining tracks
-            self.pt.updateModel(TableModel(relevant_columns))
-            self.pt.redraw()
-            RowHeader(table=self.pt) # removed .toggleIndex() to keep the Tracks according to the combination
-            self.pt.redraw()
-
+            # Rename each track to the first track in the list and sum the values
+            self.process_df = apply_operation(self.process_df, COMBINE, track_list)
 
             # Log the combination
             with open(log_root, "a") as log_file:
-                log_file.write(f"Tracks {', '.join(map(str, track_list))} combined to Track {track_list[0]}!\n")
+                log_file.write(f"{log_line(COMBINE, track_list)}\n")
             self.entry_combine_tracks.set("")
             print(f"Tracks {', '.join(map(str, track_list))} combined successfully.")
+            self.add_operation(COMBINE, track_list)
+            # Update the Table
+            self.update_table()
             # messagebox.showinfo("Success", f"Tracks {', '.join(map(str, track_list))} combined successfully.")
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter valid integers separated by commas (without spaces in between!).")
         # except Exception as e:
         #     messagebox.showerror("Error", f"Error combining tracks:\n{e}")
 
+    @timed("delete_tracks")
     def delete_tracks(self):
         if self.process_df is None:
             messagebox.showwarning("No Track Data", "Please load a track first.")
@@ -608,34 +970,23 @@ class TrackProcessor:
 
         try:
             delete_list = list(map(int, self.entry_delete_tracks.get().split(",")))
+            instruments.annotate(tracks=delete_list)
             log_root = os.path.join(self.folder_path, "tracks_processed", f"{self.base_name}_log.txt")
-            undo_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp_undo.xlsx")
-            temp_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp.xlsx")
 
             # Ensure the 'tracks_processed' directory exists
             Path(os.path.dirname(log_root)).mkdir(parents=True, exist_ok=True)
 
-            # Write to undo file
-            self.process_df.to_excel(undo_file)
             # Delete track
-            self.process_df = self.process_df.drop(delete_list)
-            # Write to temporary file in case anything crashes
-            self.process_df.to_excel(temp_file)
-
-            # Update the Table
-            # self.pt.updateModel(TableModel(self.process_df))
-            relevant_columns = self.process_df[['#Frames', '1stFrame', 'time(s)', 'Bends',
-                                                'BBPS']]  # display only columns relevant for combining tracks
-            self.pt.updateModel(TableModel(relevant_columns))
-            self.pt.redraw()
-            RowHeader(table=self.pt) # removed .toggleIndex() to keep the Tracks according to the combination
-            self.pt.redraw()
+            self.process_df = apply_operation(self.process_df, DELETE, delete_list)
 
             # Log the deletion
             with open(log_root, "a") as log_file:
-                log_file.write(f"Track(s) {', '.join(map(str, delete_list))} deleted!\n")
+                log_file.write(f"{log_line(DELETE, delete_list)}\n")
             self.entry_delete_tracks.set("")
             print(f"Track(s) {', '.join(map(str, delete_list))} deleted successfully.")
+            self.add_operation(DELETE, delete_list)
+            # Update the Table
+            self.update_table()
             # messagebox.showinfo("Success", f"Track(s) {', '.join(map(str, delete_list))} deleted successfully.")
         except KeyError as ke:
             messagebox.showerror("Deletion Error", f"One or more tracks not found:\n{ke}")
@@ -644,83 +995,95 @@ class TrackProcessor:
         # except Exception as e:
         #     messagebox.showerror("Error", f"Error deleting tracks:\n{e}")
 
+    @timed("undo")
     def undo(self):
         if self.process_df is None:
             messagebox.showwarning("No Track Data", "Please load a track first.")
             return
+        if not self.journal.can_undo:
+            messagebox.showinfo("Undo", "There is no step left to undo.")
+            return
 
         try:
             log_root = os.path.join(self.folder_path, "tracks_processed", f"{self.base_name}_log.txt")
-            undo_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp_undo.xlsx")
-            temp_file = os.path.join(self.folder_path, f"{self.base_name}_tracks.txt.temp.xlsx")
-
-            # Load process_df from undo_file
-            self.process_df = pd.read_excel(undo_file, index_col='Track')
-            # Write to temporary file in case anything crashes
-            self.process_df.to_excel(temp_file)
+            Path(os.path.dirname(log_root)).mkdir(parents=True, exist_ok=True)
 
-            # Update the Table
-            # self.pt.updateModel(TableModel(self.process_df))
-            relevant_columns = self.process_df[['#Frames', '1stFrame', 'time(s)', 'Bends',
-                                                'BBPS']]  # display only columns relevant for combining tracks
-            self.pt.updateModel(TableModel(relevant_columns))
-            self.pt.redraw()
-            RowHeader(table=self.pt) # removed .toggleIndex() to keep the Tracks according to the combination
-            self.pt.redraw()
-            # Log the deletion
+            # Rebuild process_df from the track data with the remaining steps
+            step = self.journal.undo()
+            self.process_df = apply_operations(self.base_df, self.journal.operations)
+            self.video_player.set_track_operations(self.operations)
+            self.update_table()
+            # Log the undo (with the step, so read_log can replay several undos)
             with open(log_root, "a") as log_file:
-                log_file.write(f"Last step undone.\n")
-            print(f"Last step undone.\n")
+                log_file.write(f"{undo_line(step)}\n")
+            print(f"{undo_line(step)}\n")
 
         except KeyError as ke:
             messagebox.showerror("Undo Error", f"Something went wrong reversing the last action:\n{ke}")
 
+    def redo(self):
+        if self.process_df is None:
+            messagebox.showwarning("No Track Data", "Please load a track first.")
+            return
+        if not self.journal.can_redo:
+            messagebox.showinfo("Redo", "There is no undone step to redo.")
+            return
+
+        try:
+            log_root = os.path.join(self.folder_path, "tracks_processed", f"{self.base_name}_log.txt")
+            Path(os.path.dirname(log_root)).mkdir(parents=True, exist_ok=True)
+
+            operation, tracks = self.journal.redo()
+            self.process_df = apply_operation(self.process_df, operation, tracks)
+            self.video_player.set_track_operations(self.operations)
+            self.update_table()
+            # Log the redo
+            with open(log_root, "a") as log_file:
+                log_file.write(f"{redo_line((operation, tracks))}\n")
+            print(f"{redo_line((operation, tracks))}\n")
+
+        except KeyError as ke:
+            messagebox.showerror("Redo Error", f"Something went wrong repeating the last action:\n{ke}")
+
+    def add_operation(self, operation, tracks):
+        # Journal the step (synced to disk in case anything crashes)
+        self.journal.append(operation, tracks)
+        self.video_player.set_track_operations(self.operations)
+
+    @timed("save_file")
     def save_file(self):
+        """Write the processed Excel file; returns whether it was written."""
         if self.process_df is None:
             messagebox.showwarning("No Track Data", "There is no track data to save.")
-            return
+            return False
 
         try:
             processed_root = os.path.join(self.folder_path, "tracks_processed")
-            Path(processed_root).mkdir(parents=True, exist_ok=True)
-            filename_tracks = self.base_name
-
-            selected_columns = self.process_df[["#Frames", "time(s)", "Bends"]]
-            # Compute additional metrics
-            df2 = selected_columns.copy()
-            df2['BBPS'] = self.process_df['Bends'].div(self.process_df['time(s)'], axis=0)
-            df2['BBPM'] = df2['BBPS'] * 60
-            df2['mean (BBPM)'] = df2['BBPM'].mean()
-            df2['SEM'] = df2['BBPM'].sem()
-            df2['n'] = len(df2['BBPM'])
-
-            max_value = self.process_df['time(s)'].max()
-            threshold_value = max_value * 0.5
-            df3 = df2[df2['time(s)'] > threshold_value].copy()
-            df3['mean (BBPM)'] = df3['BBPM'].mean()
-            df3['SEM'] = df3['BBPM'].sem()
-            df3['n'] = len(df3['BBPM'])
-
-            # Save to Excel
-            with pd.ExcelWriter(os.path.join(processed_root, f"{filename_tracks}_processed.xlsx")) as writer:
-                df3.to_excel(writer, sheet_name='>50%_tracked_swimming_cycles')
-                df2.to_excel(writer, sheet_name='all_swimming_cycles')
-                self.process_df.to_excel(writer, sheet_name='all_data')
+
+            # Compute BBPS/BBPM and save to Excel
+            instruments.annotate(video=self.base_name, rows=len(self.process_df))
+            write_processed(self.process_df, processed_root, self.base_name)
 
             messagebox.showinfo("Save Successful", f"Processed data saved to {processed_root}.")
             self.reset_gui()
+            return True
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter valid integers separated by commas (without spaces in between!).")
         # except Exception as e:
         #     messagebox.showerror("Error", f"Error saving file:\n{e}")
+        return False
 
     def reset_gui(self):
         self.entry_combine_tracks.set("")
         self.entry_delete_tracks.set("")
         self.track_df = None
-        self.coords_df = None
         self.pt.updateModel(TableModel(pd.DataFrame()))
         self.pt.redraw()
+        self.suggestions = []
+        self.suggestions_list.delete(0, tk.END)
+        self.collision_events = None
+        self.collision_items = []
+        self.crossings_list.delete(0, tk.END)
         # self.basename_label.config(text="No track loaded")
 
     def save_proceed(self):
@@ -732,6 +1095,16 @@ class TrackProcessor:
         self.save_file()
         self.gui.master.destroy()
 
+    def select_track(self, track):
+        """Highlight the row of a track clicked in the video."""
+        if self.process_df is None:
+            return
+        df = self.pt.model.df
+        if track not in df.index:
+            print(f"Track {track} is not in the table (combined into another track or deleted).")
+            return
+        self.pt.movetoSelection(row=df.index.get_loc(track))
+
     def on_index_double_click(self, event):
         """Handle double-click event on the row index (header)."""
         # Get the row that was clicked
@@ -759,6 +1132,8 @@ class FilePostprocessing:
     def __init__(self, root):
         self.root = root
         self.data_root = None
+        self.jobs = None  # PostprocessingJobs while line folders are processed
+        self.poll_interval = 200  # ms
 
         # Set up the GUI
         self.setup_gui()
@@ -843,6 +1218,15 @@ exp_day/
                                         state=tk.DISABLED)
         self.process_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        # Button to cancel the processing (enabled while processing)
+        self.cancel_button = tk.Button(self.controls_frame, text="Cancel", command=self.cancel_processing,
+                                       state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Progress of the processing
+        self.progress_label = tk.Label(self.controls_frame, text="", bg="#E6E6E6")
+        self.progress_label.pack(side=tk.LEFT, padx=5, pady=5)
+
     def toggle_controls(self):
         """Toggle the visibility of the controls frame."""
         if self.controls_frame.winfo_ismapped():
@@ -868,63 +1252,52 @@ exp_day/
             messagebox.showerror("Error", "No folder selected.")
             return
 
-        for rootdir, dirs, files in os.walk(self.data_root):
-            for cond_folder in dirs:
-                condition_path = join(rootdir, cond_folder)
-                line_folders = self.find_subfolders(condition_path)
-
-                for line_folder in line_folders:
-                    tracks_processed_path = join(line_folder, "tracks_processed")
-                    if os.path.exists(tracks_processed_path):
-                        self.analyze_data(line_folder, tracks_processed_path)
-                    # else:
-                    #     print(f"Skipping {line_folder}: 'tracks_processed' folder not found.")
-
-        messagebox.showinfo("Process Complete", "Data processing complete.")
-
-    def find_subfolders(self, condition_path):
-        """Find subfolders under a condition folder (e.g., line1, line2)."""
-        subfolders = []
-        for root, dirs, _ in os.walk(condition_path):
-            for dir_name in dirs:
-                subfolders.append(join(root, dir_name))
-        return subfolders
-
-    def analyze_data(self, line_folder, tracks_processed_path):
-        """Analyze data inside a tracks_processed folder and write output to the line folder."""
-        text_paths = []
-        file_names = []
-
-        # Collect files from tracks_processed
-        for root, _, files in os.walk(tracks_processed_path):
-            for file in files:
-                if "_processed.xlsx" in file:
-                    text_paths.append(join(root, file))
-                    file_names.append(file[:-9])
-
-        all_dfs = []
-        wanted_columns = ['BBPM']
-
-        # Process each file, extract desired columns, and rename them
-        for text_path in text_paths:
-            data = pd.read_excel(text_path, header=0)
-            if wanted_columns:
-                data = data[wanted_columns]
-            data = data.rename(columns={"BBPM": basename(text_path)})
-            all_dfs.append(data)
-
-        if all_dfs:
-            # Concatenate data from all files
-            master_df = pd.concat(all_dfs, axis=1)
-
-            # Output the results to the line folder
-            output_file = join(line_folder, f"{basename(line_folder)}_results.xlsx")
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                master_df.to_excel(writer, sheet_name=basename(line_folder))
-
-            print(f"Results written to: {output_file}")
-        # else:
-        #     print(f"No '_processed.xlsx' files found in {tracks_processed_path}")
+        if self.jobs is not None:
+            return
+
+        jobs = find_line_folders(self.data_root)
+        if not jobs:
+            messagebox.showinfo("Process Complete", "No 'tracks_processed' folders found.")
+            return
+
+        # Process the line folders in worker processes and check on them from the event loop
+        self.jobs = PostprocessingJobs(jobs)
+        self.process_button.config(state=tk.DISABLED)
+        self.select_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.poll_processing()
+
+    def poll_processing(self):
+        done, total = self.jobs.poll()
+        self.progress_label.config(text=f"{done} / {total} line folders")
+        if not self.jobs.finished:
+            self.root.after(self.poll_interval, self.poll_processing)
+            return
+
+        jobs, self.jobs = self.jobs, None
+        jobs.close()
+        # Durations measured in the worker processes
+        for line_folder, ms in jobs.durations():
+            instruments.record("analyze_data", ms, {"line_folder": line_folder, "worker": True})
+        self.process_button.config(state=tk.NORMAL)
+        self.select_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        errors = jobs.errors()
+        for line_folder, error in errors:
+            print(f"Error processing {line_folder}: {error}")
+        if errors:
+            messagebox.showerror("Process Incomplete", f"{len(errors)} of {total} line folders could not be processed:\n"
+                                 + "\n".join(line_folder for line_folder, _ in errors[:10]))
+        elif jobs.cancelled:
+            messagebox.showinfo("Process Cancelled", "Data processing cancelled.")
+        else:
+            messagebox.showinfo("Process Complete", "Data processing complete.")
+
+    def cancel_processing(self):
+        """Cancel the line folders not processed yet (the running ones are finished)."""
+        if self.jobs is not None:
+            self.jobs.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
 
 
 # ------------------ ToolTip Class ------------------
@@ -988,6 +1361,74 @@ def create_tooltip(widget, text):
     widget.bind('<Enter>', lambda event: toolTip.showtip(text))
     widget.bind('<Leave>', lambda event: toolTip.hidetip())
 
+# ------------------ TimingPanel Class ------------------
+
+class TimingPanel:
+    """Window with the p50/p95 latency of the timed operations, refreshed every refresh_interval ms."""
+
+    def __init__(self, root, refresh_interval=1000):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.window = None
+        self.job = None
+        self.record_var = tk.BooleanVar(value=instruments.enabled)
+
+    def show(self):
+        if self.window is not None:
+            self.window.lift()
+            return
+        self.record_var.set(instruments.enabled)
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Timing")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = tk.Frame(self.window)
+        controls.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        tk.Checkbutton(controls, text="Record timings", variable=self.record_var,
+                       command=self.on_record_change).pack(side=tk.LEFT)
+        tk.Button(controls, text="Reset", command=instruments.reset).pack(side=tk.LEFT, padx=10)
+        self.log_label = tk.Label(controls, text="", anchor="w")
+        self.log_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        columns = ("count", "p50", "p95", "max")
+        self.tree = ttk.Treeview(self.window, columns=columns, height=16)
+        self.tree.heading("#0", text="Operation")
+        self.tree.column("#0", width=200)
+        for column, text in zip(columns, ("Count", "p50 (ms)", "p95 (ms)", "Max (ms)")):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=80, anchor="e")
+        self.tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10)
+        self.counters_label = tk.Label(self.window, text="", anchor="w", justify="left")
+        self.counters_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        self.refresh()
+
+    def on_record_change(self):
+        if self.record_var.get():
+            instruments.enable(os.environ.get(TIMING_LOG_ENV) or DEFAULT_TIMING_LOG)
+        else:
+            instruments.disable()
+
+    def refresh(self):
+        self.job = None
+        if self.window is None:
+            return
+        self.tree.delete(*self.tree.get_children())
+        for name, stats in instruments.summary().items():
+            self.tree.insert("", tk.END, text=name, values=(stats["count"], f"{stats['p50']:.1f}",
+                                                            f"{stats['p95']:.1f}", f"{stats['max']:.1f}"))
+        self.counters_label.config(text=", ".join(f"{name}: {n}" for name, n in sorted(instruments.counters.items())))
+        self.log_label.config(text=f"Log: {instruments.log_path}" if instruments.enabled and instruments.log_path
+                              else "")
+        instruments.flush()
+        self.job = self.root.after(self.refresh_interval, self.refresh)
+
+    def close(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        self.window.destroy()
+        self.window = None
+
 # ------------------ Main Function ------------------
 
 def main():
@@ -1018,6 +1459,13 @@ def main():
     status_label = tk.Label(top_frame, text=" ", font=("Helvetica", 12))
     status_label.pack(side=tk.RIGHT, padx=10)
 
+    # Video selector below the top frame (open any video of the folder, saved videos are ticked)
+    video_frame = tk.Frame(right_frame)
+    video_frame.pack(side=tk.TOP, fill=tk.X, padx=30, pady=(0, 5))
+    tk.Label(video_frame, text="Video").pack(side=tk.LEFT, padx=(0, 5))
+    video_selector = ttk.Combobox(video_frame, state="readonly")
+    video_selector.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
     # Initialize TrackProcessor in the middle part of the right frame
     track_processor_frame = tk.Frame(right_frame, height=400)  # Give it a fixed height
     track_processor_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=False, padx=25)  # Don't expand beyond its height
@@ -1034,7 +1482,7 @@ def main():
     file_postprocessing = FilePostprocessing(file_postprocessing_frame)
 
     # Initialize FileHandler
-    file_handler = FileHandler(video_player, track_processor, status_label, root)
+    file_handler = FileHandler(video_player, track_processor, status_label, root, video_selector)
 
     # Add Select Folder and Save & Proceed buttons inside the top_frame
     select_folder_button = tk.Button(top_frame, text="Select Folder", command=file_handler.select_folder)
@@ -1046,8 +1494,15 @@ def main():
     save_exit_button = tk.Button(top_frame, text="Save & Exit",bg='#ff6666', relief='groove', command=file_handler.save_exit)
     save_exit_button.pack(side=tk.LEFT, padx=10)
 
+    # Optional panel with the latency of the timed operations
+    timing_panel = TimingPanel(root)
+    timing_button = tk.Button(top_frame, text="Timing", relief='groove', command=timing_panel.show)
+    timing_button.pack(side=tk.LEFT, padx=10)
+
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # The postprocessing workers start this script again; in the frozen .exe they must not open the GUI
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,307 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# ------------------ Track Edits ------------------
+#
+# Combine and delete operations of the TrackProcessor as (operation, [tracks]) tuples. They are written to
+# "tracks_processed/<base>_log.txt" as readable lines, which read_log turns back into operations. Older versions
+# could only undo the last step ("Last step undone."); undo and redo of any number of steps are logged with the step
+# they affect ("Step undone: ..." / "Step redone: ..."), and a log with such lines is replayed with both stacks.
+# replay_owner
+# follows the operations for every raw track of a video, so it is known which row of process_df a track ended up
+# in (or that it was deleted).
+#
+# OperationJournal is the source of truth for the edits of one video: every step, undo and redo is appended as one
+# JSON line to "<base>_tracks.txt.journal.jsonl" and synced to disk, so a crash loses nothing. process_df is
+# rebuilt from the track file by applying the active operations; Excel is only written on save. Temporary Excel
+# files of older versions are still loaded: the steps leading to them are taken from the log once and kept in the
+# journal as its "base" record.
+#
+# Combining only touches the rows of the combined tracks: their values are merged column by column (COMBINE_RULES)
+# into the row of the first track, in place, and the other rows are dropped. Counts and durations are summed,
+# 1stFrame is the earliest frame, averages are weighted by #Frames and BBPS is recomputed from the summed Bends and
+# time(s). Columns without a rule are summed like the former groupby('Track').sum() did.
+
+COMBINE = "combine"
+DELETE = "delete"
+UNDO = "undo"
+REDO = "redo"
+BASE = "base"
+
+SUM, MIN, MAX, MEAN = "sum", "min", "max", "mean"
+COMBINE_RULES = {
+    "Length": SUM, "Distance": SUM, "#Frames": SUM, "time(s)": SUM, "Bends": SUM,
+    "1stFrame": MIN,
+    "MaxSpeed": MAX,
+}
+RATES = {"BBPS": ("Bends", "time(s)")}  # Recomputed as numerator / denominator after merging
+
+_COMBINE_LINE = re.compile(r"^Tracks ([\d, ]+) combined to Track (\d+)!")
+_DELETE_LINE = re.compile(r"^Track\(s\) ([\d, ]+) deleted!")
+_UNDO_PREFIX = "Step undone: "
+_REDO_PREFIX = "Step redone: "
+
+
+def parse_tracks(text):
+    return [int(track) for track in text.split(",") if track.strip()]
+
+
+def log_line(operation, tracks):
+    """Line of the log file for a combine or delete step."""
+    if operation == COMBINE:
+        return f"Tracks {', '.join(map(str, tracks))} combined to Track {tracks[0]}!"
+    return f"Track(s) {', '.join(map(str, tracks))} deleted!"
+
+
+def undo_line(step):
+    return _UNDO_PREFIX + log_line(*step)
+
+
+def redo_line(step):
+    return _REDO_PREFIX + log_line(*step)
+
+
+def parse_log_line(line):
+    """Return (operation, tracks) for a line of the log file or None for other lines.
+
+    Undo and redo lines give (UNDO, tracks) and (REDO, tracks) with the tracks of the step they affect, or with []
+    for the lines of older versions ("Last step undone.", "Last undone step redone.").
+    """
+    line = line.strip()
+    for prefix, operation in ((_UNDO_PREFIX, UNDO), (_REDO_PREFIX, REDO)):
+        if line.startswith(prefix):
+            step = parse_log_line(line[len(prefix):])
+            return (operation, step[1]) if step is not None and step[0] in (COMBINE, DELETE) else None
+    match = _COMBINE_LINE.match(line)
+    if match:
+        return COMBINE, parse_tracks(match.group(1))
+    match = _DELETE_LINE.match(line)
+    if match:
+        return DELETE, parse_tracks(match.group(1))
+    if line.startswith("Last step undone"):
+        return UNDO, []
+    if line.startswith("Last undone step redone"):
+        return REDO, []
+    return None
+
+
+def read_log(log_file):
+    """Return the operations of a log file with undone steps removed.
+
+    An undo line naming the step undoes one more step; "Last step undone." of older versions, which restored only
+    the state before the last step, does nothing after another undo (except in logs with "Last undone step
+    redone." lines, whose version already undid any number of steps).
+    """
+    with open(log_file, "r") as file:
+        entries = [parsed for parsed in map(parse_log_line, file) if parsed is not None]
+    several_steps = any(operation == REDO and not tracks for operation, tracks in entries)
+
+    operations = []
+    redo_stack = []
+    can_undo = False
+    for operation, tracks in entries:
+        if operation == UNDO:
+            if operations and (tracks or several_steps or can_undo):
+                redo_stack.append(operations.pop())
+            can_undo = False
+        elif operation == REDO:
+            if redo_stack:
+                operations.append(redo_stack.pop())
+        else:
+            operations.append((operation, tracks))
+            redo_stack = []
+            can_undo = True
+    return operations
+
+
+def replay_owner(operations, track_ids):
+    """Return the row (track number) of process_df every raw track belongs to after the operations, -1 if deleted."""
+    owner = np.asarray(track_ids, dtype=np.int64).copy()
+    for operation, tracks in operations:
+        if operation == COMBINE:
+            # Combining renames the rows of all listed tracks to the first one
+            owner[np.isin(owner, tracks)] = tracks[0]
+        elif operation == DELETE:
+            owner[np.isin(owner, tracks)] = -1
+    return owner
+
+
+def combine_rule(column):
+    rule = COMBINE_RULES.get(column)
+    if rule is None and str(column).startswith("Avg"):
+        return MEAN
+    return rule or SUM
+
+
+def merge_rows(columns, positions):
+    """Merge the rows at positions (tracks of one worm) of a dict of column arrays into a dict of column values."""
+    weights = columns["#Frames"][positions].astype(np.float64) if "#Frames" in columns else np.ones(len(positions))
+    merged = {}
+    for column, values in columns.items():
+        values = values[positions]
+        rule = combine_rule(column)
+        if rule == MIN:
+            merged[column] = values.min()
+        elif rule == MAX:
+            merged[column] = values.max()
+        elif rule == MEAN:
+            merged[column] = np.average(values, weights=weights) if weights.sum() > 0 else values.mean()
+        else:
+            merged[column] = values.sum()
+    for column, (numerator, denominator) in RATES.items():
+        if column in merged and numerator in merged and denominator in merged:
+            merged[column] = merged[numerator] / merged[denominator] if merged[denominator] else np.nan
+    # Keep integer columns integer
+    for column, values in columns.items():
+        if values.dtype.kind in "iu":
+            merged[column] = int(round(merged[column]))
+    return merged
+
+
+def combine_tracks(process_df, tracks):
+    """Combine the tracks into the row of the first track in place and return process_df.
+
+    Only the k rows of the combined tracks are read and merged, and the merged values are written into the row of
+    the first track. Dropping the other k - 1 rows is the only O(n) part: pandas keeps the rows of a column block
+    contiguous, so the remaining rows are moved once per step (one block copy, no re-aggregation of the table).
+    """
+    tracks = list(dict.fromkeys(tracks))
+    positions = process_df.index.get_indexer(tracks)
+    found = positions[positions >= 0]
+    if not len(found):
+        return process_df
+    rows = process_df.iloc[found]
+    dtypes = process_df.dtypes
+    merged = merge_rows({column: values.to_numpy() for column, values in rows.items()}, np.arange(len(found)))
+    merged = [_as_dtype(merged[column], dtype) for column, dtype in dtypes.items()]
+    target = positions[0]
+
+    if target >= 0:
+        for i, value in enumerate(merged):
+            process_df.iat[target, i] = value
+        absorbed = found[found != target]
+        if len(absorbed):
+            process_df.drop(process_df.index[absorbed], inplace=True)
+        return process_df
+
+    # Combined into a track number that was not in the table (the former groupby sorted it into place)
+    process_df.drop(process_df.index[found], inplace=True)
+    process_df.loc[tracks[0]] = merged
+    process_df.sort_index(inplace=True)
+    for column, dtype in dtypes.items():
+        if process_df[column].dtype != dtype:
+            process_df[column] = process_df[column].astype(dtype)
+    return process_df
+
+
+def _as_dtype(value, dtype):
+    return dtype.type(value) if isinstance(dtype, np.dtype) and dtype.kind in "biuf" else value
+
+
+def apply_operation(process_df, operation, tracks):
+    """Apply one combine or delete step to process_df in place and return it.
+
+    Raises KeyError for deleting unknown tracks (process_df is unchanged then).
+    """
+    if operation == COMBINE:
+        return combine_tracks(process_df, tracks)
+    if operation == DELETE:
+        process_df.drop(tracks, inplace=True)
+        return process_df
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def apply_operations(process_df, operations):
+    """Return a copy of process_df after the steps (the track data itself stays unchanged)."""
+    process_df = process_df.copy()
+    for operation, tracks in operations:
+        apply_operation(process_df, operation, tracks)
+    return process_df
+
+
+class OperationJournal:
+    """Append-only journal of the combine and delete steps of one video with unlimited undo and redo."""
+
+    def __init__(self, path):
+        self.path = path
+        self.base_operations = []  # Steps contained in a temporary Excel file of an older version
+        self.operations = []  # Active steps in order
+        self.redo_stack = []
+        self._complete = True  # Whether the file ends with a complete line
+        if os.path.exists(path):
+            self._load()
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @property
+    def can_undo(self):
+        return bool(self.operations)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def _load(self):
+        with open(self.path, "r") as file:
+            for line in file:
+                self._complete = line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Line cut off by a crash while writing
+                    continue
+                if record["op"] == BASE:
+                    self.base_operations = [(operation, list(tracks)) for operation, tracks in record["operations"]]
+                else:
+                    self._apply(record["op"], record.get("tracks", []))
+
+    def _apply(self, operation, tracks):
+        if operation == UNDO:
+            if self.operations:
+                self.redo_stack.append(self.operations.pop())
+        elif operation == REDO:
+            if self.redo_stack:
+                self.operations.append(self.redo_stack.pop())
+        else:
+            self.operations.append((operation, list(tracks)))
+            self.redo_stack = []
+
+    def _write(self, operation, tracks=None, **fields):
+        record = {"op": operation, **fields}
+        if tracks is not None:
+            record["tracks"] = list(tracks)
+        with open(self.path, "a") as file:
+            file.write(("" if self._complete else "\n") + json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self._complete = True
+
+    def start_from(self, operations):
+        """Record the steps already contained in the data the journal starts from."""
+        self._write(BASE, operations=[[operation, list(tracks)] for operation, tracks in operations])
+        self.base_operations = list(operations)
+
+    def append(self, operation, tracks):
+        self._write(operation, tracks)
+        self._apply(operation, tracks)
+
+    def undo(self):
+        """Move the last step to the redo stack; returns the step or None."""
+        if not self.can_undo:
+            return None
+        self._write(UNDO)
+        self._apply(UNDO, [])
+        return self.redo_stack[-1]
+
+    def redo(self):
+        """Re-apply the last undone step; returns the step or None."""
+        if not self.can_redo:
+            return None
+        self._write(REDO)
+        self._apply(REDO, [])
+        return self.operations[-1]
@@ -0,0 +1,105 @@
+import numpy as np
+
+from coords_parser import X, Y
+
+# ------------------ Track Index ------------------
+#
+# Built once when a video is loaded from the (frames, tracks, 3) coordinate array. For every track it holds the
+# first and last frame, the bounding box, the ranges of consecutive frames in which the track was found and its
+# X/Y-Coordinates of these frames as one contiguous array. All ranges and coordinates are stored back to back
+# for all tracks ("offsets" point to the part of a track), so the index is built with a handful of NumPy calls
+# and looking up a track needs no scan over the coordinate table.
+
+
+def valid_mask(coords):
+    """Frames x tracks mask of the frames in which a track was found (missing values are NaN or 0/0)."""
+    x, y = coords[:, :, X], coords[:, :, Y]
+    return ~(np.isnan(x) | np.isnan(y) | ((x == 0) & (y == 0)))
+
+
+class TrackIndex:
+    """First/last frame, bounding box, valid frame ranges and trajectory of every track of a video."""
+
+    def __init__(self, coords):
+        self.coords = coords  # TrackCoordinates
+        valid = valid_mask(coords.coords)
+        n_frames, n_tracks = valid.shape
+        self.present = valid.any(axis=0)
+
+        # First and last frame per track (-1 if a track has no coordinates)
+        self.first_frame = np.where(self.present, valid.argmax(axis=0), -1)
+        self.last_frame = np.where(self.present, n_frames - 1 - valid[::-1].argmax(axis=0), -1)
+
+        # Ranges of consecutive valid frames [start, end] per track, sorted by track and frame
+        padded = np.zeros((n_tracks, n_frames + 2), dtype=np.int8)
+        padded[:, 1:-1] = valid.T
+        steps = np.diff(padded, axis=1)
+        start_tracks, starts = np.nonzero(steps == 1)
+        _, ends = np.nonzero(steps == -1)
+        self.range_starts = starts
+        self.range_ends = ends - 1
+        self.range_offsets = np.concatenate(([0], np.cumsum(np.bincount(start_tracks, minlength=n_tracks))))
+
+        # Trajectories: frame numbers and X/Y of all valid frames, track after track
+        point_tracks, point_frames = np.nonzero(valid.T)
+        self.point_frames = point_frames
+        self.point_xy = coords.coords[point_frames, point_tracks][:, [X, Y]]
+        self.point_offsets = np.concatenate(([0], np.cumsum(np.bincount(point_tracks, minlength=n_tracks))))
+
+        # Bounding boxes (x_min, y_min, x_max, y_max)
+        self.bbox = np.full((n_tracks, 4), np.nan, dtype=np.float32)
+        if len(point_tracks):
+            present = np.flatnonzero(self.present)
+            starts = self.point_offsets[present]
+            self.bbox[present, 0:2] = np.minimum.reduceat(self.point_xy, starts, axis=0)
+            self.bbox[present, 2:4] = np.maximum.reduceat(self.point_xy, starts, axis=0)
+
+    def pos(self, track):
+        """Column of a track in the coordinate array, or None if it does not exist."""
+        return self.coords.track_pos.get(int(track))
+
+    def has_track(self, track):
+        pos = self.pos(track)
+        return pos is not None and bool(self.present[pos])
+
+    def first(self, track):
+        return int(self.first_frame[self.pos(track)])
+
+    def last(self, track):
+        return int(self.last_frame[self.pos(track)])
+
+    def ranges(self, track):
+        """Array of [start, end] frame ranges in which the track was found."""
+        pos = self.pos(track)
+        part = slice(self.range_offsets[pos], self.range_offsets[pos + 1])
+        return np.column_stack((self.range_starts[part], self.range_ends[part]))
+
+    def trajectory(self, track):
+        """Frame numbers and (n, 2) X/Y-Coordinates of all frames in which the track was found."""
+        pos = self.pos(track)
+        part = slice(self.point_offsets[pos], self.point_offsets[pos + 1])
+        return self.point_frames[part], self.point_xy[part]
+
+    def position(self, track, frame_number):
+        """X/Y-Coordinates of a track in a frame, or None if it was not found in that frame."""
+        x, y = self.coords.coords[frame_number, self.pos(track), [X, Y]]
+        if np.isnan(x) or np.isnan(y) or (x == 0 and y == 0):
+            return None
+        return float(x), float(y)
+
+    def appearances(self, track):
+        """Frames to jump to for a track: the start of every range plus its last frame."""
+        ranges = self.ranges(track)
+        return np.unique(np.append(ranges[:, 0], ranges[-1, 1])) if len(ranges) else ranges[:, 0]
+
+    def next_appearance(self, track, frame_number):
+        """First appearance after frame_number, or None."""
+        appearances = self.appearances(track)
+        i = np.searchsorted(appearances, frame_number, side="right")
+        return int(appearances[i]) if i < len(appearances) else None
+
+    def previous_appearance(self, track, frame_number):
+        """Last appearance before frame_number, or None."""
+        appearances = self.appearances(track)
+        i = np.searchsorted(appearances, frame_number, side="left")
+        return int(appearances[i - 1]) if i > 0 else None
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+# ------------------ Track Linker ------------------
+#
+# wrMTrck starts a new track every time it loses a worm for a moment, so one worm ends up as a chain of tracks that
+# the reviewer combines by hand. link_tracks proposes these chains from the X/Y-Coordinates: a track that ends is
+# linked to a track that starts up to max_gap frames later within max_distance pixels. Candidates are found
+# without comparing all pairs: the starts are sorted into grid cells of max_distance pixels and, inside the cells,
+# by their first frame, so every end only looks at the starts of the 3x3 cells around it within its time window
+# (two searchsorted calls per cell for all ends at once).
+#
+# A candidate is scored by how well the movement of both tracks predicts the other one across the gap (the end
+# moved on with its last velocity, the start moved back with its first velocity) relative to a tolerance that
+# grows with the square root of the gap, and by the length of the gap. Every track is linked to at most one track
+# on each side, taking the best links first; the links form the chains suggested for combining.
+#
+# Tracks already combined are treated as one track (their first start and last end) and deleted tracks are left
+# out, so the suggestions follow the edits of the review.
+
+
+class TrackEndpoints:
+    """Start and end (frame, X/Y, velocity) of every track, or of every group of combined tracks."""
+
+    def __init__(self, tracks, first, last, start_xy, end_xy, start_velocity, end_velocity):
+        self.tracks = tracks  # Track number (row of process_df) of every entry
+        self.first = first
+        self.last = last
+        self.start_xy = start_xy
+        self.end_xy = end_xy
+        self.start_velocity = start_velocity  # Pixels per frame over the first velocity_frames frames
+        self.end_velocity = end_velocity      # Pixels per frame over the last velocity_frames frames
+
+    def __len__(self):
+        return len(self.tracks)
+
+
+def track_endpoints(track_index, owner=None, velocity_frames=10):
+    """TrackEndpoints of the tracks of a TrackIndex; owner (see track_edits.replay_owner) merges combined tracks."""
+    track_ids = np.asarray(track_index.coords.track_ids)
+    owner = track_ids if owner is None else np.asarray(owner)
+    columns = np.flatnonzero((owner >= 0) & track_index.present)
+    frames, xy = track_index.point_frames, track_index.point_xy.astype(np.float64)
+    first_point = track_index.point_offsets[columns]
+    last_point = track_index.point_offsets[columns + 1] - 1
+
+    # Velocity from the first/last point to the point velocity_frames points further in
+    inner = np.minimum(first_point + velocity_frames, last_point)
+    start_velocity = _velocity(frames, xy, first_point, inner)
+    inner = np.maximum(last_point - velocity_frames, first_point)
+    end_velocity = _velocity(frames, xy, inner, last_point)
+
+    # A group starts with the start of its earliest member and ends with the end of its latest member
+    groups = owner[columns]
+    by_first = np.lexsort((frames[first_point], groups))
+    by_last = np.lexsort((frames[last_point], groups))
+    tracks, first_member = np.unique(groups[by_first], return_index=True)
+    last_member = np.append(first_member[1:], len(groups)) - 1
+    starts, ends = by_first[first_member], by_last[last_member]
+    return TrackEndpoints(tracks, frames[first_point[starts]], frames[last_point[ends]], xy[first_point[starts]],
+                          xy[last_point[ends]], start_velocity[starts], end_velocity[ends])
+
+
+def _velocity(frames, xy, a, b):
+    steps = (frames[b] - frames[a]).astype(np.float64)[:, np.newaxis]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(steps > 0, (xy[b] - xy[a]) / steps, 0.0)
+
+
+def candidate_pairs(endpoints, max_gap=90, max_distance=150.0):
+    """(ending, starting) positions of all pairs with a start 1 to max_gap frames after the end within max_distance."""
+    if not len(endpoints):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Grid cells of max_distance pixels (shifted by one cell so the neighbours of cells on the edge stay >= 0)
+    start_cells = np.floor(endpoints.start_xy / max_distance).astype(np.int64) + 1
+    end_cells = np.floor(endpoints.end_xy / max_distance).astype(np.int64) + 1
+    span = int(max(endpoints.first.max(), endpoints.last.max())) + max_gap + 2
+
+    # Starts sorted by cell and, inside a cell, by first frame
+    start_keys = _cell_key(start_cells[:, 0], start_cells[:, 1]) * span + endpoints.first
+    order = np.argsort(start_keys, kind="stable")
+    start_keys = start_keys[order]
+
+    ending, starting = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = _cell_key(end_cells[:, 0] + dx, end_cells[:, 1] + dy) * span
+            low = np.searchsorted(start_keys, cell + endpoints.last + 1, side="left")
+            high = np.searchsorted(start_keys, cell + endpoints.last + max_gap, side="right")
+            counts = high - low
+            total = int(counts.sum())
+            if not total:
+                continue
+            ending.append(np.repeat(np.arange(len(endpoints)), counts))
+            # Positions low..high-1 of every end, back to back
+            run_starts = np.repeat(low - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+            starting.append(order[run_starts + np.arange(total)])
+    if not ending:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ending, starting = np.concatenate(ending), np.concatenate(starting)
+    distance = np.hypot(*(endpoints.start_xy[starting] - endpoints.end_xy[ending]).T)
+    keep = distance <= max_distance
+    return ending[keep], starting[keep]
+
+
+def _cell_key(cell_x, cell_y):
+    return (cell_x << 20) + cell_y
+
+
+def score_pairs(endpoints, ending, starting, max_gap=90, position_tolerance=8.0, gap_weight=1.0):
+    """Gap, distance, prediction error and score (0-1) of the candidate pairs."""
+    gap = (endpoints.first[starting] - endpoints.last[ending]).astype(np.float64)
+    end_xy, start_xy = endpoints.end_xy[ending], endpoints.start_xy[starting]
+    distance = np.hypot(*(start_xy - end_xy).T)
+    forward = np.hypot(*(end_xy + endpoints.end_velocity[ending] * gap[:, np.newaxis] - start_xy).T)
+    backward = np.hypot(*(start_xy - endpoints.start_velocity[starting] * gap[:, np.newaxis] - end_xy).T)
+    # Extrapolating a noisy velocity over a long gap must not make a close start worse than no movement at all
+    error = np.minimum((forward + backward) / 2, distance)
+    cost = error / (position_tolerance * np.sqrt(gap)) + gap_weight * gap / max_gap
+    return gap, distance, error, np.exp(-cost)
+
+
+def link_tracks(track_index, owner=None, max_gap=90, max_distance=150.0, position_tolerance=8.0, gap_weight=1.0,
+                min_score=0.05, velocity_frames=10):
+    """Best links from ending to starting tracks, one per side of a track, as DataFrame sorted by score.
+
+    Columns: Track (ending), Next (starting), Gap (frames), Distance and Error (pixels), Score.
+    """
+    endpoints = track_endpoints(track_index, owner, velocity_frames)
+    ending, starting = candidate_pairs(endpoints, max_gap, max_distance)
+    gap, distance, error, score = score_pairs(endpoints, ending, starting, max_gap, position_tolerance, gap_weight)
+
+    # Best links first, every track ends and starts at most one link
+    order = np.argsort(-score, kind="stable")
+    order = order[score[order] >= min_score]
+    linked_end = np.zeros(len(endpoints), dtype=bool)
+    linked_start = np.zeros(len(endpoints), dtype=bool)
+    chosen = []
+    for i in order:
+        a, b = ending[i], starting[i]
+        if not linked_end[a] and not linked_start[b]:
+            linked_end[a] = linked_start[b] = True
+            chosen.append(i)
+    chosen = np.array(chosen, dtype=np.int64)
+    return pd.DataFrame({"Track": endpoints.tracks[ending[chosen]], "Next": endpoints.tracks[starting[chosen]],
+                         "Gap": gap[chosen].astype(np.int64), "Distance": distance[chosen],
+                         "Error": error[chosen], "Score": score[chosen]})
+
+
+def suggest_combines(links):
+    """Chains of linked tracks as [(tracks in order, lowest score of its links)], best chains first."""
+    following = dict(zip(links["Track"].tolist(), zip(links["Next"].tolist(), links["Score"].tolist())))
+    heads = sorted(set(following) - set(links["Next"].tolist()))
+    suggestions = []
+    for track in heads:
+        tracks, score = [track], 1.0
+        while tracks[-1] in following:
+            track, link_score = following[tracks[-1]]
+            tracks.append(track)
+            score = min(score, link_score)
+        suggestions.append((tracks, score))
+    return sorted(suggestions, key=lambda suggestion: -suggestion[1])
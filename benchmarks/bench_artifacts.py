@@ -0,0 +1,42 @@
+"""Classify a labelled fixture set of synthetic worms and artifacts and time the features of a full video.
+
+The classification of the fixtures and the batched features are checked in tests/test_artifacts.py.
+
+Usage: python benchmarks/bench_artifacts.py [n_tracks] [n_frames]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from synthetic import make_artifacts, make_swimming, ARTIFACT_KINDS
+from track_index import TrackIndex
+from artifacts import track_features, classify
+
+FIXTURES = [(0, 10), (1, 10), (2, 10), (3, 5), (4, 5)]  # (seed, tracks per kind)
+
+
+def main():
+    n_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 9000
+
+    results = []
+    for seed, n_each in FIXTURES:
+        coords, kinds = make_artifacts(n_each, seed=seed)
+        reasons = classify(track_features(TrackIndex(coords)))
+        results.append(pd.DataFrame({"kind": kinds, "reason": reasons.reindex(coords.track_ids).to_numpy()}))
+    results = pd.concat(results, ignore_index=True)
+    print(pd.crosstab(results["kind"], results["reason"]).reindex(ARTIFACT_KINDS).fillna(0).astype(int))
+
+    coords, _ = make_swimming(n_tracks, n_frames)
+    track_index = TrackIndex(coords)
+    start = time.perf_counter()
+    features = track_features(track_index)
+    reasons = classify(features)
+    elapsed = time.perf_counter() - start
+    print(f"\n{n_tracks} tracks x {n_frames} frames: features and classification in {elapsed:.2f} s, "
+          f"{np.count_nonzero(reasons != '')} of {len(reasons)} thrashing worms marked as artifact")
+
+
+if __name__ == "__main__":
+    main()
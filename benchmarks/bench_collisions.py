@@ -0,0 +1,47 @@
+"""Check the shared tracks found by detect_collisions against synthetic videos with known collisions and time the
+analysis of a full video.
+
+Usage: python benchmarks/bench_collisions.py [n_pairs] [n_frames]
+"""
+import sys
+import time
+import numpy as np
+
+from synthetic import make_crossings
+from track_index import TrackIndex
+from collisions import detect_collisions, shared_tracks, review_items
+
+
+def main():
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 9000
+
+    found = correct = expected = 0
+    for seed in range(10):
+        coords, shared = make_crossings(20, 20, n_frames=3000, seed=seed)
+        events = detect_collisions(TrackIndex(coords))
+        proposed = set(shared_tracks(events).index.tolist())
+        found += len(proposed)
+        correct += len(proposed & set(shared.tolist()))
+        expected += len(shared)
+        # Deleted tracks are no longer proposed
+        items = review_items(events, deleted=shared[:5].tolist())
+        assert not {track for item in items for track in item.delete} & set(shared[:5].tolist())
+    precision, recall = correct / max(found, 1), correct / max(expected, 1)
+    print(f"Shared tracks: precision {precision:.3f}, recall {recall:.3f} ({expected} collisions)")
+    assert precision >= 0.95 and recall >= 0.95, (precision, recall)
+
+    coords, shared = make_crossings(n_pairs, n_pairs, n_frames=n_frames, seed=1)
+    track_index = TrackIndex(coords)
+    start = time.perf_counter()
+    events = detect_collisions(track_index)
+    items = review_items(events)
+    elapsed = time.perf_counter() - start
+    proposed = set(shared_tracks(events).index.tolist())
+    print(f"{coords.n_tracks} tracks, {n_frames} frames: {len(events)} events, {len(items)} review items, "
+          f"{len(proposed & set(shared.tolist()))} of {len(shared)} shared tracks in {elapsed * 1000:.0f} ms")
+    assert np.isin(shared, list(proposed)).mean() >= 0.95
+
+
+if __name__ == "__main__":
+    main()
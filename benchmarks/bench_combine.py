@@ -0,0 +1,52 @@
+"""Combine steps with the former rename + groupby('Track').sum() versus combine_tracks.
+
+Every worm of a synthetic wrMTrck table is split into several tracks, which are combined again (half of them in two
+steps). The values of the combined tables are checked in tests/test_combine.py.
+
+Usage: python benchmarks/bench_combine.py [n_worms ...]
+"""
+import sys
+import time
+import numpy as np
+
+from synthetic import make_tracks_table, combine_steps
+from track_edits import combine_tracks
+
+
+def combine_legacy(process_df, track_list):
+    for i in range(len(track_list)):
+        process_df = process_df.rename(index={track_list[i]: track_list[0]})
+    return process_df.groupby('Track').sum()
+
+
+def run(function, process_df, steps):
+    process_df = process_df.copy()  # combine_tracks changes the table in place
+    start = time.perf_counter()
+    for step in steps:
+        process_df = function(process_df, step)
+    return process_df, (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(value) for value in sys.argv[1:]] or [500, 1500, 4000]
+    print(f"{'tracks':>7} {'steps':>6} {'groupby (ms/step)':>18} {'in place (ms/step)':>19} {'speedup':>8}")
+    for n_worms in sizes:
+        table, worms = make_tracks_table(n_worms, fragments=4, seed=n_worms)
+        process_df = table.rename(columns={"Track ": "Track"}).set_index('Track')
+        steps = combine_steps(process_df, worms)
+        _, all_ms = run(combine_tracks, process_df, steps)
+
+        # The former combine is timed on the first steps only; it re-aggregates the whole table every time
+        sample = steps[:200]
+        legacy, legacy_ms = run(combine_legacy, process_df, sample)
+        partial, sample_ms = run(combine_tracks, process_df, sample)
+        additive = ["#Frames", "time(s)", "Bends"]
+        assert np.allclose(legacy[additive].to_numpy(np.float64), partial[additive].to_numpy(np.float64))
+
+        print(f"{len(process_df):>7} {len(steps):>6} {legacy_ms / len(sample):>18.2f} "
+              f"{sample_ms / len(sample):>19.2f} {legacy_ms / sample_ms:>7.1f}x")
+        print(f"{'':>7} all {len(steps)} steps in {all_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
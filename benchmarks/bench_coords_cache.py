@@ -0,0 +1,49 @@
+"""Cold (parse + write cache) versus warm (memory-mapped cache) loading of "*_tracks_raw.txt" files.
+
+Usage: python benchmarks/bench_coords_cache.py [n_frames]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from synthetic import write_tracks_raw
+from coords_parser import cache_paths, load_tracks_raw, parse_tracks_raw
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    print(f"{'tracks':>8} {'frames':>8} {'cold (s)':>10} {'warm (s)':>10} {'warm + df (s)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_tracks in (75, 300, 1000):
+            path = write_tracks_raw(os.path.join(tmp, f"bench_{n_tracks}_tracks_raw.txt"), n_tracks, n_frames)
+            cold_time, cold = timed(load_tracks_raw, path)
+            warm_time, warm = timed(load_tracks_raw, path)
+            df_time, _ = timed(warm.to_dataframe)
+
+            assert isinstance(warm.coords, np.memmap)
+            assert np.array_equal(cold.coords, warm.coords, equal_nan=True)
+            assert np.array_equal(cold.track_ids, warm.track_ids)
+            print(f"{n_tracks:>8} {n_frames:>8} {cold_time:>10.3f} {warm_time:>10.4f} {warm_time + df_time:>14.4f}")
+
+            # A changed source file has to invalidate the cache
+            del warm
+            write_tracks_raw(path, n_tracks + 1, n_frames, seed=1)
+            os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1))
+            rebuilt = load_tracks_raw(path)
+            assert rebuilt.n_tracks == n_tracks + 1
+            assert np.array_equal(rebuilt.coords, parse_tracks_raw(path).coords, equal_nan=True)
+            del rebuilt, cold
+            for cache_file in cache_paths(path):
+                os.remove(cache_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the block-aware coordinate parser with the former merge-based loader of load_current_video.
+
+Usage: python benchmarks/bench_coords_parser.py [n_frames]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from synthetic import write_tracks_raw
+from coords_parser import parse_tracks_raw
+
+
+def load_tracks_raw_merge(coords_file):
+    """Loader of FileHandler.load_current_video up to v2_2 (kept as reference)."""
+    with open(coords_file, 'r') as file:
+        lines = file.readlines()
+
+    dataframes = []
+    header = None
+    current_data = []
+
+    def adjust_row_length(row, header_len):
+        if len(row) > header_len:
+            return row[:header_len]
+        elif len(row) < header_len:
+            return row + [''] * (header_len - len(row))
+        else:
+            return row
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("Frame"):
+            header = line.split("\t")
+            continue
+        if line.startswith("Tracks"):
+            if current_data:
+                min_columns = min(len(header), len(max(current_data, key=len)))
+                df = pd.DataFrame([adjust_row_length(row, min_columns) for row in current_data], columns=header[:min_columns])
+                dataframes.append(df)
+                current_data = []
+            track_range = line.split(" ")[1:4:2]
+            adjusted_header = ["Frame"]
+            for i in range(int(track_range[0]), int(track_range[1]) + 1):
+                adjusted_header.extend([f"X{i}", f"Y{i}", f"Flag{i}"])
+            header = adjusted_header
+            continue
+        current_data.append(line.split("\t"))
+
+    if current_data:
+        min_columns = min(len(header), len(max(current_data, key=len)))
+        df = pd.DataFrame([adjust_row_length(row, min_columns) for row in current_data], columns=header[:min_columns])
+        dataframes.append(df)
+
+    combined_df = dataframes[0]
+    for df in dataframes[1:]:
+        combined_df = pd.merge(combined_df, df.drop(columns=["Frame"]), left_index=True, right_index=True)
+    combined_df = combined_df.apply(pd.to_numeric, errors='coerce')
+    return combined_df.fillna(0).astype(int)
+
+
+def best_of(function, path, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    print(f"{'tracks':>8} {'frames':>8} {'merge (s)':>12} {'parser (s)':>12} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_tracks in (75, 300, 1000):
+            path = write_tracks_raw(os.path.join(tmp, f"bench_{n_tracks}_tracks_raw.txt"), n_tracks, n_frames)
+            merge_time, merge_df = best_of(load_tracks_raw_merge, path)
+            parser_time, coords = best_of(parse_tracks_raw, path)
+
+            # Both loaders have to agree on the layout used by VideoPlayer.find_number
+            parsed_df = coords.to_dataframe()
+            assert np.array_equal(parsed_df[merge_df.columns].to_numpy(), merge_df.to_numpy())
+
+            print(f"{n_tracks:>8} {n_frames:>8} {merge_time:>12.3f} {parser_time:>12.3f} {merge_time / parser_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
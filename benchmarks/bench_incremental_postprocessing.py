@@ -0,0 +1,51 @@
+"""Time incremental postprocessing: the first run, a rerun over an unchanged tree and a rerun after one video of
+one line was saved again.
+
+That the incremental results equal a full rebuild is checked in tests/test_incremental_postprocessing.py.
+
+Usage: python benchmarks/bench_incremental_postprocessing.py [n_conditions] [n_lines]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import write_experiment_tree, make_tracks_table
+from processed_output import write_processed
+from postprocessing import find_line_folders, analyze_line
+
+
+def run(root, incremental=True):
+    jobs = find_line_folders(root)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for job in jobs:
+            analyze_line(*job, incremental=incremental)
+    return time.perf_counter() - start
+
+
+def main():
+    n_conditions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    n_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        line_folders = write_experiment_tree(tmp, n_conditions, n_lines)
+        root = os.path.join(tmp, "exp")
+        first = run(root)
+        unchanged = run(root)
+        table, _ = make_tracks_table(35, seed=100)
+        write_processed(table.rename(columns={"Track ": "Track"}).set_index("Track"),
+                        os.path.join(line_folders[0], "tracks_processed"), "video1_tracks")
+        one_changed = run(root)
+        full = run(root, incremental=False)
+
+    print(f"{len(line_folders)} line folders")
+    print(f"First run:              {first:6.2f} s")
+    print(f"Full rebuild:           {full:6.2f} s")
+    print(f"Rerun, unchanged:       {unchanged:6.2f} s ({first / unchanged:.1f}x faster)")
+    print(f"Rerun, one video saved: {one_changed:6.2f} s ({first / one_changed:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
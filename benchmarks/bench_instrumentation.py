@@ -0,0 +1,62 @@
+"""Measure the overhead of the instrumentation with recording off and on.
+
+The timing log and the summary are checked in tests/test_instrumentation.py.
+
+Usage: python benchmarks/bench_instrumentation.py [n_calls]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Make the modules of the application importable (this benchmark needs no synthetic data)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Swimming_Video_Analysis"))
+from instrumentation import instruments, timed  # noqa: E402
+
+
+def work(x):
+    return x + 1
+
+
+@timed("work")
+def timed_work(x):
+    return x + 1
+
+
+def with_timer(x):
+    with instruments.timer("work"):
+        return x + 1
+
+
+def per_call(func, n_calls):
+    start = time.perf_counter()
+    for i in range(n_calls):
+        func(i)
+    return (time.perf_counter() - start) / n_calls * 1e9
+
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assert not instruments.enabled
+        plain = per_call(work, n_calls)
+        decorated_off = per_call(timed_work, n_calls)
+        timer_off = per_call(with_timer, n_calls)
+        instruments.enable(os.path.join(tmp, "app.jsonl"))
+        decorated_on = per_call(timed_work, n_calls // 10)
+        instruments.disable()
+        instruments.enable()
+        decorated_memory = per_call(timed_work, n_calls // 10)
+        instruments.disable()
+
+    print(f"{n_calls} calls")
+    print(f"Plain call:                 {plain:8.0f} ns")
+    print(f"@timed, recording off:      {decorated_off:8.0f} ns (+{decorated_off - plain:.0f} ns)")
+    print(f"timer(), recording off:     {timer_off:8.0f} ns (+{timer_off - plain:.0f} ns)")
+    print(f"@timed, recording (memory): {decorated_memory:8.0f} ns")
+    print(f"@timed, recording (log):    {decorated_on:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
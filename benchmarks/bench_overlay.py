@@ -0,0 +1,47 @@
+"""Time to compose the track overlay into a 2048x2048 frame and to pan over the composed frame.
+
+Usage: python benchmarks/bench_overlay.py [n_frames]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from synthetic import write_tracks_raw
+from coords_parser import parse_tracks_raw
+from frame_renderer import FrameRenderer, QUALITY_FAST
+from overlay import TrackOverlay
+
+
+def mean_ms(function, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) * 1000 / len(arguments)
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    frame = np.zeros((2048, 2048, 3), dtype=np.uint8)
+    frames = list(range(n_frames // 2, n_frames // 2 + 20))
+    print(f"{'tracks':>7} {'trail':>6} {'compose (ms)':>13} {'cached (ms)':>12} {'pan (ms)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_tracks in (75, 300, 1000):
+            path = write_tracks_raw(os.path.join(tmp, f"bench_{n_tracks}_tracks_raw.txt"), n_tracks, n_frames)
+            overlay = TrackOverlay(parse_tracks_raw(path))
+            overlay.show_tracks = True
+            for trail_length in (0, 30):
+                overlay.trail_length = trail_length
+                compose_ms = mean_ms(lambda frame_number: overlay.compose(frame, frame_number), frames)
+                cached_ms = mean_ms(lambda frame_number: overlay.compose(frame, frames[-1]), frames)
+
+                # Panning renders the viewport from the composed frame without drawing the overlay again
+                renderer = FrameRenderer()
+                renderer.set_frame(frames[-1], overlay.compose(frame, frames[-1]))
+                pan_ms = mean_ms(lambda step: renderer.render(1.0, 2.0, 300 + step, 200 + step, QUALITY_FAST), frames)
+                print(f"{n_tracks:>7} {trail_length:>6} {compose_ms:>13.1f} {cached_ms:>12.3f} {pan_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Serial versus process-pool postprocessing of a synthetic experiment tree; the results must be byte-identical.
+
+Both runs read every processed file (incremental=False): the serial run writes the manifests, so a parallel run
+using them would only read the cached BBPM values. That the two give the same bytes is checked in
+tests/test_postprocessing.py.
+
+Usage: python benchmarks/bench_postprocessing.py [n_conditions] [n_lines]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import write_experiment_tree
+from postprocessing import find_line_folders, run_serial, PostprocessingJobs
+
+
+def read_results(line_folders):
+    results = {}
+    for line_folder in line_folders:
+        with open(os.path.join(line_folder, f"{os.path.basename(line_folder)}_results.xlsx"), "rb") as file:
+            results[line_folder] = file.read()
+        os.remove(os.path.join(line_folder, f"{os.path.basename(line_folder)}_results.xlsx"))
+    return results
+
+
+def main():
+    n_conditions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    n_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    with tempfile.TemporaryDirectory() as tmp:
+        line_folders = write_experiment_tree(tmp, n_conditions, n_lines)
+        jobs = find_line_folders(os.path.join(tmp, "exp"))
+        assert sorted(job[0] for job in jobs) == sorted(line_folders)
+        print(f"{len(jobs)} line folders, {3 * len(jobs)} processed files")
+
+        start = time.perf_counter()
+        run_serial(jobs, incremental=False)
+        serial_s = time.perf_counter() - start
+        serial = read_results(line_folders)
+
+        start = time.perf_counter()
+        parallel_jobs = PostprocessingJobs(jobs, incremental=False)
+        while not parallel_jobs.finished:
+            time.sleep(0.05)
+        parallel_jobs.close()
+        parallel_s = time.perf_counter() - start
+        assert not parallel_jobs.errors(), parallel_jobs.errors()
+        parallel = read_results(line_folders)
+
+        identical = sum(serial[line_folder] == parallel[line_folder] for line_folder in line_folders)
+        print(f"serial {serial_s:.1f} s, parallel {parallel_s:.1f} s on {os.cpu_count()} cores, "
+              f"{identical} of {len(line_folders)} results byte-identical")
+        assert identical == len(line_folders), "serial and parallel results differ"
+
+        # Cancelling drops the jobs that have not started
+        cancelled_jobs = PostprocessingJobs(jobs, max_workers=2, incremental=False)
+        time.sleep(0.5)
+        cancelled_jobs.cancel()
+        while not cancelled_jobs.finished:
+            time.sleep(0.05)
+        dropped = sum(future.cancelled() for future in cancelled_jobs.futures)
+        print(f"cancelled after 0.5 s: {dropped} of {len(jobs)} jobs dropped")
+        assert dropped > 0
+
+
+if __name__ == "__main__":
+    main()
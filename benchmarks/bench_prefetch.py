@@ -0,0 +1,92 @@
+"""Time switching to the next video with and without the background prefetch, and check that the prefetched data
+is the data loaded directly, that changing the folder cancels it and that changed files are loaded again.
+
+Usage: python benchmarks/bench_prefetch.py [n_tracks] [n_frames]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from synthetic import write_tracks_raw, make_tracks_table, write_tracks, write_avi
+from prefetch import VideoPrefetcher, load_video_data, VIDEO_SUFFIX
+
+
+def write_video(folder, base_name, n_tracks, n_frames, seed):
+    write_avi(os.path.join(folder, f"{base_name}{VIDEO_SUFFIX}"), min(n_frames, 300), 512)
+    write_tracks_raw(os.path.join(folder, f"{base_name}_tracks_raw.txt"), n_tracks, n_frames, seed=seed)
+    table, _ = make_tracks_table(n_tracks // 2, n_frames=n_frames, seed=seed)
+    write_tracks(os.path.join(folder, f"{base_name}_tracks.txt"), table)
+    return f"{base_name}{VIDEO_SUFFIX}"
+
+
+def same_data(a, b):
+    assert a.track_df.equals(b.track_df)
+    assert a.base_df.equals(b.base_df)
+    assert np.array_equal(np.asarray(a.coords.coords), np.asarray(b.coords.coords), equal_nan=True)
+    assert np.array_equal(a.track_index.first_frame, b.track_index.first_frame)
+    ids = a.coords.track_ids
+    pd.testing.assert_frame_equal(a.bend_counter.table(ids), b.bend_counter.table(ids))
+
+
+def main():
+    n_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "videos")
+        other = os.path.join(tmp, "other")
+        os.makedirs(folder)
+        os.makedirs(other)
+        videos = [write_video(folder, f"video{i}", n_tracks, n_frames, seed=i) for i in range(3)]
+        write_video(other, "video0", n_tracks, n_frames, seed=9)
+
+        prefetcher = VideoPrefetcher(warm_frames=16)
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Direct load (the coordinate cache and the seek index are written by the first load, as in the GUI)
+            load_video_data(folder, videos[1])
+            start = time.perf_counter()
+            direct = load_video_data(folder, videos[1])
+            direct_time = time.perf_counter() - start
+
+            # Prefetched while video 0 is reviewed, taken on "Save & Proceed"
+            prefetcher.prefetch(folder, videos[1])
+            prefetcher.future.result()
+            start = time.perf_counter()
+            data = prefetcher.take(folder, videos[1])
+            switch_time = time.perf_counter() - start
+            assert data is not None
+            same_data(direct, data)
+            assert len(data.frame_cache) == 16
+            with direct.seek_index.open() as file:
+                for index in range(16):
+                    assert np.array_equal(data.frame_cache.get(index), direct.seek_index.read(file, index))
+
+            # Selecting another folder cancels the prefetch of the old one
+            prefetcher.prefetch(folder, videos[2])
+            prefetcher.cancel()
+            assert prefetcher.take(folder, videos[2]) is None
+            prefetcher.prefetch(folder, videos[2])
+            assert prefetcher.take(other, videos[0]) is None
+
+            # A track file changed after the prefetch is not used
+            prefetcher.prefetch(folder, videos[2])
+            prefetcher.future.result()
+            track_file = os.path.join(folder, "video2_tracks.txt")
+            stat = os.stat(track_file)
+            os.utime(track_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            assert prefetcher.take(folder, videos[2]) is None
+        prefetcher.close()
+
+    print(f"{n_tracks} tracks, {n_frames} frames")
+    print(f"Load on switch:     {direct_time * 1000:8.1f} ms")
+    print(f"Prefetched switch:  {switch_time * 1000:8.1f} ms ({direct_time / max(switch_time, 1e-9):.0f}x)")
+    print("Prefetched data matches the direct load; cancelled and changed prefetches are dropped.")
+
+
+if __name__ == "__main__":
+    main()
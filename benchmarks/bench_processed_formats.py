@@ -0,0 +1,55 @@
+"""Collecting the BBPM column of many "_processed.xlsx" files from Excel versus from their columnar copies.
+
+Usage: python benchmarks/bench_processed_formats.py [n_videos]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from synthetic import make_tracks_table
+from processed_output import write_processed, read_processed, columnar_files
+
+
+def aggregate(paths, read):
+    return pd.concat([read(path).rename(columns={"BBPM": os.path.basename(path)}) for path in paths], axis=1)
+
+
+def main():
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        paths = []
+        for video in range(n_videos):
+            table, _ = make_tracks_table(30 + video % 20, seed=video)
+            process_df = table.rename(columns={"Track ": "Track"}).set_index("Track")
+            paths.append(write_processed(process_df, tmp, f"video{video + 1}_tracks"))
+        print(f"{n_videos} videos written in {time.perf_counter() - start:.1f} s")
+
+        feather_file, npz_file = columnar_files(paths[0])
+        columnar = "feather" if os.path.exists(feather_file) else "npz"
+        sizes = {"xlsx": sum(os.path.getsize(path) for path in paths),
+                 columnar: sum(os.path.getsize(columnar_files(path)[columnar == "npz"]) for path in paths)}
+
+        results = {}
+        for name, read in (("xlsx", lambda path: pd.read_excel(path, header=0)[["BBPM"]]),
+                           (columnar, lambda path: read_processed(path, ["BBPM"]))):
+            start = time.perf_counter()
+            results[name] = aggregate(paths, read)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>8}: {elapsed:6.2f} s ({elapsed * 1000 / n_videos:.2f} ms/video, "
+                  f"{sizes[name] / n_videos / 1024:.1f} KiB/video)")
+        # Excel keeps 15-17 significant digits, the columnar copy the exact values
+        assert results["xlsx"].columns.equals(results[columnar].columns)
+        assert np.allclose(results["xlsx"], results[columnar], rtol=1e-12, atol=0, equal_nan=True), \
+            "columnar copy differs from Excel"
+
+        # An Excel file newer than its columnar copy is read from Excel
+        os.utime(paths[0], (time.time() + 10, time.time() + 10))
+        assert read_processed(paths[0], ["BBPM"]).equals(pd.read_excel(paths[0], header=0)[["BBPM"]])
+
+
+if __name__ == "__main__":
+    main()
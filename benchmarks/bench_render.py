@@ -0,0 +1,67 @@
+"""Per-stage timing of the former update_frame pipeline versus FrameRenderer for pan and zoom.
+
+Usage: python benchmarks/bench_render.py [frame_size]
+"""
+import os
+import sys
+import numpy as np
+import cv2 as cv
+from PIL import Image
+
+# Make the modules of the application importable (this benchmark renders a random frame, it needs no synthetic data)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Swimming_Video_Analysis"))
+from frame_renderer import FrameRenderer, StageTimer, VIEW_SIZE  # noqa: E402
+
+
+def render_legacy(frame, base_scale, zoom_level, pan_x, pan_y, timer):
+    """Rendering of VideoPlayer.update_frame up to v2_2 (kept as reference, without decoding)."""
+    with timer.stage("convert"):
+        img = Image.fromarray(cv.cvtColor(frame, cv.COLOR_BGR2RGB))
+    with timer.stage("resize base"):
+        img = img.resize((int(img.width * base_scale), int(img.height * base_scale)), Image.LANCZOS)
+    with timer.stage("resize zoom"):
+        width, height = img.size
+        img = img.resize((int(width * zoom_level), int(height * zoom_level)), Image.LANCZOS)
+    with timer.stage("crop"):
+        img = img.crop((pan_x, pan_y, pan_x + width, pan_y + height))
+        img.load()
+    return img
+
+
+def mean_timings(runs):
+    stages = {name for timings in runs for name in timings}
+    return {name: np.mean([timings.get(name, 0.0) for timings in runs]) for name in sorted(stages)}
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    pans = [(int(200 + 40 * step), int(300 + 25 * step)) for step in range(30)]
+
+    renderer = FrameRenderer()
+    renderer.set_frame(0, frame)
+    print(f"Frame {size}x{size}, new frame: {renderer.timer.report()}")
+
+    for zoom_value in (0.33, 1.0, 2.0):
+        base_scale, zoom_level = (zoom_value, 1.0) if zoom_value <= 1.0 else (1.0, zoom_value)
+        legacy_runs, renderer_runs = [], []
+        for pan_x, pan_y in pans:
+            timer = StageTimer()
+            with timer.stage("total"):
+                render_legacy(frame, base_scale, zoom_level, pan_x, pan_y, timer)
+            legacy_runs.append(timer.timings)
+
+            renderer.timer.reset()
+            with renderer.timer.stage("total"):
+                renderer.render(base_scale, zoom_level, pan_x, pan_y, max_size=VIEW_SIZE)
+            renderer_runs.append(renderer.timer.timings)
+
+        print(f"\nPan at zoom {zoom_value} (mean over {len(pans)} drag events, ms)")
+        for name, runs in (("update_frame (v2_2)", legacy_runs), ("FrameRenderer", renderer_runs)):
+            stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in mean_timings(runs).items())
+            print(f"  {name:<20} {stages}")
+
+
+if __name__ == "__main__":
+    main()
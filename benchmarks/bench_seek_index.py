@@ -0,0 +1,62 @@
+"""Random seek latency of cv.VideoCapture.set(CAP_PROP_POS_FRAMES) versus the AVI seek index.
+
+Usage: python benchmarks/bench_seek_index.py [n_frames] [frame_size]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2 as cv
+
+from synthetic import write_avi, is_frame
+from seek_index import build_seek_index, index_path, load_seek_index
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    rng = np.random.default_rng(1)
+    targets = rng.integers(0, n_frames, 100)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_labels_compressed.AVI")
+        write_avi(path, n_frames, size)
+
+        start = time.perf_counter()
+        build_seek_index(path)
+        build_time = time.perf_counter() - start
+        load_seek_index(path)  # writes the index beside the video
+        start = time.perf_counter()
+        seek_index = load_seek_index(path)
+        load_time = time.perf_counter() - start
+        print(f"{n_frames} frames {size}x{size}: index pass {build_time * 1000:.1f} ms, "
+              f"loading saved index {load_time * 1000:.2f} ms ({os.path.getsize(index_path(path))} bytes)")
+
+        capture = cv.VideoCapture(path)
+        capture_ms, capture_errors = [], 0
+        for target in targets:
+            start = time.perf_counter()
+            capture.set(cv.CAP_PROP_POS_FRAMES, int(target))
+            ret, frame = capture.read()
+            capture_ms.append((time.perf_counter() - start) * 1000)
+            capture_errors += not (ret and is_frame(frame, target))
+        capture.release()
+
+        index_ms, index_errors = [], 0
+        with seek_index.open() as file:
+            for target in targets:
+                start = time.perf_counter()
+                frame = seek_index.read(file, int(target))
+                index_ms.append((time.perf_counter() - start) * 1000)
+                index_errors += not is_frame(frame, target)
+
+        print(f"{'':>14} {'mean (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10} {'wrong frames':>13}")
+        for name, timings, errors in (("VideoCapture", capture_ms, capture_errors),
+                                      ("seek index", index_ms, index_errors)):
+            print(f"{name:>14} {np.mean(timings):>10.2f} {np.percentile(timings, 95):>10.2f} "
+                  f"{np.max(timings):>10.2f} {errors:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Check that the ResourcePool keeps videos within its memory budget, closing the least recently used, and that a
+ReviewSession resumes at the right video; time going back to a pooled video against loading it again.
+
+Usage: python benchmarks/bench_session.py [n_tracks] [n_frames]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import cv2 as cv
+
+from bench_prefetch import write_video, same_data
+from frame_cache import FrameSource
+from prefetch import load_video_data
+from session import ReviewSession, ResourcePool, VideoResources, SESSION_FILE
+
+
+def open_video(folder, video_file):
+    data = load_video_data(folder, video_file, warm_frames=16)
+    frame_source = FrameSource(cv.VideoCapture(data.video_path), data.video_path, cache=data.frame_cache,
+                               seek_index=data.seek_index)
+    return VideoResources(data, frame_source)
+
+
+def check_pool(folder, videos):
+    resources = [open_video(folder, video) for video in videos]
+    sizes = [r.nbytes for r in resources]
+    assert all(size > 0 for size in sizes)
+
+    # Room for two videos: putting the third closes the least recently used one
+    pool = ResourcePool(max_bytes=max(sizes) * 2 + max(sizes) // 2)
+    pool.put((folder, videos[0]), resources[0])
+    pool.put((folder, videos[1]), resources[1])
+    assert pool.get((folder, videos[0])) is resources[0]
+    pool.put((folder, videos[2]), resources[2])
+    assert (folder, videos[1]) not in pool
+    assert resources[1].frame_source is None
+    assert (folder, videos[0]) in pool and (folder, videos[2]) in pool
+    assert pool.nbytes <= pool.max_bytes
+    assert pool.evictions == 1
+
+    # A budget smaller than one video still keeps the video opened last
+    pool.max_bytes = 1
+    pool.trim(keep=(folder, videos[0]))
+    assert list(pool.entries) == [(folder, videos[0])]
+    pool.discard()
+    assert not len(pool)
+    assert resources[0].frame_source is None
+
+
+def check_session(folder, videos):
+    session = ReviewSession(folder, videos)
+    assert session.resume_index() == 0
+    session.open(videos[0])
+    session.mark_done(videos[0])
+    session.open(videos[1])
+    # Reopening the folder continues at the open video, which was not saved
+    assert ReviewSession(folder, videos).resume_index() == 1
+    session.mark_done(videos[1])
+    assert ReviewSession(folder, videos).resume_index() == 2
+    # A video opened directly and left without saving is resumed
+    session.open(videos[0])
+    assert ReviewSession(folder, videos).resume_index() == 2
+    session.mark_done(videos[2])
+    assert ReviewSession(folder, videos).resume_index() is None
+    # Videos that left the folder are forgotten
+    assert ReviewSession(folder, videos[1:]).done == set(videos[1:])
+    os.remove(os.path.join(folder, SESSION_FILE))
+    assert ReviewSession(folder, videos).resume_index() == 0
+
+
+def main():
+    n_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        videos = [write_video(tmp, f"video{i}", n_tracks, n_frames, seed=i) for i in range(3)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            # The coordinate cache and the seek index are written by the first load, as in the GUI
+            for video in videos:
+                load_video_data(tmp, video)
+            check_pool(tmp, videos)
+            check_session(tmp, videos)
+
+            # Going back to a video: loaded again, or taken from the pool
+            start = time.perf_counter()
+            loaded = open_video(tmp, videos[0])
+            load_time = time.perf_counter() - start
+            pool = ResourcePool()
+            pool.put((tmp, videos[0]), loaded)
+            pool.put((tmp, videos[1]), open_video(tmp, videos[1]))
+            start = time.perf_counter()
+            pooled = pool.get((tmp, videos[0]))
+            assert pooled is not None and pooled.data.up_to_date
+            pool.trim(keep=(tmp, videos[0]))
+            pool_time = time.perf_counter() - start
+            same_data(loaded.data, pooled.data)
+            pool_bytes = pool.nbytes
+            pool.discard()
+
+    print(f"{n_tracks} tracks, {n_frames} frames")
+    print(f"Load on switch:     {load_time * 1000:8.1f} ms")
+    print(f"Pooled switch:      {pool_time * 1000:8.1f} ms ({load_time / max(pool_time, 1e-9):.0f}x)")
+    print(f"Pool of 2 videos:   {pool_bytes / 1024 ** 2:8.1f} MB")
+    print("The pool stays within its budget closing the least recently used videos; sessions resume correctly.")
+
+
+if __name__ == "__main__":
+    main()
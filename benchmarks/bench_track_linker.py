@@ -0,0 +1,102 @@
+"""Check the track stitching suggestions against synthetic worms with known fragments and compare the candidate
+search (sorted start frames in grid cells) with a scan over all pairs.
+
+Usage: python benchmarks/bench_track_linker.py [max_worms]
+"""
+import sys
+import time
+import numpy as np
+
+from synthetic import make_fragments
+from track_index import TrackIndex
+from track_edits import replay_owner, COMBINE
+from track_linker import track_endpoints, candidate_pairs, link_tracks, suggest_combines
+
+
+def true_links(coords, worms):
+    """(track, next track) of all consecutive tracks of the same worm."""
+    links = set()
+    for worm in np.unique(worms):
+        tracks = coords.track_ids[worms == worm]
+        links.update(zip(tracks[:-1].tolist(), tracks[1:].tolist()))
+    return links
+
+
+def all_pairs(endpoints, max_gap=90, max_distance=150.0):
+    gap = endpoints.first[np.newaxis, :] - endpoints.last[:, np.newaxis]
+    distance = np.hypot(endpoints.start_xy[np.newaxis, :, 0] - endpoints.end_xy[:, np.newaxis, 0],
+                        endpoints.start_xy[np.newaxis, :, 1] - endpoints.end_xy[:, np.newaxis, 1])
+    return np.nonzero((gap >= 1) & (gap <= max_gap) & (distance <= max_distance))
+
+
+def quality(density, n_videos=10):
+    found = correct = expected = 0
+    for seed in range(n_videos):
+        coords, worms = make_fragments(40, density=density, seed=seed)
+        links = link_tracks(TrackIndex(coords))
+        truth = true_links(coords, worms)
+        suggested = set(zip(links["Track"].tolist(), links["Next"].tolist()))
+        found += len(suggested)
+        correct += len(suggested & truth)
+        expected += len(truth)
+    return correct / max(found, 1), correct / max(expected, 1)
+
+
+def check_combined():
+    """Tracks combined during the review are linked as one track and get no suggestions among themselves."""
+    coords, worms = make_fragments(40, seed=3)
+    truth = sorted(true_links(coords, worms))
+    operations, used = [], set()
+    for a, b in truth[::2]:
+        if a not in used and b not in used:
+            operations.append((COMBINE, [a, b]))
+            used.update((a, b))
+    owner = replay_owner(operations, coords.track_ids)
+    links = link_tracks(TrackIndex(coords), owner)
+    combined = {(a, b) for _, (a, b) in operations}
+    remaining = {(int(owner[coords.track_pos[a]]), int(owner[coords.track_pos[b]])) for a, b in truth} - \
+        {(a, a) for a in owner.tolist()}
+    suggested = set(zip(links["Track"].tolist(), links["Next"].tolist()))
+    assert not suggested & combined
+    assert len(suggested & remaining) >= 0.9 * len(remaining), (len(suggested & remaining), len(remaining))
+    for tracks, score in suggest_combines(links):
+        assert len(tracks) >= 2 and 0 < score <= 1
+
+
+def main():
+    max_worms = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print("Worms per 2000x2000 px   precision   recall")
+    for worms_per_field in (40, 160, 640, 2560):
+        precision, recall = quality(worms_per_field / 2000 ** 2)
+        print(f"{worms_per_field:24d}   {precision:9.3f}   {recall:6.3f}")
+        if worms_per_field == 40:
+            assert precision >= 0.95 and recall >= 0.9, (precision, recall)
+    check_combined()
+
+    print("\nFragments   candidates   grid search   all pairs   link_tracks")
+    n_worms = 250
+    while n_worms <= max_worms:
+        coords, worms = make_fragments(n_worms, seed=n_worms)
+        track_index = TrackIndex(coords)
+        endpoints = track_endpoints(track_index)
+        start = time.perf_counter()
+        ending, starting = candidate_pairs(endpoints)
+        grid_time = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = all_pairs(endpoints)
+        scan_time = time.perf_counter() - start
+        assert set(zip(ending.tolist(), starting.tolist())) == set(zip(*(part.tolist() for part in expected)))
+        start = time.perf_counter()
+        links = link_tracks(track_index)
+        link_time = time.perf_counter() - start
+        truth = true_links(coords, worms)
+        assert len(set(zip(links["Track"].tolist(), links["Next"].tolist())) & truth) >= 0.9 * len(truth)
+        print(f"{len(endpoints):9d}   {len(ending):10d}   {grid_time * 1000:8.1f} ms   {scan_time * 1000:6.1f} ms"
+              f"   {link_time * 1000:8.1f} ms")
+        n_worms *= 2
+    print("Grid search finds the same candidates as the scan over all pairs.")
+
+
+if __name__ == "__main__":
+    main()
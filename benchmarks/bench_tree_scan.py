@@ -0,0 +1,69 @@
+"""Former nested os.walk traversal of process_line_folders versus the single-pass scan_tree on deep trees.
+
+The former traversal walks the subtree of every folder again (find_subfolders) and analyze_data walks each
+"tracks_processed" folder a third time. Both must find the same line folders and processed files.
+
+Usage: python benchmarks/bench_tree_scan.py [n_lines]
+"""
+import os
+import sys
+import tempfile
+import time
+from os.path import join
+
+# Make the modules of the application importable (this benchmark writes its own folder tree)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Swimming_Video_Analysis"))
+from postprocessing import find_line_folders  # noqa: E402
+
+
+def find_line_folders_legacy(data_root):
+    """Traversal of the former process_line_folders, find_subfolders and analyze_data (without deduplication)."""
+    jobs = []
+    for rootdir, dirs, files in os.walk(data_root):
+        for cond_folder in dirs:
+            for root, sub_dirs, _ in os.walk(join(rootdir, cond_folder)):
+                for dir_name in sub_dirs:
+                    line_folder = join(root, dir_name)
+                    tracks_processed_path = join(line_folder, "tracks_processed")
+                    if os.path.exists(tracks_processed_path):
+                        text_paths = [join(walk_root, file) for walk_root, _, walk_files in os.walk(tracks_processed_path)
+                                      for file in walk_files if "_processed.xlsx" in file]
+                        jobs.append((line_folder, tracks_processed_path, sorted(text_paths)))
+    return jobs
+
+
+def write_tree(root, n_lines, depth, n_videos=3):
+    """n_lines line folders spread over 4 conditions with `depth` folder levels between condition and line."""
+    for line in range(n_lines):
+        parts = [f"cond{line % 4 + 1}"] + [f"level{level + 1}_{line % (level + 2)}" for level in range(depth)]
+        processed = join(root, *parts, f"line{line + 1}", "tracks_processed")
+        os.makedirs(processed)
+        for video in range(n_videos):
+            open(join(processed, f"video{video + 1}_tracks_processed.xlsx"), "w").close()
+        open(join(processed, f"video1_log.txt"), "w").close()
+
+
+def timed(function, argument):
+    start = time.perf_counter()
+    result = function(argument)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    print(f"{'depth':>5} {'lines':>6} {'legacy jobs':>12} {'legacy (ms)':>12} {'scan (ms)':>10} {'speedup':>8}")
+    for depth in (0, 2, 4, 8):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_tree(tmp, n_lines, depth)
+            legacy, legacy_ms = timed(find_line_folders_legacy, tmp)
+            scanned, scan_ms = timed(find_line_folders, tmp)
+            # The former traversal finds a line folder once per folder above it
+            assert sorted(set((line, path, tuple(files)) for line, path, files in legacy)) == \
+                sorted((line, path, tuple(files)) for line, path, files in scanned)
+            assert len(scanned) == n_lines
+            print(f"{depth:>5} {n_lines:>6} {len(legacy):>12} {legacy_ms:>12.1f} {scan_ms:>10.1f} "
+                  f"{legacy_ms / scan_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
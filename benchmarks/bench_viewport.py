@@ -0,0 +1,54 @@
+"""Double LANCZOS resize of the former update_frame versus the single-pass viewport transform at each zoom step.
+
+The viewport is clipped to the image label (VIEW_SIZE); the double resize is compared on the same part.
+
+Usage: python benchmarks/bench_viewport.py [frame_size]
+"""
+import sys
+import time
+import numpy as np
+
+from bench_render import render_legacy
+from frame_renderer import FrameRenderer, QUALITY_FAST, QUALITY_HIGH, StageTimer, VIEW_SIZE
+
+
+def zoom_steps():
+    """Values of VideoPlayer.zoom_slider (0.33 to 2 with resolution 0.1)."""
+    return [0.33] + [round(value, 1) for value in np.arange(0.4, 2.01, 0.1)]
+
+
+def mean_ms(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    repeat = 5
+    rng = np.random.default_rng(0)
+    # Smooth synthetic frame, so the difference between both paths reflects resampling and not noise
+    frame = np.repeat(rng.integers(0, 255, (size // 16, size // 16, 3), dtype=np.uint8), 16, axis=0).repeat(16, axis=1)
+    renderer = FrameRenderer()
+    renderer.set_frame(0, frame)
+    pan_x, pan_y = size // 8, size // 8
+
+    print(f"Frame {size}x{size}, mean of {repeat} renders (ms); diff = mean abs. difference to the double resize")
+    print(f"{'zoom':>5} {'double resize':>14} {'single fast':>12} {'single high':>12} {'diff high':>10}")
+    for zoom_value in zoom_steps():
+        base_scale, zoom_level = (zoom_value, 1.0) if zoom_value <= 1.0 else (1.0, zoom_value)
+        legacy_ms, legacy = mean_ms(lambda: render_legacy(frame, base_scale, zoom_level, pan_x, pan_y, StageTimer()),
+                                    repeat)
+        fast_ms, _ = mean_ms(lambda: renderer.render(base_scale, zoom_level, pan_x, pan_y, QUALITY_FAST, VIEW_SIZE),
+                             repeat)
+        high_ms, high = mean_ms(lambda: renderer.render(base_scale, zoom_level, pan_x, pan_y, QUALITY_HIGH, VIEW_SIZE),
+                                repeat)
+        left, top = renderer.origin[0] - pan_x, renderer.origin[1] - pan_y
+        legacy = np.asarray(legacy, dtype=float)[top:top + high.height, left:left + high.width]
+        diff = np.abs(legacy - np.asarray(high, dtype=float)).mean()
+        print(f"{zoom_value:>5} {legacy_ms:>14.1f} {fast_ms:>12.1f} {high_ms:>12.1f} {diff:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
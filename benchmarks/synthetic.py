@@ -0,0 +1,386 @@
+import os
+import struct
+import sys
+import numpy as np
+import cv2 as cv
+
+# Make the modules of the application importable when the benchmarks are run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Swimming_Video_Analysis"))
+
+# ------------------ Synthetic wrMTrck Output ------------------
+
+
+def write_tracks_raw(path, n_tracks, n_frames=9000, block_size=75, seed=0):
+    """Write a "*_tracks_raw.txt" file in wrMTrck layout with n_tracks random walks."""
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, n_frames // 2, n_tracks)
+    length = rng.integers(n_frames // 10, n_frames, n_tracks)
+    start = rng.uniform(100, 1900, (n_tracks, 2))
+    steps = rng.normal(0, 1.5, (n_frames, n_tracks, 2)).cumsum(axis=0)
+    xy = np.round(start + steps, 1)
+    frames = np.arange(n_frames)[:, None]
+    visible = (frames >= first) & (frames < first + length)
+
+    with open(path, "w") as file:
+        for block_start in range(0, n_tracks, block_size):
+            block_end = min(block_start + block_size, n_tracks)
+            file.write(f"Tracks {block_start + 1} to {block_end}\n")
+            header = ["Frame"]
+            for track in range(block_start + 1, block_end + 1):
+                header.extend([f"X{track}", f"Y{track}", f"Flag{track}"])
+            file.write("\t".join(header) + "\n")
+            for frame in range(n_frames):
+                row = [str(frame)]
+                for track in range(block_start, block_end):
+                    if visible[frame, track]:
+                        row.extend([f"{xy[frame, track, 0]:.1f}", f"{xy[frame, track, 1]:.1f}", "0"])
+                    else:
+                        row.extend(["", "", ""])
+                file.write("\t".join(row) + "\n")
+            file.write("\n")
+    return path
+
+
+TRACK_COLUMNS = ["Track ", "Length", "Distance", "#Frames", "1stFrame", "time(s)", "MaxSpeed", "AvgSpeed", "AvgArea",
+                 "AvgPerim", "AvgLength", "AvgWidth", "AvgAspect", "Bends", "BBPS"]
+
+
+def make_tracks_table(n_worms, fragments=3, n_frames=9000, fps=30.0, seed=0):
+    """wrMTrck "*_tracks.txt" table of n_worms worms that are each lost and re-found as 1 to `fragments` tracks.
+
+    Returns the table (tracks numbered by their first frame like wrMTrck does) and the worm of every track.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for worm in range(n_worms):
+        pieces = int(rng.integers(1, fragments + 1))
+        start = int(rng.integers(0, n_frames // 4))
+        cuts = np.sort(rng.choice(np.arange(start + 30, n_frames - 30, 30), pieces - 1, replace=False)) if pieces > 1 else []
+        bounds = np.concatenate(([start], cuts, [n_frames]))
+        bend_rate = rng.uniform(0.5, 2.5)  # Body bends per second of this worm
+        size = rng.uniform(0.8, 1.2)
+        for first, end in zip(bounds[:-1], bounds[1:]):
+            frames = int(end - first - rng.integers(0, 10))
+            time = frames / fps
+            bends = int(rng.poisson(bend_rate * time))
+            speed = rng.uniform(50, 150, 3)
+            rows.append({
+                "Length": round(speed[0] * time, 1), "Distance": round(speed[1] * time * 0.3, 1),
+                "#Frames": frames, "1stFrame": int(first), "time(s)": round(time, 3),
+                "MaxSpeed": round(speed.max() * 1.5, 1), "AvgSpeed": round(speed[0], 1),
+                "AvgArea": round(900 * size + rng.normal(0, 20), 1), "AvgPerim": round(180 * size, 1),
+                "AvgLength": round(70 * size, 1), "AvgWidth": round(12 * size, 1),
+                "AvgAspect": round(5.8 + rng.normal(0, 0.2), 2), "Bends": bends,
+                "BBPS": round(bends / time, 3) if time else 0.0, "worm": worm})
+    table = pd.DataFrame(rows).sort_values("1stFrame", kind="stable").reset_index(drop=True)
+    table.insert(0, "Track ", np.arange(1, len(table) + 1))
+    return table[TRACK_COLUMNS], table["worm"].to_numpy()
+
+
+def write_tracks(path, table):
+    """Write a table of make_tracks_table as tab-separated "*_tracks.txt" file."""
+    table.to_csv(path, sep="\t", index=False)
+    return path
+
+
+def combine_steps(process_df, worms):
+    """Combine steps that re-join the tracks of every worm of make_tracks_table (process_df indexed by Track).
+
+    Every other worm is re-joined in two steps.
+    """
+    steps = []
+    for worm in np.unique(worms):
+        tracks = process_df.index[worms == worm].tolist()
+        if len(tracks) < 2:
+            continue
+        if worm % 2 and len(tracks) > 2:
+            steps.append(tracks[:2])
+            steps.append([tracks[0]] + tracks[2:])
+        else:
+            steps.append(tracks)
+    return steps
+
+
+def make_swimming(n_tracks, n_frames=9000, fps=30.0, amplitude=6.0, noise=0.5, seed=0):
+    """Centroids of thrashing worms as TrackCoordinates and the number of body bends of every track.
+
+    Every worm drifts slowly and sways sideways with 1-3 bends per second; a bend is one swing from one side to
+    the other, i.e. one zero crossing of the sway.
+    """
+    from coords_parser import TrackCoordinates
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames)[:, None] / fps
+    first = rng.integers(0, n_frames // 2, n_tracks)
+    length = rng.integers(n_frames // 4, n_frames - n_frames // 2, n_tracks)
+    frequency = rng.uniform(0.5, 1.5, n_tracks)  # Strokes per second, two bends per stroke
+    phase = rng.uniform(0, 2 * np.pi, n_tracks)
+    heading = rng.uniform(0, np.pi, n_tracks)
+    wave = np.sin(2 * np.pi * frequency * t + phase)
+    drift = rng.normal(0, 0.3, (n_frames, n_tracks, 2)).cumsum(axis=0)
+    xy = rng.uniform(200, 1800, (n_tracks, 2)) + drift + rng.normal(0, noise, (n_frames, n_tracks, 2))
+    xy[:, :, 0] += amplitude * wave * -np.sin(heading)
+    xy[:, :, 1] += amplitude * wave * np.cos(heading)
+
+    frames = np.arange(n_frames)[:, None]
+    visible = (frames >= first) & (frames < first + length)
+    coords = np.full((n_frames, n_tracks, 3), np.nan, dtype=np.float32)
+    coords[:, :, :2] = np.where(visible[:, :, None], xy, np.nan)
+    coords[:, :, 2] = np.where(visible, 0, np.nan)
+
+    # Zero crossings of the sway while the worm is visible
+    sign = np.sign(wave)
+    crossings = (sign[1:] != sign[:-1]) & visible[1:] & visible[:-1]
+    bends = crossings.sum(axis=0)
+    return TrackCoordinates(coords, np.arange(1, n_tracks + 1), np.arange(n_frames)), bends
+
+
+def split_tracks(coords, gap=5):
+    """Split every track in the middle into two tracks, leaving out `gap` frames in between.
+
+    Returns the split TrackCoordinates and the owner of every split track (the second half combined into the first).
+    """
+    from coords_parser import TrackCoordinates
+
+    values = np.asarray(coords.coords)
+    found = ~np.isnan(values[:, :, 0])
+    middle = (np.argmax(found, axis=0) + coords.n_frames - np.argmax(found[::-1], axis=0)) // 2
+    frames = np.arange(coords.n_frames)[:, None]
+    first = np.where((frames < middle)[:, :, None], values, np.nan)
+    second = np.where((frames >= middle + gap)[:, :, None], values, np.nan)
+    split = TrackCoordinates(np.concatenate((first, second), axis=1).astype(np.float32),
+                             np.arange(1, 2 * coords.n_tracks + 1), coords.frame_numbers)
+    owner = np.tile(np.arange(1, coords.n_tracks + 1), 2)  # Second half combined into the first
+    return split, owner
+
+
+def make_fragments(n_worms, n_frames=1800, fragments=4, max_gap=60, density=40 / 2000 ** 2, seed=0):
+    """Centroids of swimming worms that are each lost up to fragments - 1 times as TrackCoordinates.
+
+    Every worm moves with a slowly turning heading and is missing for 1 to max_gap frames between its tracks. The
+    field grows with n_worms so that density (worms per square pixel) stays the same. Returns the coordinates
+    (tracks numbered by their first frame like wrMTrck does) and the worm of every track.
+    """
+    from coords_parser import TrackCoordinates
+
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(n_worms / density)
+    heading = rng.uniform(0, 2 * np.pi, n_worms) + rng.normal(0, 0.03, (n_frames, n_worms)).cumsum(axis=0)
+    speed = rng.uniform(0.3, 1.5, n_worms)
+    steps = np.stack((np.cos(heading), np.sin(heading)), axis=-1) * speed[:, None]
+    xy = rng.uniform(0, size, (n_worms, 2)) + steps.cumsum(axis=0) + rng.normal(0, 0.5, (n_frames, n_worms, 2))
+
+    pieces = []  # (worm, first frame, end frame)
+    for worm in range(n_worms):
+        start = int(rng.integers(0, n_frames // 4))
+        end = int(rng.integers(3 * n_frames // 4, n_frames + 1))
+        n_pieces = int(rng.integers(1, fragments + 1))
+        cuts = np.sort(rng.choice(np.arange(start + 60, end - 60, 60), n_pieces - 1, replace=False))
+        bounds = np.concatenate(([start], cuts, [end]))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            gap = int(rng.integers(1, min(max_gap, last - first - 30) + 1)) if last < end else 0
+            pieces.append((worm, int(first), int(last) - gap))
+    pieces.sort(key=lambda piece: piece[1])
+
+    coords = np.full((n_frames, len(pieces), 3), np.nan, dtype=np.float32)
+    for column, (worm, first, end) in enumerate(pieces):
+        coords[first:end, column, :2] = xy[first:end, worm]
+        coords[first:end, column, 2] = 0
+    worms = np.array([piece[0] for piece in pieces])
+    return TrackCoordinates(coords, np.arange(1, len(pieces) + 1), np.arange(n_frames)), worms
+
+
+
+def make_crossings(n_pairs, n_single=0, n_frames=9000, spacing=400.0, seed=0):
+    """Pairs of worms that touch for a while and singles that are lost for a moment, as TrackCoordinates.
+
+    The two worms of a pair approach each other from different sides; while they touch they are one shared track
+    (at the centre of both) and afterwards they go on as two new tracks, like wrMTrck tracks them. Singles drop out
+    for 1 to 30 frames and are found again at the same place. Every worm gets a cell of spacing pixels of its own.
+    Returns the coordinates (tracks numbered by their first frame) and the track numbers of the shared tracks.
+    """
+    from coords_parser import TrackCoordinates
+
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(n_pairs + n_single)))
+    centres = (np.stack(np.divmod(rng.permutation(columns ** 2)[:n_pairs + n_single], columns), axis=1) + 0.5) * spacing
+    pieces = []  # (first frame, (frames, 2) X/Y, shared)
+
+    def walk(length, speed=0.3):
+        return rng.normal(0, speed, (length, 2)).cumsum(axis=0)
+
+    for centre in centres[:n_pairs]:
+        meet = int(rng.integers(n_frames // 5, 3 * n_frames // 5))
+        together = int(rng.integers(15, 150))
+        shared = centre + walk(together)
+        pieces.append((meet, shared, True))
+        angles = rng.uniform(0, 2 * np.pi) + np.array([0, rng.uniform(2 * np.pi / 3, 4 * np.pi / 3)])
+        for angle in angles:
+            # Approach until the frame before the merge, leave in another direction after the split
+            before = int(rng.integers(100, meet))
+            steps = np.arange(before, 0, -1)[:, None]
+            direction = np.array([np.cos(angle), np.sin(angle)])
+            pieces.append((meet - before, shared[0] + direction * (15 + 0.8 * steps) + walk(before, 0.1), False))
+            after = int(rng.integers(100, n_frames - meet - together))
+            steps = np.arange(1, after + 1)[:, None]
+            angle += rng.uniform(-1, 1)
+            direction = np.array([np.cos(angle), np.sin(angle)])
+            pieces.append((meet + together, shared[-1] + direction * (15 + 0.8 * steps) + walk(after, 0.1), False))
+
+    for centre in centres[n_pairs:]:
+        start = int(rng.integers(0, n_frames // 4))
+        path = centre + walk(n_frames - start)
+        lost = int(rng.integers(start + 100, n_frames - 100)) - start
+        gap = int(rng.integers(1, 31))
+        pieces.append((start, path[:lost], False))
+        pieces.append((start + lost + gap, path[lost + gap:], False))
+
+    pieces.sort(key=lambda piece: piece[0])
+    coords = np.full((n_frames, len(pieces), 3), np.nan, dtype=np.float32)
+    for column, (first, xy, _) in enumerate(pieces):
+        coords[first:first + len(xy), column, :2] = xy + rng.normal(0, 0.5, xy.shape)
+        coords[first:first + len(xy), column, 2] = 0
+    track_ids = np.arange(1, len(pieces) + 1)
+    shared = track_ids[[piece[2] for piece in pieces]]
+    return TrackCoordinates(coords, track_ids, np.arange(n_frames)), shared
+
+
+
+ARTIFACT_KINDS = ["worm", "short", "jumping", "static", "drifting", "irregular"]
+
+
+def make_artifacts(n_each=10, n_frames=1800, fps=30.0, seed=0):
+    """Labelled tracks of thrashing worms and of the artifacts of artifacts.classify as TrackCoordinates.
+
+    worm: drifting slowly or swimming across while swaying regularly; short: a worm found for 5-25 frames;
+    jumping: a spot flickering between two places; static: debris lying still; drifting: debris moving along a
+    straight line; irregular: a filament flapping at random. Returns the coordinates and the kind of every track.
+    """
+    from coords_parser import TrackCoordinates
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames) / fps
+    tracks, kinds = [], []
+
+    def smooth_noise(sigma):
+        kernel = np.exp(-0.5 * (np.arange(-3 * sigma, 3 * sigma + 1) / sigma) ** 2)
+        noise = np.convolve(rng.normal(0, 1, n_frames + len(kernel)), kernel, mode="same")[:n_frames]
+        return noise / noise.std()
+
+    for kind in ARTIFACT_KINDS:
+        for _ in range(n_each):
+            start = rng.uniform(200, 1800, 2)
+            noise = rng.normal(0, 0.5, (n_frames, 2))
+            first, length = 0, n_frames
+            if kind in ("worm", "short"):
+                heading = rng.uniform(0, np.pi)
+                wave = rng.uniform(4, 8) * np.sin(2 * np.pi * rng.uniform(0.5, 1.5) * t + rng.uniform(0, 2 * np.pi))
+                swim = rng.uniform(0, 0.8) * np.array([np.cos(heading + np.pi / 2), np.sin(heading + np.pi / 2)])
+                xy = start + rng.normal(0, 0.3, (n_frames, 2)).cumsum(axis=0) + np.arange(n_frames)[:, None] * swim
+                xy += wave[:, None] * np.array([-np.sin(heading), np.cos(heading)])
+                if kind == "short":
+                    first, length = int(rng.integers(0, n_frames - 30)), int(rng.integers(5, 25))
+            elif kind == "jumping":
+                other = start + rng.uniform(40, 100) * np.array([np.cos(rng.uniform(0, 2 * np.pi)), 1])
+                xy = np.where(rng.random(n_frames)[:, None] < 0.3, other, start)
+            elif kind == "static":
+                xy = start + np.zeros((n_frames, 2))
+            elif kind == "drifting":
+                angle = rng.uniform(0, 2 * np.pi)
+                xy = start + np.arange(n_frames)[:, None] * rng.uniform(0.2, 1.0) * np.array([np.cos(angle), np.sin(angle)])
+            else:
+                angle = rng.uniform(0, np.pi)
+                flap = rng.uniform(4, 8) * smooth_noise(rng.uniform(3, 8))
+                xy = start + flap[:, None] * np.array([np.cos(angle), np.sin(angle)])
+            part = np.full((n_frames, 3), np.nan, dtype=np.float32)
+            part[first:first + length, :2] = (xy + noise)[first:first + length]
+            part[first:first + length, 2] = 0
+            tracks.append(part)
+            kinds.append(kind)
+
+    order = rng.permutation(len(tracks))
+    coords = np.stack([tracks[i] for i in order], axis=1)
+    return TrackCoordinates(coords, np.arange(1, len(tracks) + 1), np.arange(n_frames)), np.array(kinds)[order]
+
+
+def write_experiment_tree(root, n_conditions=10, n_lines=30, n_videos=3, depth=0, seed=0):
+    """Postprocessing tree root/cond*/[sub*/...]line*/tracks_processed/*_processed.xlsx; returns the line folders.
+
+    depth adds that many folder levels between a condition and its lines. The processed files are copies of a few
+    files written with write_processed, with distinct contents (track order) and modification times.
+    """
+    import shutil
+    from processed_output import write_processed
+
+    templates_root = os.path.join(root, "_templates")
+    templates = []
+    for index in range(4):
+        table, _ = make_tracks_table(40 + 10 * index, seed=seed + index)
+        process_df = table.rename(columns={"Track ": "Track"}).set_index("Track")
+        templates.append(write_processed(process_df, templates_root, f"template{index}"))
+
+    line_folders = []
+    mtime = 1700000000
+    for condition in range(n_conditions):
+        parent = os.path.join(root, "exp", f"cond{condition + 1}", *[f"sub{level + 1}" for level in range(depth)])
+        for line in range(n_lines):
+            line_folder = os.path.join(parent, f"line{condition * n_lines + line + 1}")
+            processed = os.path.join(line_folder, "tracks_processed")
+            os.makedirs(processed)
+            for video in range(n_videos):
+                path = os.path.join(processed, f"video{video + 1}_tracks_processed.xlsx")
+                shutil.copyfile(templates[(line + video) % len(templates)], path)
+                mtime += 1
+                os.utime(path, (mtime, mtime))
+            line_folders.append(line_folder)
+    shutil.rmtree(templates_root)
+    return line_folders
+
+
+def write_avi(path, n_frames, size):
+    """Write an MJPG AVI whose frame number can be read back from the grey value of its left half."""
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), 30, (size, size))
+    rng = np.random.default_rng(0)
+    texture = rng.integers(0, 255, (size, size // 2, 3), dtype=np.uint8)
+    for frame_number in range(n_frames):
+        frame = np.empty((size, size, 3), dtype=np.uint8)
+        frame[:, :size // 2] = (frame_number * 37) % 256
+        frame[:, size // 2:] = texture
+        writer.write(frame)
+    writer.release()
+
+
+def write_dib_avi(path, frames, top_down=False, empty=()):
+    """Write BGR frames as uncompressed 24 bit AVI (bottom-up rows unless top_down); chunks at the positions in empty
+    are left empty like dropped frames."""
+    height, width = frames[0].shape[:2]
+    stride = (width * 3 + 3) & ~3
+
+    def chunk(chunk_id, data):
+        return struct.pack("<4sI", chunk_id, len(data)) + data + b"\0" * (len(data) & 1)
+
+    def chunk_list(list_type, *parts):
+        return chunk(b"LIST", list_type + b"".join(parts))
+
+    avih = chunk(b"avih", struct.pack("<10I", 33333, 0, 0, 0, len(frames), 0, 1, 0, width, height) + bytes(16))
+    strh = chunk(b"strh", b"vids" + bytes(4) + struct.pack("<IHHIIIIIIIIhhhh", 0, 0, 0, 0, 1, 30, 0, len(frames),
+                                                          stride * height, 0, 0, 0, 0, width, height))
+    strf = chunk(b"strf", struct.pack("<IiiHHIIiiII", 40, width, -height if top_down else height, 1, 24, 0,
+                                      stride * height, 0, 0, 0, 0))
+    data_chunks = []
+    for index, frame in enumerate(frames):
+        rows = np.zeros((height, stride), dtype=np.uint8)
+        rows[:, :width * 3] = frame.reshape(height, width * 3)
+        data = b"" if index in empty else (rows if top_down else rows[::-1]).tobytes()
+        data_chunks.append(chunk(b"00db", data))
+    riff = b"AVI " + chunk_list(b"hdrl", avih, chunk_list(b"strl", strh, strf)) + chunk_list(b"movi", *data_chunks)
+    with open(path, "wb") as file:
+        file.write(struct.pack("<4sI", b"RIFF", len(riff)) + riff)
+    return path
+
+
+def is_frame(frame, frame_number):
+    """Check the grey value written by write_avi (JPEG shifts it by a few levels)."""
+    return frame is not None and abs(float(frame[:, :frame.shape[1] // 4].mean()) - (frame_number * 37) % 256) < 5
@@ -0,0 +1,88 @@
+"""Compare the body bends counted from the X/Y-Coordinates with the values of wrMTrck.
+
+With a folder, every "*_tracks.txt" below it is compared track by track (uncombined) with count_bends on the
+matching "*_tracks_raw.txt". Without a folder, count_bends is timed on synthetic thrashing worms with known bends,
+including worms split into fragments that are combined again (their bends are checked in tests/test_bends.py).
+
+Usage: python benchmarks/validate_bends.py [folder]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from synthetic import make_swimming, split_tracks
+from coords_parser import load_tracks_raw
+from bends import BendCounter, count_bends, frame_rate
+
+
+def compare(table, counted):
+    """Agreement of wrMTrck's values (table) with count_bends (counted) on the tracks of both."""
+    joined = table[["#Frames", "Bends", "BBPS"]].join(counted, rsuffix=" (XY)", how="inner")
+    joined = joined[joined["#Frames (XY)"] > 0]
+    return {
+        "tracks": len(joined),
+        "frames equal": float(np.mean(joined["#Frames"] == joined["#Frames (XY)"])),
+        "r (Bends)": float(np.corrcoef(joined["Bends"], joined["Bends (XY)"])[0, 1]) if len(joined) > 1 else np.nan,
+        "median |dBBPS|": float(np.median(np.abs(joined["BBPS"] - joined["BBPS (XY)"]))),
+        "median ratio": float(np.median(joined["BBPS (XY)"] / joined["BBPS"].replace(0, np.nan))),
+    }
+
+
+def validate_folder(folder):
+    results = []
+    for root, _, files in os.walk(folder):
+        for file in sorted(files):
+            if not file.endswith("_tracks.txt"):
+                continue
+            coords_file = os.path.join(root, file.replace("_tracks.txt", "_tracks_raw.txt"))
+            if not os.path.exists(coords_file):
+                continue
+            table = pd.read_csv(os.path.join(root, file), sep="\t").rename(columns={"Track ": "Track"}).set_index("Track")
+            start = time.perf_counter()
+            counted = count_bends(load_tracks_raw(coords_file), fps=frame_rate(table))
+            elapsed = time.perf_counter() - start
+            result = compare(table, counted)
+            results.append(result)
+            print(f"{file}: " + ", ".join(f"{key} {value:.3g}" for key, value in result.items()) + f" ({elapsed:.2f} s)")
+    if not results:
+        print(f"No '*_tracks.txt' with '*_tracks_raw.txt' found in {folder}")
+        return
+    print("all: " + ", ".join(f"{key} {np.nanmedian([r[key] for r in results]):.3g}" for key in results[0]))
+
+
+def validate_synthetic():
+    coords, bends = make_swimming(300)
+    start = time.perf_counter()
+    counted = count_bends(coords)
+    elapsed = time.perf_counter() - start
+    error = np.abs(counted["Bends"].to_numpy() - bends)
+    print(f"300 tracks x {coords.n_frames} frames in {elapsed:.2f} s, bends off by {error.mean():.2f} on average "
+          f"(max {error.max()})")
+
+    split, owner = split_tracks(coords)
+    combined = count_bends(split, owner)
+    separate = count_bends(split)["Bends"].to_numpy()
+    fragment_sum = separate[:coords.n_tracks] + separate[coords.n_tracks:]
+    error = np.abs(combined["Bends"].to_numpy() - bends)
+    print(f"split and combined: bends off by {error.mean():.2f} on average (max {error.max()}), "
+          f"summing the fragments loses {np.mean(bends - fragment_sum):.2f} bends per worm")
+
+    counter = BendCounter(split)
+    counter.table(owner)
+    start = time.perf_counter()
+    owner[owner == 1] = -1
+    counter.table(owner)
+    print(f"BendCounter after deleting one worm: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def main():
+    if len(sys.argv) > 1:
+        validate_folder(sys.argv[1])
+    else:
+        validate_synthetic()
+
+
+if __name__ == "__main__":
+    main()
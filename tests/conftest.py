@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The synthetic wrMTrck output of the benchmarks is shared with the tests; importing synthetic also makes the
+# modules of the application importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+import synthetic  # noqa: E402,F401
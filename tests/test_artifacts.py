@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic import make_artifacts
+from track_index import TrackIndex
+from track_edits import replay_owner, COMBINE
+from artifacts import track_features, classify, mark_rows
+
+EXPECTED = {"worm": "", "short": "short", "jumping": "jumping", "static": "static", "drifting": "drifting",
+            "irregular": "irregular"}
+
+
+def reference_features(track_index, track):
+    """Path length, median speed and maximum step of one track with a plain loop."""
+    frames, xy = track_index.trajectory(track)
+    steps = [np.hypot(*(xy[i + 1] - xy[i])) for i in range(len(xy) - 1) if frames[i + 1] == frames[i] + 1]
+    if not steps:
+        return 0.0, np.nan, 0.0
+    return sum(steps), sorted(steps)[(len(steps) - 1) // 2], max(steps)
+
+
+# Fixture set: (seed, tracks per kind); every track has to get the reason of its kind ("" for worms)
+@pytest.mark.parametrize("seed, n_each", [(0, 10), (1, 10), (2, 10), (3, 5), (4, 5)])
+def test_fixtures_are_classified(seed, n_each):
+    coords, kinds = make_artifacts(n_each, seed=seed)
+    reasons = classify(track_features(TrackIndex(coords))).reindex(coords.track_ids).to_numpy()
+    results = pd.DataFrame({"kind": kinds, "reason": reasons})
+    wrong = results[results["reason"] != results["kind"].map(EXPECTED)]
+    assert wrong.empty, wrong
+
+
+def test_batched_features_match_loop():
+    coords, _ = make_artifacts(4, seed=7)
+    track_index = TrackIndex(coords)
+    features = track_features(track_index)
+    for track in features.index:
+        path, median, max_step = reference_features(track_index, track)
+        assert np.isclose(features.loc[track, "PathLength"], path, rtol=1e-5)
+        assert np.isclose(features.loc[track, "MaxStep"], max_step, rtol=1e-5)
+        assert np.isclose(features.loc[track, "MedianSpeed"], median, rtol=1e-5, equal_nan=True)
+
+
+def test_row_marked_only_if_all_combined_tracks_are():
+    coords, kinds = make_artifacts(4, seed=7)
+    reasons = classify(track_features(TrackIndex(coords)))
+    worm, artifact = coords.track_ids[kinds == "worm"][0], coords.track_ids[kinds == "static"][:2]
+    owner = replay_owner([(COMBINE, [worm, artifact[0]])], coords.track_ids)
+    marked = mark_rows(reasons, owner, coords.track_ids)
+    assert marked[worm] == "" and marked[artifact[1]] == "static"
+    assert artifact[0] not in marked.index
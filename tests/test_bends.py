@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from synthetic import make_swimming, split_tracks
+from bends import BendCounter, count_bends
+
+
+@pytest.fixture(scope="module")
+def swimming():
+    return make_swimming(300)
+
+
+def test_bends_of_thrashing_worms(swimming):
+    coords, bends = swimming
+    counted = count_bends(coords)
+    assert np.abs(counted["Bends"].to_numpy() - bends).max() <= 2
+
+
+def test_bends_of_combined_fragments(swimming):
+    coords, bends = swimming
+    split, owner = split_tracks(coords)
+    combined = count_bends(split, owner)
+    assert np.abs(combined["Bends"].to_numpy() - bends).max() <= 3
+    assert BendCounter(split).table(owner).equals(combined)
+
+
+def test_deleted_tracks_are_left_out(swimming):
+    coords, _ = swimming
+    split, owner = split_tracks(coords)
+    counter = BendCounter(split)
+    expected = counter.table(owner).drop(1)
+    owner[owner == 1] = -1
+    assert counter.table(owner).equals(expected)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic import make_tracks_table, combine_steps
+from track_edits import combine_tracks, apply_operations, COMBINE, DELETE
+
+# How a worm re-joined from several tracks is expected to aggregate every column of "*_tracks.txt"
+EXPECTED_AGGREGATION = {
+    "Length": "sum", "Distance": "sum", "#Frames": "sum", "1stFrame": "min", "time(s)": "sum", "MaxSpeed": "max",
+    "AvgSpeed": "weighted", "AvgArea": "weighted", "AvgPerim": "weighted", "AvgLength": "weighted",
+    "AvgWidth": "weighted", "AvgAspect": "weighted", "Bends": "sum", "BBPS": "rate",
+}
+
+
+def expected_table(process_df, worms):
+    """Recompute the row of every worm from its raw tracks."""
+    groups = process_df.assign(worm=worms).groupby("worm")
+    weights = process_df["#Frames"]
+    expected = {}
+    for column, aggregation in EXPECTED_AGGREGATION.items():
+        if aggregation == "weighted":
+            expected[column] = (process_df[column] * weights).groupby(worms).sum() / weights.groupby(worms).sum()
+        elif aggregation == "rate":
+            # Bends per second of the combined track; single tracks keep the value of wrMTrck
+            rate = groups["Bends"].sum() / groups["time(s)"].sum()
+            expected[column] = groups[column].first().where(groups.size() == 1, rate)
+        else:
+            expected[column] = groups[column].agg(aggregation)
+    table = pd.DataFrame(expected)
+    table.index = process_df.index.to_series().groupby(worms).min().to_numpy()
+    return table.sort_index()
+
+
+@pytest.fixture
+def tracks():
+    table, worms = make_tracks_table(450, fragments=4, seed=3)
+    assert len(table) >= 1000
+    return table.rename(columns={"Track ": "Track"}).set_index('Track'), worms
+
+
+def test_combined_table_matches_raw_tracks(tracks):
+    process_df, worms = tracks
+    original = process_df.copy()
+    steps = combine_steps(process_df, worms)
+    combined = apply_operations(process_df, [(COMBINE, step) for step in steps])
+
+    pd.testing.assert_frame_equal(process_df, original)  # The track data itself is not changed
+    expected = expected_table(process_df, worms)
+    assert combined.index.equals(expected.index)
+    assert list(process_df.columns) == list(EXPECTED_AGGREGATION)
+    for column, aggregation in EXPECTED_AGGREGATION.items():
+        tolerance = 1 if aggregation == "weighted" and combined[column].dtype.kind == "i" else 1e-6
+        np.testing.assert_allclose(combined[column].to_numpy(np.float64), expected[column].to_numpy(np.float64),
+                                   atol=tolerance, rtol=0, err_msg=column)
+        assert combined[column].dtype == process_df[column].dtype
+
+
+def test_combine_into_track_not_in_table(tracks):
+    process_df, _ = tracks
+    tracks_in_table = process_df.index[:3].tolist()
+    missing = int(process_df.index.max()) + 1
+    expected = combine_tracks(process_df.copy(), tracks_in_table)
+    combined = combine_tracks(process_df.copy(), [missing] + tracks_in_table)
+    assert missing in combined.index and combined.index.is_monotonic_increasing
+    assert not combined.index.isin(tracks_in_table).any()
+    assert (combined.dtypes == process_df.dtypes).all()
+    pd.testing.assert_series_equal(combined.loc[missing], expected.loc[tracks_in_table[0]], check_names=False)
+
+
+def test_unknown_tracks(tracks):
+    process_df, _ = tracks
+    original = process_df.copy()
+    missing = int(process_df.index.max()) + 1
+    pd.testing.assert_frame_equal(combine_tracks(process_df, [missing, missing + 1]), original)
+    with pytest.raises(KeyError):
+        apply_operations(process_df, [(DELETE, [missing])])
+    pd.testing.assert_frame_equal(process_df, original)
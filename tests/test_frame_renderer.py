@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from frame_renderer import FrameRenderer, QUALITY_FAST, QUALITY_HIGH
+
+
+@pytest.fixture
+def renderer():
+    rng = np.random.default_rng(0)
+    renderer = FrameRenderer()
+    renderer.set_frame(0, rng.integers(0, 255, (1200, 1600, 3), dtype=np.uint8))
+    return renderer
+
+
+@pytest.mark.parametrize("base_scale, zoom_level", [(0.33, 1.0), (0.7, 1.0), (1.0, 1.0), (1.0, 1.5)])
+@pytest.mark.parametrize("quality", [QUALITY_FAST, QUALITY_HIGH])
+def test_clipped_viewport_is_the_centre_of_the_full_viewport(renderer, base_scale, zoom_level, quality):
+    full = np.asarray(renderer.render(base_scale, zoom_level, 120, 80, quality))
+    assert renderer.origin == (120, 80)
+    clipped = np.asarray(renderer.render(base_scale, zoom_level, 120, 80, quality, max_size=(800, 600)))
+    assert clipped.shape[:2] == (min(full.shape[0], 600), min(full.shape[1], 800))
+    left, top = renderer.origin[0] - 120, renderer.origin[1] - 80
+    assert left == (full.shape[1] - clipped.shape[1]) // 2 and top == (full.shape[0] - clipped.shape[0]) // 2
+    # Same pixels up to the rounding of the fixed-point coordinates of warpAffine
+    part = full[top:top + clipped.shape[0], left:left + clipped.shape[1]]
+    assert np.abs(clipped.astype(int) - part).max() <= 1
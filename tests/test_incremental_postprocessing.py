@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import pytest
+
+from synthetic import write_experiment_tree, make_tracks_table
+from processed_output import write_processed
+from postprocessing import find_line_folders, analyze_line
+
+
+def results_file(line_folder):
+    return os.path.join(line_folder, f"{os.path.basename(line_folder)}_results.xlsx")
+
+
+def run(jobs, incremental):
+    """Process all line folders; returns the results bytes and the line folders whose results were rewritten."""
+    before = {job[0]: os.stat(results_file(job[0])).st_mtime_ns if os.path.exists(results_file(job[0])) else None
+              for job in jobs}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for job in jobs:
+            analyze_line(*job, incremental=incremental)
+    results, rewritten = {}, set()
+    for line_folder, _, _ in jobs:
+        with open(results_file(line_folder), "rb") as file:
+            results[line_folder] = file.read()
+        if os.stat(results_file(line_folder)).st_mtime_ns != before[line_folder]:
+            rewritten.add(line_folder)
+    return results, rewritten
+
+
+def check(root, expected_rewritten):
+    """Run incrementally, then check what was rewritten and that a full rebuild gives the same bytes."""
+    jobs = find_line_folders(root)
+    incremental, rewritten = run(jobs, incremental=True)
+    assert rewritten == expected_rewritten
+    full, _ = run(jobs, incremental=False)
+    assert incremental == full
+
+
+def write_video(processed, name, seed):
+    table, _ = make_tracks_table(35, seed=seed)
+    return write_processed(table.rename(columns={"Track ": "Track"}).set_index("Track"), processed, name)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    line_folders = write_experiment_tree(str(tmp_path), n_conditions=2, n_lines=2)
+    root = os.path.join(str(tmp_path), "exp")
+    check(root, set(line_folders))
+    return root, line_folders
+
+
+def test_unchanged_tree_is_not_rewritten(tree):
+    root, _ = tree
+    check(root, set())
+
+
+def test_added_changed_and_removed_files(tree):
+    root, line_folders = tree
+    added, changed, removed = line_folders[:3]
+    write_video(os.path.join(added, "tracks_processed"), "video9_tracks", seed=100)
+    os.remove(os.path.join(changed, "tracks_processed", "video2_tracks_processed.xlsx"))
+    write_video(os.path.join(changed, "tracks_processed"), "video2_tracks", seed=101)
+    os.remove(os.path.join(removed, "tracks_processed", "video3_tracks_processed.xlsx"))
+    check(root, {added, changed, removed})
+
+    # Saving a video again changes its columnar copy, which is what is read
+    write_video(os.path.join(added, "tracks_processed"), "video9_tracks", seed=102)
+    check(root, {added})
+    check(root, set())
+
+
+def test_damaged_results_are_written_again(tree):
+    root, line_folders = tree
+    with open(results_file(line_folders[3]), "ab") as file:
+        file.write(b"\0")
+    check(root, {line_folders[3]})
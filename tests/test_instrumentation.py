@@ -0,0 +1,91 @@
+import json
+import threading
+import numpy as np
+import pytest
+
+from instrumentation import Instruments, timed_call
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "timing.jsonl")
+
+
+def read_lines(log_path):
+    with open(log_path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_log_lines(log_path):
+    timings = Instruments(flush_every=1000)
+    timings.enable(log_path)
+    with timings.timer("outer", video="a.AVI"):
+        with timings.timer("inner"):
+            timings.annotate(frame=3)
+        timings.count("frames.read", 2)
+    with pytest.raises(KeyError):
+        with timings.timer("failing"):
+            raise KeyError(5)
+    thread = threading.Thread(target=lambda: timings.timer("background").__enter__().__exit__(None, None, None),
+                              name="video-prefetch_0")
+    thread.start()
+    thread.join()
+    result, ms = timed_call(lambda x: x + 1, 1)
+    timings.record("analyze_data", ms, {"line_folder": "line1", "worker": True})
+    timings.disable()
+    assert result == 2
+
+    lines = read_lines(log_path)
+    by_op = {line["op"]: line for line in lines}
+    assert by_op["inner"]["parent"] == "outer" and by_op["inner"]["frame"] == 3
+    assert by_op["outer"]["parent"] is None and by_op["outer"]["video"] == "a.AVI"
+    assert by_op["outer"]["ms"] >= by_op["inner"]["ms"]
+    assert by_op["failing"]["error"] == "KeyError"
+    assert by_op["background"]["thread"] == "video-prefetch_0" and by_op["background"]["parent"] is None
+    assert by_op["analyze_data"]["worker"] and by_op["analyze_data"]["line_folder"] == "line1"
+    assert lines[-1]["op"] == "counters" and lines[-1]["frames.read"] == 2
+
+
+def test_percentiles():
+    timings = Instruments(window=100)
+    timings.enable()
+    for value in range(1, 201):
+        timings.record("steps", float(value))
+    summary = timings.summary()["steps"]
+    # Only the last window durations count
+    assert summary["count"] == 100
+    assert summary["p50"] == np.percentile(np.arange(101, 201), 50)
+    assert summary["p95"] == np.percentile(np.arange(101, 201), 95)
+    assert summary["max"] == 200
+
+
+def test_nothing_recorded_when_off(log_path):
+    timings = Instruments()
+    with timings.timer("off"):
+        timings.annotate(frame=1)
+    timings.record("off", 1.0)
+    timings.count("off")
+    assert timings.summary() == {} and timings.counters == {}
+
+    timings.enable(log_path)
+    timings.record("steps", 1.0)
+    timings.disable()
+    timings.record("steps", 2.0)
+    assert timings.summary()["steps"]["count"] == 1
+    assert len(read_lines(log_path)) == 1
+
+
+def test_recording_again_starts_from_zero(log_path):
+    timings = Instruments()
+    timings.enable(log_path)
+    timings.record("steps", 100.0)
+    timings.count("frames.read", 5)
+    timings.disable()
+
+    timings.enable(log_path)
+    timings.record("steps", 1.0)
+    timings.count("frames.read", 2)
+    assert timings.summary()["steps"]["count"] == 1 and timings.summary()["steps"]["max"] == 1.0
+    timings.disable()
+    counters = [line for line in read_lines(log_path) if line["op"] == "counters"]
+    assert [line["frames.read"] for line in counters] == [5, 2]
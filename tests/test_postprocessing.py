@@ -0,0 +1,34 @@
+import contextlib
+import io
+import os
+import time
+
+from synthetic import write_experiment_tree
+from postprocessing import find_line_folders, run_serial, PostprocessingJobs
+
+
+def read_results(line_folders):
+    results = {}
+    for line_folder in line_folders:
+        path = os.path.join(line_folder, f"{os.path.basename(line_folder)}_results.xlsx")
+        with open(path, "rb") as file:
+            results[line_folder] = file.read()
+        os.remove(path)
+    return results
+
+
+def test_parallel_results_equal_serial_results(tmp_path):
+    line_folders = write_experiment_tree(str(tmp_path), n_conditions=2, n_lines=3)
+    jobs = find_line_folders(os.path.join(str(tmp_path), "exp"))
+    assert sorted(job[0] for job in jobs) == sorted(line_folders)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_serial(jobs, incremental=False)
+    serial = read_results(line_folders)
+
+    parallel_jobs = PostprocessingJobs(jobs, max_workers=2, incremental=False)
+    while not parallel_jobs.finished:
+        time.sleep(0.05)
+    parallel_jobs.close()
+    assert not parallel_jobs.errors()
+    assert read_results(line_folders) == serial
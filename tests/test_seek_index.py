@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pytest
+
+from synthetic import write_avi, write_dib_avi, is_frame
+from seek_index import load_seek_index, build_seek_index, index_path
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "video_labels_compressed.AVI")
+    write_avi(path, 40, 64)
+    return path
+
+
+def test_reads_exact_frames(video):
+    seek_index = load_seek_index(video)
+    with seek_index.open() as file:
+        for frame_number in (0, 17, 39, 3):
+            assert is_frame(seek_index.read(file, frame_number), frame_number)
+
+
+def test_saved_index_is_reused(video):
+    built = load_seek_index(video)
+    saved = load_seek_index(video)
+    assert np.array_equal(saved.offsets, built.offsets)
+    assert not os.path.exists(f"{index_path(video)}.tmp")
+
+
+@pytest.mark.parametrize("damage", ["empty", "truncated"])
+def test_damaged_index_is_rebuilt(video, damage):
+    built = load_seek_index(video)
+    with open(index_path(video), "rb") as file:
+        content = file.read()
+    with open(index_path(video), "wb") as file:
+        file.write(b"" if damage == "empty" else content[:len(content) // 2])
+
+    seek_index = load_seek_index(video)
+    assert np.array_equal(seek_index.offsets, built.offsets)
+    with open(index_path(video), "rb") as file:
+        assert file.read() == content
+
+
+@pytest.fixture
+def dib_frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (30, 41, 3), dtype=np.uint8) for _ in range(5)]  # Rows padded to 4 bytes
+
+
+@pytest.mark.parametrize("top_down", [False, True])
+def test_uncompressed_frames_keep_their_orientation(tmp_path, dib_frames, top_down):
+    video = write_dib_avi(str(tmp_path / "video.avi"), dib_frames, top_down=top_down)
+    for seek_index in (load_seek_index(video), load_seek_index(video)):  # Built, then loaded from the saved index
+        assert seek_index.top_down == top_down
+        with seek_index.open() as file:
+            for index, frame in enumerate(dib_frames):
+                assert np.array_equal(seek_index.read(file, index), frame)
+
+
+def test_dropped_frames(tmp_path, dib_frames):
+    # An empty chunk repeats the previous frame
+    video = write_dib_avi(str(tmp_path / "video.avi"), dib_frames, empty=(2, 3))
+    seek_index = load_seek_index(video)
+    with seek_index.open() as file:
+        assert [seek_index.read(file, index) is not None for index in range(5)] == [True] * 5
+        assert np.array_equal(seek_index.read(file, 3), dib_frames[1])
+
+    # Without a previous frame the video is left to cv.VideoCapture
+    video = write_dib_avi(str(tmp_path / "leading.avi"), dib_frames, empty=(0, 1))
+    assert build_seek_index(video) is None
+    assert load_seek_index(video) is None
@@ -0,0 +1,23 @@
+import contextlib
+import io
+import os
+import numpy as np
+
+from synthetic import write_tracks_raw, make_tracks_table, write_tracks, write_avi
+from prefetch import load_video_data, VIDEO_SUFFIX
+from session import VideoResources
+
+
+def test_memory_mapped_coordinates_are_not_counted(tmp_path):
+    folder = str(tmp_path)
+    write_avi(os.path.join(folder, f"video{VIDEO_SUFFIX}"), 20, 64)
+    write_tracks_raw(os.path.join(folder, "video_tracks_raw.txt"), 80, 500, seed=1)
+    table, _ = make_tracks_table(40, n_frames=500, seed=1)
+    write_tracks(os.path.join(folder, "video_tracks.txt"), table)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsed = load_video_data(folder, f"video{VIDEO_SUFFIX}")  # Parses the text file and writes the cache
+        mapped = load_video_data(folder, f"video{VIDEO_SUFFIX}")
+    assert not isinstance(parsed.coords.coords, np.memmap)
+    assert isinstance(mapped.coords.coords, np.memmap)
+    assert VideoResources(parsed).data_bytes - VideoResources(mapped).data_bytes == parsed.coords.coords.nbytes
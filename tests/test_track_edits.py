@@ -0,0 +1,71 @@
+import numpy as np
+
+from track_edits import (read_log, log_line, undo_line, redo_line, parse_log_line, OperationJournal, COMBINE,
+                         DELETE, UNDO, REDO)
+
+
+def write_log(path, lines):
+    with open(path, "w") as file:
+        file.writelines(f"{line}\n" for line in lines)
+    return str(path)
+
+
+def test_parse_log_lines():
+    assert parse_log_line(log_line(COMBINE, [3, 7, 9])) == (COMBINE, [3, 7, 9])
+    assert parse_log_line(log_line(DELETE, [4])) == (DELETE, [4])
+    assert parse_log_line(undo_line((COMBINE, [3, 7]))) == (UNDO, [3, 7])
+    assert parse_log_line(redo_line((DELETE, [4, 5]))) == (REDO, [4, 5])
+    assert parse_log_line("Last step undone.") == (UNDO, [])
+    assert parse_log_line("Last undone step redone.") == (REDO, [])
+    assert parse_log_line("Something else") is None
+
+
+def test_old_log_undoes_one_step_only(tmp_path):
+    # The undo button of older versions restored the state before the last step, a second undo changed nothing
+    log = write_log(tmp_path / "log.txt", [log_line(COMBINE, [1, 2]), log_line(DELETE, [5]), "Last step undone.",
+                                           "Last step undone.", log_line(DELETE, [6])])
+    assert read_log(log) == [(COMBINE, [1, 2]), (DELETE, [6])]
+
+
+def test_several_undos_and_redo(tmp_path):
+    log = write_log(tmp_path / "log.txt", [
+        log_line(COMBINE, [1, 2]), log_line(DELETE, [5]), log_line(COMBINE, [3, 4]),
+        undo_line((COMBINE, [3, 4])), undo_line((DELETE, [5])), redo_line((DELETE, [5])),
+    ])
+    assert read_log(log) == [(COMBINE, [1, 2]), (DELETE, [5])]
+
+
+def test_log_of_version_without_step_in_undo_lines(tmp_path):
+    log = write_log(tmp_path / "log.txt", [
+        log_line(COMBINE, [1, 2]), log_line(DELETE, [5]), "Last step undone.", "Last step undone.",
+        "Last undone step redone.",
+    ])
+    assert read_log(log) == [(COMBINE, [1, 2])]
+
+
+def test_old_log_continued_with_several_undos(tmp_path):
+    log = write_log(tmp_path / "log.txt", [
+        log_line(COMBINE, [1, 2]), log_line(DELETE, [5]), "Last step undone.", "Last step undone.",
+        log_line(DELETE, [6]), log_line(DELETE, [7]), undo_line((DELETE, [7])), undo_line((DELETE, [6])),
+    ])
+    assert read_log(log) == [(COMBINE, [1, 2])]
+
+
+def test_log_replays_like_the_journal(tmp_path):
+    # Random steps, undos and redos as the TrackProcessor logs them
+    rng = np.random.default_rng(0)
+    journal = OperationJournal(str(tmp_path / "journal.jsonl"))
+    lines = []
+    for _ in range(300):
+        action = rng.choice(["step", "step", "undo", "redo"])
+        if action == "undo" and journal.can_undo:
+            lines.append(undo_line(journal.undo()))
+        elif action == "redo" and journal.can_redo:
+            lines.append(redo_line(journal.redo()))
+        elif action == "step":
+            operation = COMBINE if rng.random() < 0.5 else DELETE
+            tracks = [int(track) for track in rng.choice(100, rng.integers(1, 4), replace=False)]
+            journal.append(operation, tracks)
+            lines.append(log_line(operation, tracks))
+    log = write_log(tmp_path / "log.txt", lines)
+    assert read_log(log) == [(operation, list(tracks)) for operation, tracks in journal.operations]